@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=255)),
+                ('date', models.CharField(max_length=20)),
+                ('time', models.CharField(max_length=10)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.FloatField()),
+                ('due_date', models.DateField()),
+                ('status', models.CharField(default='Unpaid', max_length=50)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('payment_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ['due_date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PaymentCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('card_number', models.CharField(max_length=16)),
+                ('card_type', models.CharField(max_length=50)),
+                ('expiry_date', models.CharField(max_length=10)),
+            ],
+            options={
+                'ordering': ['expiry_date'],
+            },
+        ),
+    ]
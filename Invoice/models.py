@@ -1,16 +1,20 @@
 from django.db import models
 from django.utils import timezone
 
+from Office.rollups import RollupTracked
 from User.models import  User
 
 
-class Invoice(models.Model):
+class Invoice(RollupTracked, models.Model):
+    rollup_kind = 'invoice'
+
     user = models.ForeignKey('User.User', on_delete=models.SET_NULL, related_name='invoices_user',null=True)
     case = models.ForeignKey('Office.Case', on_delete=models.SET_NULL, null=True, related_name='invoices_case',)
     amount = models.FloatField()
     due_date = models.DateField()
     status = models.CharField(max_length=50, default="Unpaid")
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
     payment_date = models.DateTimeField(null=True, blank=True)
     payment_card = models.ForeignKey('PaymentCard', on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices_payment_card')
 
@@ -19,6 +23,10 @@ class Invoice(models.Model):
 
     class Meta:
         ordering = ['due_date']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='invoice_user_created_idx'),
+            models.Index(fields=['user', 'status', 'due_date'], name='invoice_user_status_due_idx'),
+        ]
 
 class PaymentCard(models.Model):
     card_number = models.CharField(max_length=16)
@@ -7,19 +7,30 @@ from rest_framework.views import APIView
 from Invoice.models import Invoice
 from Invoice.serializers import InvoiceSerializer
 from User.permission import AdminRequiredPermission
+from project.cache import cache_response
+from project.conditional import ConditionalGetMixin, conditional_get
+from project.pagination import KeysetPagination
 
 
-class GetInvoicesView(APIView):
+class GetInvoicesView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated,AdminRequiredPermission]
 
-    def get(self, request):
+    def get_conditional_queryset(self):
         # Assuming you have office_id in the User model
-        invoices = Invoice.objects.filter(user__office_id=request.user.office_id)
-        if not invoices:
+        return Invoice.objects.filter(user__office_id=self.request.user.office_id)
+
+    @conditional_get
+    @cache_response('invoices')
+    def get(self, request):
+        invoices = self.get_conditional_queryset()
+
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(invoices, request, view=self)
+        if not page and not request.query_params.get(paginator.cursor_query_param):
             raise NotFound("No invoices found for the office.")
 
-        serializer = InvoiceSerializer(invoices, many=True)
-        return Response(serializer.data)
+        serializer = InvoiceSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
 
 class DeleteInvoiceView(APIView):
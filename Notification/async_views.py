@@ -0,0 +1,12 @@
+from Notification.models import Notification
+from Notification.serializers import NotificationSerializer
+from project.async_views import AsyncListView
+
+
+class AsyncNotificationListView(AsyncListView):
+    # GET of CreateListNotificationView
+    user_types = ('admin',)
+    serializer_class = NotificationSerializer
+
+    def get_queryset(self, request):
+        return NotificationSerializer.setup_queryset(Notification.objects.filter(office_id=request.user.office_id))
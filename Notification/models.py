@@ -1,14 +1,18 @@
 from django.db import models
 from Office.models import Office
+from Office.rollups import RollupTracked
 from User.models import User
 
 
 # Create your models here.
 
 
-class Notification(models.Model):
+class Notification(RollupTracked, models.Model):
+    rollup_kind = 'notification'
+
     message = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     is_read = models.BooleanField(default=False)
     notification_type = models.CharField(max_length=50)
     sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='sent_notifications')
@@ -38,4 +42,8 @@ class Notification(models.Model):
     class Meta:
         db_table = 'notification'
         verbose_name = 'Notification'
-        verbose_name_plural = 'Notifications'
\ No newline at end of file
+        verbose_name_plural = 'Notifications'
+        indexes = [
+            models.Index(fields=['office', 'created_at'], name='notif_office_created_idx'),
+            models.Index(fields=['office', 'is_read'], name='notif_office_read_idx'),
+        ]
\ No newline at end of file
@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
-from User.serializers import UserSerializer
+from User.serializers import UserListSerializer
+from project.serializers import SparseFieldsMixin
 from .models import Notification, User
 
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sender_id = serializers.PrimaryKeyRelatedField(
         queryset=User.objects.all(),
         source='sender',  # Maps to sender relationship in Notification model
@@ -26,8 +27,16 @@ class NotificationSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'sender', 'recipient']
 
+    @staticmethod
+    def setup_queryset(queryset):
+        # Load sender and recipients up front instead of once per row
+        return queryset.select_related('sender').prefetch_related('recipient')
+
     def to_representation(self, instance):
         representation = super().to_representation(instance)
-        representation['sender'] = UserSerializer(instance.sender).data
-        representation['recipient'] = UserSerializer(instance.recipient).data
+        # Skipped when ?fields= leaves them out
+        if 'sender' in representation:
+            representation['sender'] = UserListSerializer(instance.sender).data if instance.sender_id else None
+        if 'recipient' in representation:
+            representation['recipient'] = UserListSerializer(instance.recipient.all(), many=True).data
         return representation
@@ -4,17 +4,31 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
+from django.db.models import Count, Max
 from django.shortcuts import get_object_or_404
 
 from User.models import User
+from project.conditional import ConditionalGetMixin, conditional_get
+from project.renderers import StreamingListMixin
+from project.serializers import SparseFieldsViewMixin
 from User.permission import AdminRequiredPermission
 from .models import Notification
 from .serializers import NotificationSerializer
 
 
-class CreateListNotificationView(ListCreateAPIView):
+# Recipients are many-to-many and can change without touching the notification row, as can the
+# sender's and recipients' profiles the notification renders
+RECIPIENTS = {
+    'recipients_count': Count('recipient', distinct=True),
+    'recipients_at': Max('recipient__updated_at'),
+    'sender_at': Max('sender__updated_at'),
+}
+
+
+class CreateListNotificationView(ConditionalGetMixin, StreamingListMixin, SparseFieldsViewMixin, ListCreateAPIView):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, AdminRequiredPermission]  # Ensure user is admin
+    conditional_aggregates = RECIPIENTS
 
     def perform_create(self, serializer):
         data = self.request.data
@@ -43,8 +57,8 @@ class CreateListNotificationView(ListCreateAPIView):
         notification = Notification(
             message=data['message'],
             sender=self.request.user,
-            recipient=recipient,
             sender_type='admin',  # assuming sender type is always 'admin' in this case
+            recipient_type=recipient_type,
             notification_type=data.get('notification_type', 'admin'),
             office_id=self.request.user.office_id,
             related_object_type=data.get('related_object_type'),
@@ -53,10 +67,13 @@ class CreateListNotificationView(ListCreateAPIView):
 
         # Save the notification instance
         notification.save()
+        notification.recipient.add(recipient)
 
         return notification  # Returning the created notification for serialization
     def get_queryset(self):
-        return Notification.objects.filter(office_id=self.request.user.office_id)
+        return NotificationSerializer.setup_queryset(
+            Notification.objects.filter(office_id=self.request.user.office_id)
+        )
 
     def post(self, request, *args, **kwargs):
         # This is the entry point for handling POST requests.
@@ -76,11 +93,17 @@ class CreateListNotificationView(ListCreateAPIView):
 
 
 
-class NotificationDetailView(RetrieveUpdateDestroyAPIView):
-    queryset = Notification.objects.all()
+class NotificationDetailView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
+    queryset = NotificationSerializer.setup_queryset(Notification.objects.all())
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated, AdminRequiredPermission]
+    conditional_aggregates = RECIPIENTS
+    conditional_detail = True
+
+    def get_conditional_queryset(self):
+        return Notification.objects.filter(pk=self.kwargs['pk'])
 
+    @conditional_get
     def get(self, request, *args, **kwargs):
         """ Retrieve a single notification """
         notification = self.get_object()
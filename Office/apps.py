@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reinstall_search_triggers(sender, using='default', **kwargs):
+    from Office.search import install_search_index
+
+    install_search_index(using)
 
 
 class OfficeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'Office'
+
+    def ready(self):
+        from Office import signals  # noqa: F401
+
+        # SQLite drops a table's triggers when a migration rebuilds the table
+        post_migrate.connect(reinstall_search_triggers, sender=self)
@@ -0,0 +1,39 @@
+from Office.models import Request, Case
+from Office.notes import with_note_summary
+from Office.serializers import RequestSerializer, CaseSerializer, LawyerRequestSerializer
+from Office.views import HearingDatesMixin
+from project.async_views import AsyncAPIView, AsyncListView
+
+
+class AsyncRequestListView(AsyncListView):
+    # RequestListView, RequestCreateView and RequestUserCreateView
+    serializer_class = RequestSerializer
+
+    def get_queryset(self, request):
+        return with_note_summary(Request.objects.filter(office_id=request.user.office_id))
+
+
+class AsyncLawyerRequestListView(AsyncListView):
+    # LawyerRequestListView and LawyerRequestsView
+    user_types = ('lawyer',)
+    serializer_class = LawyerRequestSerializer
+
+    def get_queryset(self, request):
+        return LawyerRequestSerializer.setup_queryset(Request.objects.filter(lawyer_id=request.user.id))
+
+
+class AsyncUserCasesView(AsyncListView):
+    # UserCasesView
+    user_types = ('user',)
+    serializer_class = CaseSerializer
+    cursor_ordering = ('-id',)
+
+    def get_queryset(self, request):
+        return with_note_summary(Case.objects.filter(user_id=request.user.id))
+
+
+class AsyncHearingDatesView(HearingDatesMixin, AsyncAPIView):
+    # UserDatesAPIView and LawyerDatesAPIView
+
+    async def get(self, request, *args, **kwargs):
+        return self.date_entries([row async for row in self.hearing_rows(request)])
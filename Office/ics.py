@@ -0,0 +1,74 @@
+from datetime import timedelta, timezone as dt_timezone
+
+PRODUCT_ID = '-//LawApp//Hearing Calendar//EN'
+HEARING_DURATION = timedelta(hours=1)
+
+
+def escape_text(value):
+    # RFC 5545 3.3.11: backslash, semicolon, comma and newlines are escaped in TEXT values
+    return (
+        str(value or '')
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def fold(line):
+    # RFC 5545 3.1: lines longer than 75 octets continue on the next line after a space
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Never split inside a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_utc(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def calendar_stream(hearings, name, host):
+    """
+    Yield an iCalendar document one VEVENT at a time.
+
+    `hearings` is an iterable of dicts with the keys `id`, `starts_at`, `updated_at`,
+    `case_id`, `case__case_type`, `case__description`, `case__address`,
+    `case__plaintiff_name` and `case__defendant_name`.
+    """
+    yield 'BEGIN:VCALENDAR\r\n'
+    yield 'VERSION:2.0\r\n'
+    yield fold(f'PRODID:{PRODUCT_ID}')
+    yield 'CALSCALE:GREGORIAN\r\n'
+    yield 'METHOD:PUBLISH\r\n'
+    yield fold(f'X-WR-CALNAME:{escape_text(name)}')
+    for hearing in hearings:
+        parties = ' v. '.join(filter(None, [hearing['case__plaintiff_name'], hearing['case__defendant_name']]))
+        summary = f"Hearing: case {hearing['case_id']}"
+        if hearing['case__case_type']:
+            summary += f" ({hearing['case__case_type']})"
+        description = '\n'.join(filter(None, [parties, hearing['case__description']]))
+        event = [
+            'BEGIN:VEVENT',
+            f"UID:hearing-{hearing['id']}@{host}",
+            f"DTSTAMP:{format_utc(hearing['updated_at'])}",
+            f"DTSTART:{format_utc(hearing['starts_at'])}",
+            f"DTEND:{format_utc(hearing['starts_at'] + HEARING_DURATION)}",
+            f"SUMMARY:{escape_text(summary)}",
+        ]
+        if description:
+            event.append(f'DESCRIPTION:{escape_text(description)}')
+        if hearing['case__address']:
+            event.append(f"LOCATION:{escape_text(hearing['case__address'])}")
+        event.append('END:VEVENT')
+        yield ''.join(fold(line) for line in event)
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, get_error_detail
+
+from Office.models import Request, Note
+from Office.parties import index_parties
+from Office.rollups import record, instance_states
+from Office.serializers import RequestImportSerializer
+from User.models import User
+from project.cache import bump
+
+FORMATS = ('csv', 'ndjson')
+
+
+class RowError(Exception):
+    pass
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format '{requested}'; use one of {', '.join(FORMATS)}.")
+        return requested
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_rows(binary_stream, fmt):
+    """Yield (line number, dict or RowError) pairs from a CSV or NDJSON byte stream, one row at a time."""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    if fmt == 'ndjson':
+        for line_number, line in enumerate(text, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield line_number, RowError(f"Invalid JSON: {exc}")
+                continue
+            if not isinstance(row, dict):
+                yield line_number, RowError("Each line must be a JSON object.")
+                continue
+            yield line_number, row
+        return
+
+    reader = csv.DictReader(text)
+    try:
+        for row in reader:
+            # DictReader.line_num is the physical line the row ended on
+            yield reader.line_num, {key: value for key, value in row.items() if key is not None}
+    except csv.Error as exc:
+        yield reader.line_num, RowError(f"Invalid CSV: {exc}")
+
+
+class RowValidator:
+    """
+    Applies a serializer's field rules to plain dicts.
+
+    The serializer is instantiated once; each row then only goes through the
+    bound fields' run_validation() and the serializer's validate_<field>()
+    hooks, which is what is_valid() would do without the per-row setup cost.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.fields = [
+            (name, field, getattr(serializer, f'validate_{name}', None))
+            for name, field in serializer.fields.items()
+            if not field.read_only
+        ]
+
+    def validate(self, row):
+        attrs, errors = {}, {}
+        for name, field, validate_method in self.fields:
+            try:
+                value = field.run_validation(field.get_value(row))
+                if validate_method is not None:
+                    value = validate_method(value)
+            except SkipField:
+                continue
+            except ValidationError as exc:
+                errors[name] = exc.detail
+            except DjangoValidationError as exc:
+                errors[name] = get_error_detail(exc)
+            else:
+                attrs[field.source] = value
+        return attrs, errors
+
+
+def normalize_csv_row(row):
+    # CSV has no nulls or lists: blank cells mean "not given" and notes may hold a JSON list or plain text
+    row = {key: value for key, value in row.items() if value not in ('', None)}
+    notes = row.get('notes')
+    if isinstance(notes, str):
+        try:
+            row['notes'] = json.loads(notes)
+        except ValueError:
+            row['notes'] = [notes]
+        if not isinstance(row['notes'], list):
+            row['notes'] = [notes]
+    return row
+
+
+def import_requests(rows, office_id, fmt='csv', batch_size=1000):
+    """
+    Validate and insert intake requests for one office.
+
+    Consumes `rows` lazily and yields a report entry for every rejected row,
+    followed by a final summary entry, so memory use does not depend on the
+    size of the input.
+    """
+    validator = RowValidator(RequestImportSerializer)
+    members = dict(User.objects.filter(office_id=office_id).values_list('id', 'user_type'))
+    batch, batch_notes = [], []
+    imported = failed = 0
+
+    def flush():
+        with transaction.atomic():
+            created = Request.objects.bulk_create(batch)
+            Note.objects.bulk_create([
+                Note(request_id=request.id, body=body)
+                for request, notes in zip(created, batch_notes)
+                for body in notes
+            ])
+            index_parties(created)
+            record('request', after=instance_states('request', created))
+            bump(office_id, 'requests')
+        return len(batch)
+
+    for line_number, row in rows:
+        if isinstance(row, RowError):
+            failed += 1
+            yield {"line": line_number, "errors": {"row": [str(row)]}}
+            continue
+        if fmt == 'csv':
+            row = normalize_csv_row(row)
+
+        attrs, errors = validator.validate(row)
+        for field, user_type in (('user_id', 'user'), ('lawyer_id', 'lawyer')):
+            member_id = attrs.get(field)
+            if member_id is not None and members.get(member_id) != user_type:
+                errors[field] = [f"No {user_type} with id {member_id} in this office."]
+        if errors:
+            failed += 1
+            yield {"line": line_number, "errors": errors}
+            continue
+
+        batch_notes.append(attrs.pop('notes', []))
+        batch.append(Request(office_id=office_id, **attrs))
+        if len(batch) >= batch_size:
+            imported += flush()
+            batch, batch_notes = [], []
+
+    if batch:
+        imported += flush()
+    yield {"summary": {"imported": imported, "failed": failed}}
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, override_settings
+
+from User.models import User
+from User.tokens import OfficeRefreshToken
+
+# (role, path) of every route that has an async version under /api/async/
+ROUTES = (
+    ('admin', 'requests/'),
+    ('admin', 'notifications/'),
+    ('admin', 'admin/get_profile'),
+    ('lawyer', 'lawyer_side/requests/'),
+    ('lawyer', 'lawyer_side/dates'),
+    ('user', 'users/cases/'),
+    ('user', 'users/dates'),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync API views and their async versions under concurrent load, "
+        "driving both through Django's ASGI handler in-process."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--office', type=int, help="Office whose users make the requests. Defaults to the first.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per route and version.")
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError("--requests and --concurrency must be positive")
+        users = User.objects.filter(is_deactivated=False).order_by('id')
+        if options['office']:
+            users = users.filter(office_id=options['office'])
+        tokens = {}
+        for role in {role for role, _ in ROUTES}:
+            user = users.filter(user_type=role).first()
+            if user is None:
+                raise CommandError(f"No active {role} to make requests as; run generate_dataset first")
+            tokens[role] = str(OfficeRefreshToken.for_user(user).access_token)
+
+        # The in-process client always sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            self.run_all(tokens, options['requests'], options['concurrency'])
+
+    def run_all(self, tokens, total, concurrency):
+        self.stdout.write(f"{'route':<28}{'sync req/s':>12}{'async req/s':>13}{'sync p95':>11}{'async p95':>11}")
+        for role, path in ROUTES:
+            results = [
+                asyncio.run(self.load(prefix + path, tokens[role], total, concurrency))
+                for prefix in ('/api/', '/api/async/')
+            ]
+            (sync_rate, sync_p95), (async_rate, async_p95) = results
+            self.stdout.write(
+                f"{path:<28}{sync_rate:>12.0f}{async_rate:>13.0f}{sync_p95 * 1000:>9.1f}ms{async_p95 * 1000:>9.1f}ms"
+            )
+
+    async def load(self, path, token, total, concurrency):
+        """Issue `total` GETs with at most `concurrency` in flight; return (requests/s, p95 latency)."""
+        # Headers go on each call: AsyncClient(headers=...) does not reach the ASGI scope
+        client, headers = AsyncClient(), {'Authorization': f'Bearer {token}'}
+        slots = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with slots:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {path} answered {response.status_code}")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        return total / elapsed, latencies[int(len(latencies) * 0.95) - 1 if len(latencies) > 1 else 0]
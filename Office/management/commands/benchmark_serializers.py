@@ -0,0 +1,63 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+from rest_framework.request import Request as APIRequest
+
+from Office.models import Case, Document, Request
+from Office.notes import with_note_summary
+from Office.serializers import CaseSerializer, DocumentSerializer, RequestSerializer
+from project.serializers import compile_representation
+
+# (label, serializer class, queryset factory) of each list that has a compiled fast path
+LISTS = (
+    ('requests', RequestSerializer, lambda: with_note_summary(Request.objects.all())),
+    ('cases', CaseSerializer, lambda: with_note_summary(Case.objects.all())),
+    ('documents', DocumentSerializer, lambda: Document.objects.all()),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare how many rows per second the list serializers render through DRF and through their "
+        "compiled values() fast path, reading and rendering the same rows both ways."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100000, help="Rows of each list to render.")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per path; the best one counts.")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError("--rows and --repeat must be positive")
+
+        # File URLs are made absolute from the request, as in the views
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            request = APIRequest(RequestFactory().get('/'))
+            self.stdout.write(f"{'list':<12}{'rows':>9}{'serializer rows/s':>20}{'compiled rows/s':>18}{'speedup':>9}")
+            for label, serializer_class, rows in LISTS:
+                queryset = rows().order_by('-id')[:options['rows']]
+                serializer = serializer_class(context={'request': request})
+                compiled = compile_representation(serializer, queryset)
+                if compiled is None:
+                    raise CommandError(f"{serializer_class.__name__} does not compile")
+
+                count, slow = self.best(options['repeat'], lambda: serializer_class(
+                    queryset, many=True, context={'request': request},
+                ).data)
+                _, fast = self.best(options['repeat'], lambda: compiled.data(queryset))
+                if not count:
+                    raise CommandError(f"No {label} to render; run generate_dataset first")
+                self.stdout.write(
+                    f"{label:<12}{count:>9}{count / slow:>20.0f}{count / fast:>18.0f}{slow / fast:>8.1f}x"
+                )
+
+    def best(self, repeat, render):
+        """Return (rows rendered, fastest wall time) over `repeat` runs of `render`."""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = render()
+            timings.append(time.perf_counter() - started)
+        return len(data), min(timings)
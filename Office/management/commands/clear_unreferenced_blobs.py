@@ -0,0 +1,14 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from project.storage import BLOB_DIR, collect_unreferenced
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete stored files no row references any more and that were not stored again within "
+        "BLOB_RELEASE_GRACE_SECONDS. Meant to run periodically, e.g. from cron."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {collect_unreferenced(default_storage)} unreferenced files from {BLOB_DIR}/.")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from Office.uploads import collect_abandoned
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete resumable upload sessions idle for longer than UPLOAD_SESSION_IDLE_SECONDS with their partial "
+        "files, and temporary upload files nothing owns any more. Meant to run periodically, e.g. from cron."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Deleted {collect_abandoned()} abandoned upload sessions.")
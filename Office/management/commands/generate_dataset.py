@@ -0,0 +1,237 @@
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from Invoice.models import Invoice
+from Notification.models import Notification
+from Office.models import Office, Case, Request, Document, Hearing
+from Office.parties import index_parties
+from Office.rollups import compute_office, replace_office
+from User.models import User
+
+CASE_TYPES = ['civil', 'criminal', 'commercial', 'family', 'labor', 'real estate']
+REQUEST_TYPES = ['consultation', 'lawsuit', 'contract review', 'appeal']
+REQUEST_STATUSES = ['Pending', 'pending', 'in progress', 'done', 'reject']
+CASE_STATUSES = ['Open', 'in progress', 'done', 'Closed']
+FIRST_NAMES = ['Ahmed', 'Mohamed', 'Sara', 'Fatima', 'Omar', 'Khaled', 'Nora', 'Youssef', 'Laila', 'Hassan',
+               'Mona', 'Ali', 'Reem', 'Tariq', 'Huda', 'Samir']
+LAST_NAMES = ['Hassan', 'Ibrahim', 'Saleh', 'Mahmoud', 'Abdullah', 'Nasser', 'Farouk', 'Haddad', 'Kareem',
+              'Mansour', 'Othman', 'Rashid']
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a deterministic synthetic dataset of offices, users, cases, hearings, requests, documents, "
+        "invoices and notifications using batched bulk inserts, and index its party names. Rerunning "
+        "with the same seed and prefix skips the offices already generated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help="Random seed; the same seed yields the same data.")
+        parser.add_argument('--offices', type=int, default=10)
+        parser.add_argument('--admins-per-office', type=int, default=1)
+        parser.add_argument('--lawyers-per-office', type=int, default=10)
+        parser.add_argument('--clients-per-office', type=int, default=390)
+        parser.add_argument('--cases-per-client', type=float, default=1.5)
+        parser.add_argument('--hearings-per-case', type=float, default=2)
+        parser.add_argument('--requests-per-client', type=float, default=10)
+        parser.add_argument('--documents-per-request', type=float, default=0.5)
+        parser.add_argument('--invoices-per-case', type=float, default=1)
+        parser.add_argument('--notifications-per-client', type=float, default=25)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--password', default='password',
+                            help="Password given to every generated account; hashed once and reused.")
+        parser.add_argument('--prefix', default=None,
+                            help="Username/email prefix; defaults to 's<seed>' so runs with different seeds "
+                                 "can be loaded side by side.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix'] or f"s{options['seed']}"
+        self.totals = {}
+
+        # Hashing is by far the most expensive part of creating a user, so do it once.
+        self.password = make_password(options['password'])
+
+        started = time.monotonic()
+        skipped = 0
+        for office_index in range(options['offices']):
+            # Each office commits whole, so one that exists was finished by an earlier, interrupted run
+            if Office.objects.filter(office_name=self.office_name(office_index)).exists():
+                skipped += 1
+                continue
+            # Seeded per office, so a resumed run generates what an uninterrupted one would have
+            self.rng = random.Random(f"{options['seed']}:{office_index}")
+            # One transaction per office keeps the journal small.
+            with transaction.atomic():
+                office = self.generate_office(office_index, options)
+                # Bulk inserts bypass the rollup bookkeeping, so count the finished office once
+                replace_office(office.id, compute_office(office.id))
+            self.stdout.write(f"office {office_index + 1}/{options['offices']} "
+                              f"({time.monotonic() - started:.1f}s)")
+
+        summary = ', '.join(f"{count} {name}" for name, count in self.totals.items()) or 'nothing'
+        if skipped:
+            summary += f" (skipped {skipped} offices generated before)"
+        self.stdout.write(self.style.SUCCESS(f"Generated {summary} in {time.monotonic() - started:.1f}s"))
+
+    def office_name(self, office_index):
+        return f"{self.prefix} Office {office_index}"
+
+    def count(self, ratio):
+        # Turn a fractional ratio into an integer count with the right expected value.
+        whole = int(ratio)
+        return whole + (1 if self.rng.random() < ratio - whole else 0)
+
+    def insert(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        name = model._meta.verbose_name_plural
+        self.totals[name] = self.totals.get(name, 0) + len(created)
+        return created
+
+    def person(self):
+        return f"{self.rng.choice(FIRST_NAMES)} {self.rng.choice(LAST_NAMES)}"
+
+    def make_users(self, office, office_index, user_type, count):
+        users = []
+        for n in range(count):
+            username = f"{self.prefix}_{office_index}_{user_type[0]}{n}"
+            users.append(User(
+                username=username,
+                email=f"{username}@example.com",
+                password=self.password,
+                user_type=user_type,
+                role='client' if user_type == 'user' else None,
+                lawfirm=office.office_name if user_type != 'user' else None,
+                phone=f"05{self.rng.randrange(10 ** 8):08d}",
+                gender=self.rng.choice(User.UserGenderChoices.values),
+                office=office,
+            ))
+        return self.insert(User, users)
+
+    def generate_office(self, office_index, options):
+        rng = self.rng
+        office = self.insert(Office, [Office(
+            office_name=self.office_name(office_index),
+            address=f"{rng.randrange(1, 9999)} King Fahd Road",
+        )])[0]
+
+        admins = self.make_users(office, office_index, 'admin', options['admins_per_office'])
+        lawyers = self.make_users(office, office_index, 'lawyer', options['lawyers_per_office'])
+        clients = self.make_users(office, office_index, 'user', options['clients_per_office'])
+        index_parties(clients)
+        if not lawyers or not clients:
+            return office
+
+        cases = []
+        for client in clients:
+            for _ in range(self.count(options['cases_per_client'])):
+                hearing = date(2024, 1, 1) + timedelta(days=rng.randrange(730))
+                cases.append(Case(
+                    status=rng.choice(CASE_STATUSES),
+                    plaintiff_name=client.username,
+                    defendant_name=self.person(),
+                    address=f"{rng.randrange(1, 9999)} Olaya Street",
+                    case_type=rng.choice(CASE_TYPES),
+                    description=f"{rng.choice(CASE_TYPES).title()} matter for {client.username}",
+                    date=hearing.isoformat(),
+                    time=f"{rng.randrange(8, 17):02d}:{rng.choice(['00', '30'])}",
+                    user=client,
+                    lawyer=rng.choice(lawyers),
+                    office=office,
+                ))
+        cases = self.insert(Case, cases)
+        index_parties(cases)
+
+        hearings = []
+        for case in cases:
+            first = date.fromisoformat(case.date)
+            for n in range(self.count(options['hearings_per_case'])):
+                day = first + timedelta(days=30 * n)
+                hour, minute = (int(part) for part in case.time.split(':'))
+                hearings.append(Hearing(
+                    case=case,
+                    starts_at=timezone.make_aware(datetime.combine(day, dt_time(hour, minute))),
+                ))
+        self.insert(Hearing, hearings)
+
+        cases_by_client = {}
+        for case in cases:
+            cases_by_client.setdefault(case.user_id, []).append(case)
+
+        requests = []
+        for client in clients:
+            client_cases = cases_by_client.get(client.id, [])
+            for _ in range(self.count(options['requests_per_client'])):
+                case = rng.choice(client_cases) if client_cases and rng.random() < 0.3 else None
+                requests.append(Request(
+                    status='Approved' if case else rng.choice(REQUEST_STATUSES),
+                    request_type=rng.choice(REQUEST_TYPES),
+                    description=f"Request from {client.username}",
+                    case_type=rng.choice(CASE_TYPES),
+                    location=f"{rng.randrange(1, 9999)} Tahlia Street",
+                    plaintiff_name=client.username,
+                    defendant_name=self.person(),
+                    user=client,
+                    case=case,
+                    office=office,
+                    lawyer=case.lawyer if case else rng.choice(lawyers),
+                ))
+        requests = self.insert(Request, requests)
+        index_parties(requests)
+
+        documents = []
+        for req in requests:
+            for n in range(self.count(options['documents_per_request'])):
+                documents.append(Document(
+                    filename=f"request_{req.id}_{n}.pdf",
+                    document_type='request',
+                    uploader_id=req.user_id,
+                    case_id=req.case_id,
+                    request=req,
+                    office=office,
+                ))
+        self.insert(Document, documents)
+
+        invoices = []
+        for case in cases:
+            for _ in range(self.count(options['invoices_per_case'])):
+                invoices.append(Invoice(
+                    user_id=case.user_id,
+                    case=case,
+                    amount=float(rng.randrange(100, 20000)),
+                    due_date=date(2024, 1, 1) + timedelta(days=rng.randrange(730)),
+                    status=rng.choice(['Unpaid', 'Paid']),
+                ))
+        self.insert(Invoice, invoices)
+
+        notifications = []
+        recipients = []
+        for client in clients:
+            for _ in range(self.count(options['notifications_per_client'])):
+                notifications.append(Notification(
+                    message=f"Update for {client.username}",
+                    is_read=rng.random() < 0.6,
+                    notification_type=rng.choice(['system', 'admin', 'new_case_document']),
+                    sender=rng.choice(admins) if admins else None,
+                    sender_type='admin',
+                    recipient_type='user',
+                    office=office,
+                ))
+                recipients.append(client.id)
+        notifications = self.insert(Notification, notifications)
+
+        through = Notification.recipient.through
+        self.insert(through, [
+            through(notification_id=notification.id, user_id=user_id)
+            for notification, user_id in zip(notifications, recipients)
+        ])
+        return office
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Office.importers import detect_format, iter_rows, import_requests
+from Office.models import Office
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream-import intake requests for an office from a CSV or NDJSON file. "
+        "Rejected rows are reported as NDJSON lines with their line numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or NDJSON file to import.")
+        parser.add_argument('--office', type=int, required=True, help="Office id the requests belong to.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default=None,
+                            help="Input format; guessed from the file extension when omitted.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not Office.objects.filter(id=options['office']).exists():
+            raise CommandError(f"Office {options['office']} does not exist")
+        try:
+            fmt = detect_format(options['path'], options['format'])
+            stream = open(options['path'], 'rb')
+        except (ValueError, OSError) as exc:
+            raise CommandError(str(exc))
+
+        with stream:
+            rows = iter_rows(stream, fmt)
+            for entry in import_requests(rows, options['office'], fmt=fmt, batch_size=options['batch_size']):
+                if 'summary' in entry:
+                    summary = entry['summary']
+                    style = self.style.SUCCESS if not summary['failed'] else self.style.WARNING
+                    self.stdout.write(style(f"Imported {summary['imported']} requests, {summary['failed']} rejected"))
+                else:
+                    self.stdout.write(json.dumps(entry))
@@ -0,0 +1,43 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from project.storage import BLOB_DIR, blob_fields
+
+
+class Command(BaseCommand):
+    help = (
+        "Move files uploaded before content-addressed storage into blobs, pointing every row at the blob "
+        "of its file's content, so copies saved under different names are stored once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would move without moving it.")
+
+    def handle(self, *args, **options):
+        # Rows of several fields can share a name: each name moves once, for all of them
+        names = set()
+        for model, field in blob_fields():
+            names.update(
+                model._default_manager.exclude(**{f'{field.name}__startswith': f'{BLOB_DIR}/'})
+                .exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+                .values_list(field.name, flat=True).distinct()
+            )
+
+        moved = missing = 0
+        for name in sorted(names):
+            if not default_storage.exists(name):
+                missing += 1
+                self.stderr.write(f"{name} is missing, left as is")
+                continue
+            moved += 1
+            if options['dry_run']:
+                continue
+            with default_storage.open(name) as content:
+                blob = default_storage.save(name, content)
+            # update() skips the signals: the old file is deleted here, and the blob stays referenced
+            for model, field in blob_fields():
+                model._default_manager.filter(**{field.name: name}).update(**{field.name: blob})
+            default_storage.delete(name)
+
+        verb = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(f"{verb} {moved} files into {BLOB_DIR}/; {missing} missing.")
@@ -0,0 +1,85 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Case',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(blank=True, max_length=50, null=True)),
+                ('plaintiff_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('defendant_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('address', models.CharField(blank=True, max_length=200, null=True)),
+                ('case_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('date', models.CharField(blank=True, max_length=20, null=True)),
+                ('time', models.CharField(blank=True, max_length=10, null=True)),
+                ('notes', models.JSONField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('file', models.FileField(blank=True, null=True, upload_to='case/Document')),
+                ('document_type', models.CharField(max_length=50)),
+                ('uploaded_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='LegalDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('description', models.CharField(max_length=255)),
+                ('file', models.FileField(null=True, upload_to='legal_documents')),
+                ('created_at', models.DateTimeField(auto_now_add=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Office',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('office_name', models.CharField(max_length=100)),
+                ('address', models.CharField(blank=True, max_length=200, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Request',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(default='Pending', max_length=100)),
+                ('request_type', models.CharField(blank=True, max_length=50, null=True)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('case_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('location', models.CharField(blank=True, max_length=200, null=True)),
+                ('notes', models.JSONField(blank=True, default=list, null=True)),
+                ('plaintiff_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('defendant_name', models.CharField(blank=True, max_length=100, null=True)),
+                ('national_address', models.CharField(blank=True, max_length=200, null=True)),
+                ('document_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('judgment_document_path', models.CharField(blank=True, max_length=200, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['office', 'status'], name='case_office_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='case',
+            index=models.Index(fields=['lawyer', 'user'], name='case_lawyer_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legaldocument',
+            index=models.Index(fields=['admin', 'created_at'], name='legaldoc_admin_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['office', 'created_at'], name='request_office_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['office', 'status', 'created_at'], name='request_office_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['lawyer', 'created_at'], name='request_lawyer_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['user', 'created_at'], name='request_user_created_idx'),
+        ),
+    ]
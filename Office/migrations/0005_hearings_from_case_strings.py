@@ -0,0 +1,38 @@
+from datetime import datetime, time
+
+from django.db import migrations
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_time
+
+
+def copy_case_dates(apps, schema_editor):
+    Case = apps.get_model('Office', 'Case')
+    Hearing = apps.get_model('Office', 'Hearing')
+
+    batch = []
+    cases = Case.objects.exclude(date__isnull=True).exclude(date='').values_list('id', 'date', 'time')
+    for case_id, date_value, time_value in cases.iterator(chunk_size=2000):
+        try:
+            day = parse_date(date_value.strip())
+            moment = parse_time(time_value.strip()) if time_value else None
+        except ValueError:
+            continue
+        if day is None:
+            continue
+        starts_at = timezone.make_aware(datetime.combine(day, moment or time.min))
+        batch.append(Hearing(case_id=case_id, starts_at=starts_at))
+        if len(batch) >= 2000:
+            Hearing.objects.bulk_create(batch)
+            batch = []
+    Hearing.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0004_hearing'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_case_dates, migrations.RunPython.noop),
+    ]
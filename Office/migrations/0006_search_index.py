@@ -0,0 +1,93 @@
+from django.db import migrations
+
+# One FTS5 table indexes both cases and requests. The rowid packs the source
+# row as id * 4 + kind (0 = case, 1 = request) so the triggers can find their
+# entry without a lookup. `office` and `lawyer` hold scope tokens such as
+# "o12" and "l7" so a search is narrowed by the full-text index itself
+# instead of by post-filtering every match. They come last so snippet(),
+# which prefers the earliest of equally matching columns, quotes real text.
+CREATE_TABLE = """
+CREATE VIRTUAL TABLE office_search USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    plaintiff_name,
+    defendant_name,
+    case_type,
+    description,
+    notes,
+    office,
+    lawyer,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# Party names weigh most, scope columns not at all
+CONFIGURE_RANK = (
+    "INSERT INTO office_search(office_search, rank) "
+    "VALUES ('rank', 'bm25(0, 0, 10.0, 10.0, 2.0, 1.0, 1.0, 0, 0)')"
+)
+
+SOURCES = (
+    ('case', 0, 'Office_case'),
+    ('request', 1, 'Office_request'),
+)
+
+
+def entry_select(kind, offset, row):
+    # Every string inside the notes JSON, however deeply nested, becomes searchable text
+    return f"""
+    SELECT {row}.id * 4 + {offset}, '{kind}', {row}.id,
+           {row}.plaintiff_name, {row}.defendant_name, {row}.case_type, {row}.description,
+           (SELECT group_concat(value, ' ') FROM json_tree({row}.notes) WHERE type = 'text'),
+           'o' || coalesce({row}.office_id, 0), 'l' || coalesce({row}.lawyer_id, 0)
+    """
+
+
+def trigger_statements(kind, offset, table):
+    insert = (
+        "INSERT INTO office_search(rowid, kind, object_id, plaintiff_name, defendant_name, case_type, "
+        f"description, notes, office, lawyer) {entry_select(kind, offset, 'NEW')};"
+    )
+    delete = f"DELETE FROM office_search WHERE rowid = OLD.id * 4 + {offset};"
+    watched = 'plaintiff_name, defendant_name, case_type, description, notes, office_id, lawyer_id'
+    return [
+        f'CREATE TRIGGER office_search_{kind}_ai AFTER INSERT ON "{table}" BEGIN {insert} END',
+        f'CREATE TRIGGER office_search_{kind}_ad AFTER DELETE ON "{table}" BEGIN {delete} END',
+        f'CREATE TRIGGER office_search_{kind}_au AFTER UPDATE OF {watched} ON "{table}" '
+        f'BEGIN {delete} {insert} END',
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_TABLE)
+    schema_editor.execute(CONFIGURE_RANK)
+    for kind, offset, table in SOURCES:
+        schema_editor.execute(
+            "INSERT INTO office_search(rowid, kind, object_id, plaintiff_name, defendant_name, case_type, "
+            f"description, notes, office, lawyer) {entry_select(kind, offset, 'src')} FROM \"{table}\" AS src"
+        )
+        for statement in trigger_statements(kind, offset, table):
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for kind, _, _ in SOURCES:
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS office_search_{kind}_{suffix}')
+    schema_editor.execute('DROP TABLE IF EXISTS office_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0005_hearings_from_case_strings'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PartyName',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('normalized', models.CharField(max_length=255)),
+                ('gram_count', models.PositiveSmallIntegerField()),
+                ('office', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='party_names', to='Office.office')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PartyGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gram', models.CharField(max_length=3)),
+                ('office', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='Office.office')),
+                ('party', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='grams', to='Office.partyname')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PartySource',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('client', 'Client'), ('plaintiff', 'Plaintiff'), ('defendant', 'Defendant')], max_length=20)),
+                ('source_type', models.CharField(max_length=20)),
+                ('source_id', models.PositiveBigIntegerField()),
+                ('name', models.CharField(max_length=255)),
+                ('party', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sources', to='Office.partyname')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='partyname',
+            constraint=models.UniqueConstraint(fields=('office', 'normalized'), name='party_office_normalized_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='partygram',
+            index=models.Index(fields=['office', 'gram', 'party'], name='partygram_lookup_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partygram',
+            index=models.Index(fields=['party'], name='partygram_party_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='partysource',
+            index=models.Index(fields=['source_type', 'source_id'], name='partysource_source_idx'),
+        ),
+    ]
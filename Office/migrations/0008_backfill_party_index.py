@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from Office.parties import collect_sources, save_sources
+
+
+def backfill_party_index(apps, schema_editor):
+    PartyName = apps.get_model('Office', 'PartyName')
+    PartyGram = apps.get_model('Office', 'PartyGram')
+    PartySource = apps.get_model('Office', 'PartySource')
+    sources = (
+        apps.get_model('Office', 'Case').objects.exclude(office_id=None),
+        apps.get_model('Office', 'Request').objects.exclude(office_id=None),
+        apps.get_model('User', 'User').objects.filter(user_type='user').exclude(office_id=None),
+    )
+
+    entries = []
+    for queryset in sources:
+        for instance in queryset.iterator(chunk_size=2000):
+            entries += collect_sources(instance)
+            if len(entries) >= 2000:
+                save_sources(entries, PartyName, PartyGram, PartySource)
+                entries = []
+    save_sources(entries, PartyName, PartyGram, PartySource)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0007_party_index'),
+        ('User', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_party_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0008_backfill_party_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfficeRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('counters', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lawyer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to=settings.AUTH_USER_MODEL)),
+                ('office', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='Office.office')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('office', 'lawyer'), name='rollup_office_lawyer_uniq'), models.UniqueConstraint(condition=models.Q(('lawyer__isnull', True)), fields=('office',), name='rollup_office_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from Office.rollups import compute_office, replace_office
+
+
+def backfill_rollups(apps, schema_editor):
+    Office = apps.get_model('Office', 'Office')
+    for office_id in Office.objects.values_list('id', flat=True).iterator():
+        replace_office(office_id, compute_office(office_id, apps), apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0009_office_rollup'),
+        ('Invoice', '0003_access_path_indexes'),
+        ('Notification', '0004_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
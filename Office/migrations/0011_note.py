@@ -0,0 +1,31 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:38
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0010_backfill_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Note',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('body', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('author', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notes_author', to=settings.AUTH_USER_MODEL)),
+                ('case', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notes_case', to='Office.case')),
+                ('request', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='notes_request', to='Office.request')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['case', 'id'], name='note_case_idx'), models.Index(fields=['request', 'id'], name='note_request_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(models.Q(('case__isnull', False), ('request__isnull', True)), models.Q(('case__isnull', True), ('request__isnull', False)), _connector='OR'), name='note_single_parent')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+import json
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+# Keys a structured note entry may keep its text under
+TEXT_KEYS = ('text', 'note', 'body', 'content', 'message')
+
+
+def note_body(entry):
+    if isinstance(entry, dict):
+        for key in TEXT_KEYS:
+            if isinstance(entry.get(key), str) and entry[key].strip():
+                return entry[key]
+        return json.dumps(entry, ensure_ascii=False)
+    if isinstance(entry, str):
+        return entry
+    return json.dumps(entry, ensure_ascii=False)
+
+
+def copy_json_notes(apps, schema_editor):
+    Note = apps.get_model('Office', 'Note')
+    Request = apps.get_model('Office', 'Request')
+
+    for model_name, parent in (('Case', 'case_id'), ('Request', 'request_id')):
+        model = apps.get_model('Office', model_name)
+        batch = []
+        rows = model.objects.exclude(notes__isnull=True).values_list('id', 'notes')
+        for parent_id, notes in rows.iterator(chunk_size=2000):
+            if not isinstance(notes, list):
+                notes = [notes]
+            batch += [
+                Note(**{parent: parent_id}, body=note_body(entry))
+                for entry in notes
+                if entry not in (None, '', {}, [])
+            ]
+            if len(batch) >= 2000:
+                Note.objects.bulk_create(batch)
+                batch = []
+        Note.objects.bulk_create(batch)
+
+    # Legacy entries carry no timestamp; a request's own creation time is the best guess
+    Note.objects.filter(request__isnull=False).update(
+        created_at=Subquery(Request.objects.filter(id=OuterRef('request_id')).values('created_at')[:1]),
+    )
+
+
+def copy_notes_to_json(apps, schema_editor):
+    Note = apps.get_model('Office', 'Note')
+    for model_name, parent in (('Case', 'case_id'), ('Request', 'request_id')):
+        model = apps.get_model('Office', model_name)
+        notes = {}
+        for parent_id, body in Note.objects.filter(**{f'{parent}__isnull': False}).order_by('id') \
+                .values_list(parent, 'body').iterator(chunk_size=2000):
+            notes.setdefault(parent_id, []).append(body)
+        for parent_id, bodies in notes.items():
+            model.objects.filter(id=parent_id).update(notes=bodies)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0011_note'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_json_notes, copy_notes_to_json),
+    ]
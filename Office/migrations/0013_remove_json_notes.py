@@ -0,0 +1,117 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:39
+
+from importlib import import_module
+
+from django.db import migrations
+
+# The search index as of this migration, reading notes from the Office_note table. Office/search.py
+# reinstalls its current triggers after every migrate; these stay frozen so the migration always
+# replays the same way.
+SOURCES = (
+    ('case', 0, 'Office_case', 'case_id'),
+    ('request', 1, 'Office_request', 'request_id'),
+)
+ENTRY_COLUMNS = 'rowid, kind, object_id, plaintiff_name, defendant_name, case_type, description, notes, office, lawyer'
+
+
+def entry_select(kind, offset, parent_column, row):
+    return f"""
+    SELECT {row}.id * 4 + {offset}, '{kind}', {row}.id,
+           {row}.plaintiff_name, {row}.defendant_name, {row}.case_type, {row}.description,
+           (SELECT group_concat(body, ' ') FROM "Office_note" WHERE {parent_column} = {row}.id),
+           'o' || coalesce({row}.office_id, 0), 'l' || coalesce({row}.lawyer_id, 0)
+    """
+
+
+def trigger_statements():
+    statements = []
+    watched = 'plaintiff_name, defendant_name, case_type, description, office_id, lawyer_id'
+    for kind, offset, table, parent_column in SOURCES:
+        insert = f"INSERT INTO office_search({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'NEW')};"
+        delete = f"DELETE FROM office_search WHERE rowid = OLD.id * 4 + {offset};"
+
+        def refresh(parent):
+            return (
+                f"DELETE FROM office_search WHERE rowid = {parent}.{parent_column} * 4 + {offset}; "
+                f"INSERT INTO office_search({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'src')} "
+                f"FROM \"{table}\" AS src WHERE src.id = {parent}.{parent_column};"
+            )
+
+        statements += [
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_ai AFTER INSERT ON "{table}" BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_ad AFTER DELETE ON "{table}" BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_au AFTER UPDATE OF {watched} ON "{table}" '
+            f'BEGIN {delete} {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_note_ai AFTER INSERT ON "Office_note" '
+            f'WHEN NEW.{parent_column} IS NOT NULL BEGIN {refresh("NEW")} END',
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_note_ad AFTER DELETE ON "Office_note" '
+            f'WHEN OLD.{parent_column} IS NOT NULL BEGIN {refresh("OLD")} END',
+            f'CREATE TRIGGER IF NOT EXISTS office_search_{kind}_note_au AFTER UPDATE OF body, {parent_column} '
+            f'ON "Office_note" BEGIN {refresh("OLD")} {refresh("NEW")} END',
+        ]
+    return statements
+
+
+def install_note_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in trigger_statements():
+        schema_editor.execute(statement)
+
+
+def drop_search_triggers(apps, schema_editor):
+    # The original triggers read the JSON column that is about to go
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'office_search_%'")
+        for (name,) in cursor.fetchall():
+            cursor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+
+
+def restore_json_triggers(apps, schema_editor):
+    # Back on the JSON column: reinstate the triggers 0006 created and reindex from it
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    search_index = import_module('Office.migrations.0006_search_index')
+    schema_editor.execute('DELETE FROM office_search')
+    for kind, offset, table in search_index.SOURCES:
+        schema_editor.execute(
+            "INSERT INTO office_search(rowid, kind, object_id, plaintiff_name, defendant_name, case_type, "
+            f"description, notes, office, lawyer) {search_index.entry_select(kind, offset, 'src')} "
+            f"FROM \"{table}\" AS src"
+        )
+        for statement in search_index.trigger_statements(kind, offset, table):
+            schema_editor.execute(statement)
+
+
+def reindex_with_note_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DELETE FROM office_search')
+    for kind, offset, table, parent_column in SOURCES:
+        schema_editor.execute(
+            f"INSERT INTO office_search({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'src')} "
+            f"FROM \"{table}\" AS src"
+        )
+    install_note_triggers(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0012_notes_from_json'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_search_triggers, restore_json_triggers),
+        migrations.RemoveField(
+            model_name='case',
+            name='notes',
+        ),
+        migrations.RemoveField(
+            model_name='request',
+            name='notes',
+        ),
+        migrations.RunPython(reindex_with_note_table, drop_search_triggers),
+    ]
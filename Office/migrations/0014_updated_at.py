@@ -0,0 +1,52 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:02
+
+from importlib import import_module
+
+from django.db import migrations, models
+from django.db.models import F
+
+# The triggers as of 0013, which this migration leaves unchanged
+remove_json_notes = import_module('Office.migrations.0013_remove_json_notes')
+
+
+def drop_triggers(apps, schema_editor):
+    # SQLite rebuilds the tables to add a column, which fails while note triggers still name them
+    remove_json_notes.drop_search_triggers(apps, schema_editor)
+
+
+def install_triggers(apps, schema_editor):
+    remove_json_notes.install_note_triggers(apps, schema_editor)
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows start from their creation time; cases have none and keep the migration time
+    apps.get_model('Office', 'Request').objects.update(updated_at=F('created_at'))
+    apps.get_model('Office', 'Document').objects.update(updated_at=F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0013_remove_json_notes'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_triggers, install_triggers),
+        migrations.AddField(
+            model_name='case',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='request',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
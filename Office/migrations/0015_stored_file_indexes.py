@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0014_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['file'], name='document_file_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legaldocument',
+            index=models.Index(fields=['file'], name='legaldoc_file_idx'),
+        ),
+    ]
@@ -1,7 +1,9 @@
+import uuid
 from idlelib.pyparse import trans
 
 from django.db import models
 
+from Office.rollups import RollupTracked
 from User.models import User
 
 
@@ -16,7 +18,9 @@ class Office(models.Model):
         return self.office_name
 
 
-class Case(models.Model):
+class Case(RollupTracked, models.Model):
+    rollup_kind = 'case'
+
     status = models.CharField(max_length=50, blank=True, null=True)
     plaintiff_name = models.CharField(max_length=100, blank=True, null=True)
     defendant_name = models.CharField(max_length=100, blank=True, null=True)
@@ -25,15 +29,37 @@ class Case(models.Model):
     description = models.TextField(blank=True, null=True)
     date = models.CharField(max_length=20, blank=True, null=True)
     time = models.CharField(max_length=10, blank=True, null=True)
-    notes = models.JSONField(blank=True, null=True)
     user = models.ForeignKey('User.User', on_delete=models.SET_NULL, related_name="cases_user",null=True,blank=True)
     lawyer = models.ForeignKey('User.User', on_delete=models.SET_NULL, related_name="cases_lawyer", null=True, blank=True)
     office = models.ForeignKey(Office, on_delete=models.SET_NULL, related_name="cases_office", null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['office', 'status'], name='case_office_status_idx'),
+            models.Index(fields=['lawyer', 'user'], name='case_lawyer_user_idx'),
+        ]
 
     def __str__(self):
         return f"Case {self.id} - {self.status}"
 
 
+class Hearing(models.Model):
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="hearings")
+    starts_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            models.Index(fields=['case', 'starts_at'], name='hearing_case_starts_idx'),
+        ]
+
+    def __str__(self):
+        return f"Hearing for case {self.case_id} at {self.starts_at}"
+
+
 class Document(models.Model):
     filename = models.CharField(max_length=255)
     file = models.FileField(upload_to='case/Document',null=True,blank=True)
@@ -43,19 +69,28 @@ class Document(models.Model):
     request = models.ForeignKey("Request", on_delete=models.SET_NULL, related_name="documents_request", null=True, blank=True)
     office = models.ForeignKey(Office, on_delete=models.SET_NULL, related_name="documents_office", null=True, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Stored files are shared between rows and counted by name (project/storage.py)
+            models.Index(fields=['file'], name='document_file_idx'),
+        ]
 
     def __str__(self):
         return self.filename
 
 
-class Request(models.Model):
+class Request(RollupTracked, models.Model):
+    rollup_kind = 'request'
+
     status = models.CharField(max_length=100, default="Pending")
     request_type = models.CharField(max_length=50, blank=True, null=True)
     description = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     case_type = models.CharField(max_length=100, blank=True, null=True)
     location = models.CharField(max_length=200, blank=True, null=True)
-    notes = models.JSONField(default=list, blank=True, null=True)
     plaintiff_name = models.CharField(max_length=100, blank=True, null=True)
     defendant_name = models.CharField(max_length=100, blank=True, null=True)
     national_address = models.CharField(max_length=200, blank=True, null=True)
@@ -66,9 +101,119 @@ class Request(models.Model):
     office = models.ForeignKey(Office, on_delete=models.SET_NULL, related_name="requests_office", null=True, blank=True)
     lawyer = models.ForeignKey('User.User', on_delete=models.SET_NULL, related_name="requests_lawyer", null=True, blank=True)
 
+    class Meta:
+        # The trailing created_at lets the keyset paginator walk each scope in index order
+        indexes = [
+            models.Index(fields=['office', 'created_at'], name='request_office_created_idx'),
+            models.Index(fields=['office', 'status', 'created_at'], name='request_office_status_idx'),
+            models.Index(fields=['lawyer', 'created_at'], name='request_lawyer_created_idx'),
+            models.Index(fields=['user', 'created_at'], name='request_user_created_idx'),
+        ]
+
     def __str__(self):
         return f"Request {self.id} - {self.status}"
 
+
+class Note(models.Model):
+    """One entry in a case's or request's append-only notes log."""
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="notes_case", null=True, blank=True,
+                             db_index=False)
+    request = models.ForeignKey(Request, on_delete=models.CASCADE, related_name="notes_request", null=True,
+                                blank=True, db_index=False)
+    author = models.ForeignKey('User.User', on_delete=models.SET_NULL, related_name="notes_author", null=True, blank=True)
+    body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(case__isnull=False, request__isnull=True)
+                | models.Q(case__isnull=True, request__isnull=False),
+                name='note_single_parent',
+            ),
+        ]
+        # Ids grow with time, so (parent, id) serves both "latest note" and paging newest first
+        indexes = [
+            models.Index(fields=['case', 'id'], name='note_case_idx'),
+            models.Index(fields=['request', 'id'], name='note_request_idx'),
+        ]
+
+    def __str__(self):
+        return f"Note {self.id}"
+
+
+class PartyName(models.Model):
+    """A distinct normalized party name within an office; its trigrams live in PartyGram."""
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, related_name="party_names")
+    normalized = models.CharField(max_length=255)
+    gram_count = models.PositiveSmallIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['office', 'normalized'], name='party_office_normalized_uniq'),
+        ]
+
+    def __str__(self):
+        return self.normalized
+
+
+class PartyGram(models.Model):
+    # office is denormalized so a lookup never has to join back to PartyName
+    party = models.ForeignKey(PartyName, on_delete=models.CASCADE, related_name="grams", db_index=False)
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, related_name="+", db_index=False)
+    gram = models.CharField(max_length=3)
+
+    class Meta:
+        indexes = [
+            # Covering index: the candidate query never reads the table itself
+            models.Index(fields=['office', 'gram', 'party'], name='partygram_lookup_idx'),
+            models.Index(fields=['party'], name='partygram_party_idx'),
+        ]
+
+
+class PartySource(models.Model):
+    """Where a party name was seen: a client account, or a plaintiff or defendant on a case or request."""
+    class RoleChoices(models.TextChoices):
+        CLIENT = 'client', "Client"
+        PLAINTIFF = 'plaintiff', "Plaintiff"
+        DEFENDANT = 'defendant', "Defendant"
+
+    party = models.ForeignKey(PartyName, on_delete=models.CASCADE, related_name="sources")
+    role = models.CharField(max_length=20, choices=RoleChoices.choices)
+    source_type = models.CharField(max_length=20)
+    source_id = models.PositiveBigIntegerField()
+    name = models.CharField(max_length=255)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source_type', 'source_id'], name='partysource_source_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.role}: {self.name}"
+
+
+class OfficeRollup(models.Model):
+    """
+    Dashboard counters for one office (lawyer is null) or one lawyer in it,
+    kept current by Office/rollups.py and rebuilt by `rebuild_rollups`.
+    """
+    office = models.ForeignKey(Office, on_delete=models.CASCADE, related_name="rollups")
+    lawyer = models.ForeignKey('User.User', on_delete=models.CASCADE, related_name="rollups", null=True, blank=True)
+    counters = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['office', 'lawyer'], name='rollup_office_lawyer_uniq'),
+            models.UniqueConstraint(fields=['office'], condition=models.Q(lawyer__isnull=True),
+                                    name='rollup_office_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Rollup for office {self.office_id}" + (f" lawyer {self.lawyer_id}" if self.lawyer_id else "")
+
+
 class LegalDocument(models.Model):
         admin = models.ForeignKey(User, on_delete=models.CASCADE, related_name="legal_documents_admin")
         title = models.CharField(max_length=100)
@@ -76,6 +221,12 @@ class LegalDocument(models.Model):
         file = models.FileField(upload_to='legal_documents',null=True)
         created_at = models.DateTimeField(auto_now_add=True,null=True)
 
+        class Meta:
+            indexes = [
+                models.Index(fields=['admin', 'created_at'], name='legaldoc_admin_created_idx'),
+                models.Index(fields=['file'], name='legaldoc_file_idx'),
+            ]
+
         def to_dict(self):
             return {
                 'id': self.id,
@@ -97,4 +248,30 @@ class Event(models.Model):
    # user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="events")#
 
     def __str__(self):
-        return f"Event(id={self.id}, message='{self.message}', date='{self.date}', time='{self.time}')"
\ No newline at end of file
+        return f"Event(id={self.id}, message='{self.message}', date='{self.date}', time='{self.time}')"
+
+class UploadSession(models.Model):
+    """A case document uploaded in numbered chunks, resumable from `received`; see Office/uploads.py."""
+    # Random, so one session's id does not reveal others
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    uploader = models.ForeignKey('User.User', on_delete=models.CASCADE, related_name="upload_sessions")
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    document_type = models.CharField(max_length=50, default='case')
+    size = models.BigIntegerField()
+    # Bytes stored so far, and the number of the last chunk they end with
+    received = models.BigIntegerField(default=0)
+    chunks = models.PositiveIntegerField(default=0)
+    # Set once finalized, so a repeated finalize returns the same document
+    document = models.OneToOneField(Document, on_delete=models.SET_NULL, related_name="upload_session", null=True,
+                                    blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['updated_at'], name='upload_session_updated_idx'),
+        ]
+
+    def __str__(self):
+        return f"Upload {self.id} of {self.filename}"
@@ -0,0 +1,58 @@
+from datetime import timezone as dt_timezone
+
+from django.db.models import Count, JSONField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, JSONObject
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.fields import DateTimeField
+
+from Office.models import Note
+
+
+def notes_of(model_name):
+    return Note.objects.filter(**{model_name: OuterRef('pk')})
+
+
+def with_note_summary(queryset):
+    """
+    Annotate cases or requests with `notes_count` and `latest_note`.
+
+    Both are correlated subqueries over the (parent, id) index, so a page of
+    rows costs no extra round trips and never loads the notes themselves.
+    """
+    model_name = queryset.model._meta.model_name
+    return queryset.annotate(
+        notes_count=Coalesce(
+            Subquery(notes_of(model_name).order_by().values(model_name).annotate(total=Count('id')).values('total')),
+            0,
+        ),
+        latest_note=Subquery(
+            notes_of(model_name).order_by('-id').values(data=JSONObject(
+                id='id', body='body', author_id='author_id', author='author__username', created_at='created_at',
+            ))[:1],
+            output_field=JSONField(),
+        ),
+    )
+
+
+def note_summary(instance):
+    """Return (notes_count, latest_note) for a case or request, annotated or not."""
+    if not hasattr(instance, 'notes_count'):
+        # Not loaded through with_note_summary(): fetch the same two values directly
+        loaded = with_note_summary(instance._meta.model.objects.filter(pk=instance.pk)).only('pk').first()
+        instance.notes_count = getattr(loaded, 'notes_count', 0)
+        instance.latest_note = getattr(loaded, 'latest_note', None)
+    return getattr(instance, 'notes_count', 0), latest_note_representation(getattr(instance, 'latest_note', None))
+
+
+def latest_note_representation(latest):
+    """Render a `latest_note` annotation the way the API shows it."""
+    if not latest:
+        return latest
+    created_at = latest['created_at']
+    if isinstance(created_at, str):
+        # JSON carries the raw column value, which the database keeps in UTC
+        created_at = parse_datetime(created_at)
+        if timezone.is_naive(created_at):
+            created_at = timezone.make_aware(created_at, dt_timezone.utc)
+    return dict(latest, created_at=DateTimeField().to_representation(created_at))
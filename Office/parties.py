@@ -0,0 +1,206 @@
+import math
+import re
+import unicodedata
+
+from django.db import transaction
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+
+from Office.models import PartyName, PartyGram, PartySource
+
+ARABIC_LETTER_VARIANTS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه', 'ى': 'ي', 'ؤ': 'و', 'ئ': 'ي',
+})
+# Tatweel, harakat and the superscript alef
+ARABIC_MARKS = re.compile('[\u0640\u064B-\u065F\u0670]')
+NON_LETTERS = re.compile(r'[\W_]+', re.UNICODE)
+ARTICLE = re.compile(r'\b[ae]l\s+')
+# Spelling differences that transliterations of the same Arabic name usually differ by
+LATIN_FOLDS = (
+    ('ph', 'f'), ('ck', 'k'), ('q', 'k'), ('ou', 'u'), ('oo', 'u'), ('ee', 'i'),
+    ('e', 'i'), ('o', 'u'), ('y', 'i'),
+)
+# Doubled letters (Hassan/Hasan); repeated digits are significant and left alone
+DOUBLED = re.compile(r'([^\W\d_])\1+')
+
+DEFAULT_THRESHOLD = 0.35
+MAX_CANDIDATES = 200
+
+
+def normalize_name(value):
+    """
+    Fold a party name so spelling variants compare equal or close:
+    "Mohammed El-Sayed" and "Muhamad Al Sayed" become "muhamid alsaid" and
+    "muhamad alsaid", and vocalized Arabic loses its marks and letter variants.
+    Emails are reduced to their local part.
+    """
+    value = (value or '').split('@')[0]
+    value = unicodedata.normalize('NFKD', value)
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch)).lower()
+    value = ARABIC_MARKS.sub('', value).translate(ARABIC_LETTER_VARIANTS)
+    value = NON_LETTERS.sub(' ', value).strip()
+    value = ARTICLE.sub('al', value)
+    for source, target in LATIN_FOLDS:
+        value = value.replace(source, target)
+    return DOUBLED.sub(r'\1', value)
+
+
+def trigrams(normalized):
+    grams = set()
+    for word in normalized.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def party_entries(instance):
+    """Yield (role, name) pairs a Case, Request or client User contributes to its office's index."""
+    model = instance._meta.model_name
+    if model == 'user':
+        if instance.user_type == 'user':
+            yield 'client', instance.username
+            yield 'client', instance.email
+    elif model in ('case', 'request'):
+        yield 'plaintiff', instance.plaintiff_name
+        yield 'defendant', instance.defendant_name
+
+
+def collect_sources(instance):
+    """Return the (office_id, normalized, source fields) entries for one Case, Request or User."""
+    entries, seen = [], set()
+    if instance.office_id is None:
+        return entries
+    for role, name in party_entries(instance):
+        normalized = normalize_name(name)[:255]
+        if not normalized or (role, normalized) in seen:
+            continue
+        seen.add((role, normalized))
+        entries.append((instance.office_id, normalized, {
+            'role': role, 'source_type': instance._meta.model_name, 'source_id': instance.pk, 'name': name[:255],
+        }))
+    return entries
+
+
+def stored_party_ids(party_model, keys):
+    """{(office_id, normalized): id} of the PartyName rows stored for `keys`."""
+    party_ids = {}
+    for office_id in {office_id for office_id, _ in keys}:
+        names = [normalized for key_office, normalized in keys if key_office == office_id]
+        for start in range(0, len(names), 500):
+            party_ids.update(
+                ((office_id, normalized), party_id)
+                for party_id, normalized in party_model.objects.filter(
+                    office_id=office_id, normalized__in=names[start:start + 500],
+                ).values_list('id', 'normalized')
+            )
+    return party_ids
+
+
+def save_sources(entries, party_model=PartyName, gram_model=PartyGram, source_model=PartySource):
+    """
+    Record where each name was seen. Every distinct name gets its trigrams
+    only once per office, so repeated parties do not lengthen the postings.
+    """
+    if not entries:
+        return
+    keys = {(office_id, normalized) for office_id, normalized, _ in entries}
+    party_ids = stored_party_ids(party_model, keys)
+
+    missing = [key for key in keys if key not in party_ids]
+    if missing:
+        # A concurrent save may insert the same name first; its row, trigrams included, is used instead
+        party_model.objects.bulk_create([
+            party_model(office_id=office_id, normalized=normalized, gram_count=len(trigrams(normalized)))
+            for office_id, normalized in missing
+        ], ignore_conflicts=True)
+        created = stored_party_ids(party_model, missing)
+        ids = list(created.values())
+        indexed = set()
+        for start in range(0, len(ids), 500):
+            indexed.update(gram_model.objects.filter(party_id__in=ids[start:start + 500])
+                           .values_list('party_id', flat=True).distinct())
+        gram_model.objects.bulk_create([
+            gram_model(party_id=party_id, office_id=office_id, gram=gram)
+            for (office_id, normalized), party_id in created.items() if party_id not in indexed
+            for gram in trigrams(normalized)
+        ], batch_size=5000)
+        party_ids.update(created)
+
+    source_model.objects.bulk_create([
+        source_model(party_id=party_ids[(office_id, normalized)], **fields)
+        for office_id, normalized, fields in entries
+    ], batch_size=5000)
+
+
+def index_parties(instances):
+    """Replace the index entries of the given Case, Request and User rows."""
+    instances = list(instances)
+    if not instances:
+        return
+    entries = [entry for instance in instances for entry in collect_sources(instance)]
+    with transaction.atomic():
+        unindex_parties(instances)
+        save_sources(entries)
+
+
+def unindex_parties(instances):
+    by_type = {}
+    for instance in instances:
+        by_type.setdefault(instance._meta.model_name, []).append(instance.pk)
+    for source_type, ids in by_type.items():
+        sources = PartySource.objects.filter(source_type=source_type, source_id__in=ids)
+        party_ids = set(sources.values_list('party_id', flat=True))
+        if party_ids:
+            sources.delete()
+            # Names nobody uses any more would only cost lookup time
+            PartyName.objects.filter(id__in=party_ids, sources__isnull=True).delete()
+
+
+def find_conflicts(name, office_id, roles=None, threshold=DEFAULT_THRESHOLD, limit=20, exclude=None):
+    """
+    Return where names resembling `name` appear in the office, best first.
+
+    Similarity is the Jaccard index of the two trigram sets. Candidates are
+    counted straight from the covering (office, gram, party) index, and any
+    name sharing fewer than `threshold * len(query grams)` trigrams cannot
+    reach the threshold, so it is dropped before anything is loaded.
+    """
+    normalized = normalize_name(name)
+    grams = trigrams(normalized)
+    if not grams:
+        return normalized, []
+
+    candidates = (
+        PartyGram.objects.filter(office_id=office_id, gram__in=grams)
+        .values('party_id')
+        .annotate(shared=Count('party_id'))
+        .filter(shared__gte=max(1, math.ceil(threshold * len(grams))))
+        .order_by('-shared')
+        .values_list('party_id', 'shared')[:MAX_CANDIDATES]
+    )
+    shared_by_party = dict(candidates)
+    similarity = {
+        party_id: shared_by_party[party_id] / (len(grams) + gram_count - shared_by_party[party_id])
+        for party_id, gram_count in PartyName.objects.filter(id__in=shared_by_party).values_list('id', 'gram_count')
+    }
+    qualifying = [party_id for party_id, score in similarity.items() if score >= threshold]
+    if not qualifying:
+        return normalized, []
+
+    # A common name can be on thousands of files; no name needs more than `limit` of them
+    sources = PartySource.objects.filter(party_id__in=qualifying)
+    if roles:
+        sources = sources.filter(role__in=roles)
+    if exclude:
+        sources = sources.exclude(source_type=exclude[0], source_id=exclude[1])
+    sources = sources.annotate(
+        position=Window(RowNumber(), partition_by=F('party_id'), order_by=F('id').desc()),
+    ).filter(position__lte=limit)
+
+    matches = []
+    for source in sources.values('party_id', 'role', 'source_type', 'source_id', 'name'):
+        source['similarity'] = round(similarity[source.pop('party_id')], 3)
+        matches.append(source)
+    matches.sort(key=lambda match: -match['similarity'])
+    return normalized, matches[:limit]
@@ -0,0 +1,241 @@
+from collections import Counter
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+UNSPECIFIED = 'unspecified'
+
+MODELS = {
+    'request': ('Office', 'Request'),
+    'case': ('Office', 'Case'),
+    'invoice': ('Invoice', 'Invoice'),
+    'notification': ('Notification', 'Notification'),
+}
+
+# Fields each tracked model's counters depend on; saves touching none of them are free
+TRACKED_FIELDS = {
+    'request': ('status', 'office_id', 'lawyer_id'),
+    'case': ('status', 'case_type', 'office_id', 'lawyer_id'),
+    'invoice': ('status', 'amount', 'case_id', 'user_id'),
+    'notification': ('is_read', 'office_id'),
+}
+# Invoices have no office of their own; they count towards their case's office and lawyer
+INVOICE_SCOPE = ('case__office_id', 'case__lawyer_id', 'user__office_id')
+
+
+def contributions(kind, state, count=1):
+    """
+    Yield ((office_id, lawyer_id), metric, bucket, amount) for one row, or for
+    `count` rows sharing `state` (whose `amount` is then their sum).
+    """
+    office_id = state.get('office_id')
+    if office_id is None:
+        return
+    scopes = [(office_id, None)]
+    if state.get('lawyer_id'):
+        scopes.append((office_id, state['lawyer_id']))
+
+    items = []
+    if kind == 'request':
+        items.append(('requests_by_status', state['status'] or UNSPECIFIED, count))
+    elif kind == 'case':
+        items.append(('cases_by_status', state['status'] or UNSPECIFIED, count))
+        items.append(('cases_by_type', state['case_type'] or UNSPECIFIED, count))
+    elif kind == 'invoice':
+        if state['status'] == 'Unpaid':
+            items.append(('unpaid_invoices', 'count', count))
+            items.append(('unpaid_invoices', 'total', state['amount'] or 0))
+    elif kind == 'notification':
+        # Recipients are many-to-many, so unread counts are kept per office only
+        scopes = scopes[:1]
+        if not state['is_read']:
+            items.append(('unread_notifications', 'count', count))
+
+    for scope in scopes:
+        for metric, bucket, amount in items:
+            yield scope, metric, bucket, amount
+
+
+def invoice_scope(row):
+    # Prefer the case's office; fall back to the client's for invoices without a case
+    return {
+        'office_id': row['case__office_id'] if row['case__office_id'] is not None else row['user__office_id'],
+        'lawyer_id': row['case__lawyer_id'],
+    }
+
+
+def stored_states(kind, ids):
+    """Return {pk: state} for rows as currently stored."""
+    model = apps.get_model(*MODELS[kind])
+    fields = TRACKED_FIELDS[kind] + (INVOICE_SCOPE if kind == 'invoice' else ())
+    states = {}
+    for row in model.objects.filter(pk__in=ids).values('pk', *fields):
+        if kind == 'invoice':
+            row.update(invoice_scope(row))
+        states[row.pop('pk')] = row
+    return states
+
+
+def instance_states(kind, instances):
+    """Return the states of in-memory instances, looking up invoice scopes in one query."""
+    states = [{field: getattr(instance, field) for field in TRACKED_FIELDS[kind]} for instance in instances]
+    if kind == 'invoice':
+        Case = apps.get_model('Office', 'Case')
+        User = apps.get_model('User', 'User')
+        case_scopes = dict(
+            (pk, (office_id, lawyer_id))
+            for pk, office_id, lawyer_id in Case.objects.filter(
+                pk__in={state['case_id'] for state in states if state['case_id']},
+            ).values_list('pk', 'office_id', 'lawyer_id')
+        )
+        user_offices = dict(User.objects.filter(
+            pk__in={state['user_id'] for state in states if state['user_id'] and state['case_id'] not in case_scopes},
+        ).values_list('pk', 'office_id'))
+        for state in states:
+            office_id, lawyer_id = case_scopes.get(state['case_id'], (None, None))
+            state.update(invoice_scope({
+                'case__office_id': office_id,
+                'case__lawyer_id': lawyer_id,
+                'user__office_id': user_offices.get(state['user_id']),
+            }))
+    return states
+
+
+def case_invoice_states(case_ids):
+    """{pk: state} of the unpaid invoices of these cases, which count towards the cases' office and lawyer."""
+    Invoice = apps.get_model(*MODELS['invoice'])
+    return stored_states('invoice', Invoice.objects.filter(case_id__in=case_ids, status='Unpaid').values('pk'))
+
+
+def record(kind, before=(), after=()):
+    """Move the counters from the `before` states to the `after` states of `kind` rows."""
+    deltas = Counter()
+    for states, sign in ((before, -1), (after, 1)):
+        for state in states:
+            for scope, metric, bucket, amount in contributions(kind, state):
+                deltas[scope, metric, bucket] += sign * amount
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    deltas = {key: amount for key, amount in deltas.items() if amount}
+    if not deltas:
+        return
+    OfficeRollup = apps.get_model('Office', 'OfficeRollup')
+    scopes = {key[0] for key in deltas}
+
+    with transaction.atomic():
+        condition = Q()
+        for office_id, lawyer_id in scopes:
+            condition |= Q(office_id=office_id, lawyer_id=lawyer_id)
+        # Row locks serialize concurrent writers to the same rollup on databases that have them
+        rows = {
+            (row.office_id, row.lawyer_id): row
+            for row in OfficeRollup.objects.select_for_update().filter(condition)
+        }
+        for scope in scopes:
+            row = rows.get(scope) or OfficeRollup(office_id=scope[0], lawyer_id=scope[1], counters={})
+            for (key_scope, metric, bucket), amount in deltas.items():
+                if key_scope == scope:
+                    add(row.counters, metric, bucket, amount)
+            if row.counters or scope[1] is None:
+                row.save()
+            elif row.pk is not None:
+                # As compute_office(), lawyers with nothing left to count have no row
+                row.delete()
+
+
+def add(counters, metric, bucket, amount):
+    buckets = counters.setdefault(metric, {})
+    value = buckets.get(bucket, 0) + amount
+    if isinstance(value, float):
+        value = round(value, 2)
+    if value:
+        buckets[bucket] = value
+    else:
+        buckets.pop(bucket, None)
+        if not buckets:
+            counters.pop(metric)
+
+
+class RollupTracked:
+    """
+    Model mixin that keeps OfficeRollup counters in step with save().
+
+    The stored state is read, the row written and the counters moved in one
+    transaction. A case moved to another office or lawyer moves its
+    invoices' counters along. Deletes are handled by the receivers in
+    Office/signals.py, which Django already runs inside the delete's
+    transaction. bulk_create() and QuerySet.update() bypass both, so callers
+    using them call record() themselves.
+    """
+    rollup_kind = None
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            # update_fields may name a foreign key either way, "office" or "office_id"
+            touched = {name.removesuffix('_id') for name in update_fields}
+            if not touched & {name.removesuffix('_id') for name in TRACKED_FIELDS[self.rollup_kind]}:
+                return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            before = [] if self._state.adding or self.pk is None else \
+                list(stored_states(self.rollup_kind, [self.pk]).values())
+            moved = self.rollup_kind == 'case' and any(
+                (state['office_id'], state['lawyer_id']) != (self.office_id, self.lawyer_id) for state in before
+            )
+            invoices = case_invoice_states([self.pk]) if moved else {}
+            super().save(*args, **kwargs)
+            record(self.rollup_kind, before, instance_states(self.rollup_kind, [self]))
+            if invoices:
+                record('invoice', invoices.values(), stored_states('invoice', invoices).values())
+
+
+def compute_office(office_id, registry=apps):
+    """Recompute every rollup row of one office from the source tables; returns {lawyer_id: counters}."""
+    Request = registry.get_model('Office', 'Request')
+    Case = registry.get_model('Office', 'Case')
+    Invoice = registry.get_model('Invoice', 'Invoice')
+    Notification = registry.get_model('Notification', 'Notification')
+
+    deltas = Counter()
+
+    def collect(kind, rows):
+        for row in rows:
+            count = row.pop('rows')
+            for scope, metric, bucket, amount in contributions(kind, row, count):
+                deltas[scope, metric, bucket] += amount
+
+    collect('request', Request.objects.filter(office_id=office_id)
+            .values('office_id', 'lawyer_id', 'status').annotate(rows=Count('id')).order_by())
+    collect('case', Case.objects.filter(office_id=office_id)
+            .values('office_id', 'lawyer_id', 'status', 'case_type').annotate(rows=Count('id')).order_by())
+    invoices = (
+        Invoice.objects
+        .filter(Q(case__office_id=office_id) | Q(case__isnull=True, user__office_id=office_id), status='Unpaid')
+        .values('case__lawyer_id').annotate(rows=Count('id'), amount=Sum('amount')).order_by()
+    )
+    collect('invoice', (
+        {'office_id': office_id, 'lawyer_id': row['case__lawyer_id'], 'status': 'Unpaid',
+         'amount': row['amount'], 'rows': row['rows']}
+        for row in invoices
+    ))
+    unread = Notification.objects.filter(office_id=office_id, is_read=False).count()
+    collect('notification', [{'office_id': office_id, 'is_read': False, 'rows': unread}] if unread else [])
+
+    counters = {None: {}}
+    for ((_, lawyer_id), metric, bucket), amount in deltas.items():
+        add(counters.setdefault(lawyer_id, {}), metric, bucket, amount)
+    return counters
+
+
+def replace_office(office_id, counters, registry=apps):
+    OfficeRollup = registry.get_model('Office', 'OfficeRollup')
+    with transaction.atomic():
+        OfficeRollup.objects.filter(office_id=office_id).delete()
+        OfficeRollup.objects.bulk_create([
+            OfficeRollup(office_id=office_id, lawyer_id=lawyer_id, counters=values)
+            for lawyer_id, values in counters.items()
+        ])
@@ -0,0 +1,178 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import Q, Value, CharField
+from rest_framework.exceptions import ValidationError
+
+from Office.models import Case, Request
+
+SEARCH_TABLE = 'office_search'
+SEARCH_KINDS = ('case', 'request')
+# (kind, rowid offset, table, column of Office_note pointing at it); rowid = id * 4 + offset
+SEARCH_SOURCES = (
+    ('case', 0, 'Office_case', 'case_id'),
+    ('request', 1, 'Office_request', 'request_id'),
+)
+ENTRY_COLUMNS = 'rowid, kind, object_id, plaintiff_name, defendant_name, case_type, description, notes, office, lawyer'
+TEXT_COLUMNS = '{plaintiff_name defendant_name case_type description notes}'
+MAX_TERMS = 16
+TERM_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def entry_select(kind, offset, parent_column, row):
+    return f"""
+    SELECT {row}.id * 4 + {offset}, '{kind}', {row}.id,
+           {row}.plaintiff_name, {row}.defendant_name, {row}.case_type, {row}.description,
+           (SELECT group_concat(body, ' ') FROM "Office_note" WHERE {parent_column} = {row}.id),
+           'o' || coalesce({row}.office_id, 0), 'l' || coalesce({row}.lawyer_id, 0)
+    """
+
+
+def trigger_statements():
+    """
+    Triggers keeping office_search in step with cases, requests and their
+    notes. They are recreated after every migrate because SQLite drops a
+    table's triggers whenever a migration has to rebuild the table.
+    """
+    statements = []
+    watched = 'plaintiff_name, defendant_name, case_type, description, office_id, lawyer_id'
+    for kind, offset, table, parent_column in SEARCH_SOURCES:
+        insert = f"INSERT INTO {SEARCH_TABLE}({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'NEW')};"
+        delete = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id * 4 + {offset};"
+
+        def refresh(parent):
+            # Re-read the parent row so its notes column is aggregated afresh
+            return (
+                f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {parent}.{parent_column} * 4 + {offset}; "
+                f"INSERT INTO {SEARCH_TABLE}({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'src')} "
+                f"FROM \"{table}\" AS src WHERE src.id = {parent}.{parent_column};"
+            )
+
+        statements += [
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_ai AFTER INSERT ON "{table}" BEGIN {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_ad AFTER DELETE ON "{table}" BEGIN {delete} END',
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_au AFTER UPDATE OF {watched} ON "{table}" '
+            f'BEGIN {delete} {insert} END',
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_note_ai AFTER INSERT ON "Office_note" '
+            f'WHEN NEW.{parent_column} IS NOT NULL BEGIN {refresh("NEW")} END',
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_note_ad AFTER DELETE ON "Office_note" '
+            f'WHEN OLD.{parent_column} IS NOT NULL BEGIN {refresh("OLD")} END',
+            f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{kind}_note_au AFTER UPDATE OF body, {parent_column} '
+            f'ON "Office_note" BEGIN {refresh("OLD")} {refresh("NEW")} END',
+        ]
+    return statements
+
+
+def drop_search_triggers(cursor):
+    cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s", [f'{SEARCH_TABLE}_%'],
+    )
+    for (name,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+
+
+def install_search_index(using='default', rebuild=False):
+    """Create the FTS table and its triggers where missing; with `rebuild`, reindex every row."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN (%s, 'Office_note')", [SEARCH_TABLE],
+        )
+        if cursor.fetchone()[0] < 2:
+            # Migrated back past the search index (0006) or the notes table (0011)
+            return
+        if rebuild:
+            drop_search_triggers(cursor)
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            for kind, offset, table, parent_column in SEARCH_SOURCES:
+                cursor.execute(
+                    f"INSERT INTO {SEARCH_TABLE}({ENTRY_COLUMNS}) {entry_select(kind, offset, parent_column, 'src')} "
+                    f"FROM \"{table}\" AS src"
+                )
+        for statement in trigger_statements():
+            cursor.execute(statement)
+
+
+def search_terms(text):
+    terms = TERM_PATTERN.findall(text or '')[:MAX_TERMS]
+    if not terms:
+        raise ValidationError({'q': ['Enter at least one word to search for.']})
+    return terms
+
+
+def build_match(terms, office_id, lawyer_id=None):
+    # Every term is quoted so user input can never inject FTS5 operators, and
+    # prefix-matched so partially typed names still hit.
+    query = ' '.join(f'"{term}"*' for term in terms)
+    scope = f'office : "o{office_id or 0}"'
+    if lawyer_id is not None:
+        scope += f' AND lawyer : "l{lawyer_id}"'
+    return f'{scope} AND {TEXT_COLUMNS} : ({query})'
+
+
+def search(text, office_id, lawyer_id=None, kind=None, limit=20, offset=0):
+    """
+    Return up to `limit` ranked matches for `text` among one office's cases
+    and requests, as dicts with `type`, `id`, the party names, `case_type`
+    and a highlighted `snippet`.
+    """
+    terms = search_terms(text)
+    if connection.vendor != 'sqlite':
+        return fallback_search(terms, office_id, lawyer_id, kind, limit, offset)
+
+    sql = (
+        f"SELECT kind, object_id, plaintiff_name, defendant_name, case_type, "
+        f"snippet({SEARCH_TABLE}, -1, '[', ']', '...', 12), rank "
+        f"FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s"
+    )
+    params = [build_match(terms, office_id, lawyer_id)]
+    if kind:
+        sql += " AND kind = %s"
+        params.append(kind)
+    sql += " ORDER BY rank LIMIT %s OFFSET %s"
+    params += [limit, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {
+                'type': row[0],
+                'id': row[1],
+                'plaintiff_name': row[2],
+                'defendant_name': row[3],
+                'case_type': row[4],
+                'snippet': row[5],
+                'rank': row[6],
+            }
+            for row in cursor.fetchall()
+        ]
+
+
+def fallback_search(terms, office_id, lawyer_id, kind, limit, offset):
+    # Unranked substring matching for databases without FTS5
+    fields = ('plaintiff_name', 'defendant_name', 'case_type', 'description')
+    querysets = []
+    for name, model in (('case', Case), ('request', Request)):
+        if kind and kind != name:
+            continue
+        queryset = model.objects.filter(office_id=office_id)
+        if lawyer_id is not None:
+            queryset = queryset.filter(lawyer_id=lawyer_id)
+        for term in terms:
+            condition = Q()
+            for field in fields:
+                condition |= Q(**{f'{field}__icontains': term})
+            queryset = queryset.filter(condition)
+        querysets.append(
+            queryset.annotate(type=Value(name, output_field=CharField()))
+            .values('type', 'id', 'plaintiff_name', 'defendant_name', 'case_type')
+        )
+    if not querysets:
+        return []
+    combined = querysets[0].union(*querysets[1:]) if len(querysets) > 1 else querysets[0]
+    return [
+        dict(row, snippet=None, rank=None)
+        for row in combined.order_by('-id')[offset:offset + limit]
+    ]
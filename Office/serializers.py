@@ -1,29 +1,61 @@
+from django.conf import settings
 from rest_framework import serializers
 
-from Office.models import Request, Case, LegalDocument, Document, Office
+from Office.models import Request, Case, LegalDocument, Document, Office, PartySource, Note, UploadSession
+from Office.notes import latest_note_representation, note_summary, with_note_summary
+from Office.parties import DEFAULT_THRESHOLD
 from User.models import User
-from User.serializers import UserSerializer
+from User.serializers import UserListSerializer
+from project.serializers import SparseFieldsMixin
 from .utils import handle_document_upload
 
 
-class RequestSerializer(serializers.ModelSerializer):
+class NoteSerializer(serializers.ModelSerializer):
+    author_name = serializers.CharField(source='author.username', read_only=True, default=None)
+
+    class Meta:
+        model = Note
+        fields = ['id', 'body', 'author', 'author_name', 'created_at']
+        read_only_fields = ['id', 'author', 'created_at']
+
+
+class NoteSummarySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # Rows carry a count and the newest note; the full log is paged from the notes endpoints
+    notes_count = serializers.SerializerMethodField()
+    latest_note = serializers.SerializerMethodField()
+    # Both come from with_note_summary() annotations rather than columns
+    sparse_sources = {'notes_count': (), 'latest_note': ()}
+    values_sources = {'notes_count': ('notes_count', None), 'latest_note': ('latest_note', latest_note_representation)}
+
+    @staticmethod
+    def setup_queryset(queryset):
+        return with_note_summary(queryset)
+
+    def get_notes_count(self, obj):
+        return note_summary(obj)[0]
+
+    def get_latest_note(self, obj):
+        return note_summary(obj)[1]
+
+
+class RequestSerializer(NoteSummarySerializer):
     class Meta:
         model = Request
         fields = [
             'id', 'status', 'request_type', 'description', 'user_id', 'case_id', 'created_at',
-            'case_type', 'location', 'notes', 'plaintiff_name', 'defendant_name', 'national_address',
-            'document_type', 'judgment_document_path', 'office_id','lawyer','case','user','office'
+            'case_type', 'location', 'notes_count', 'latest_note', 'plaintiff_name', 'defendant_name',
+            'national_address', 'document_type', 'judgment_document_path', 'office_id','lawyer','case','user','office'
         ]
         read_only_fields = ['id', 'created_at']
 
 
 # Serializer for Case model
-class CaseSerializer(serializers.ModelSerializer):
+class CaseSerializer(NoteSummarySerializer):
     class Meta:
         model = Case
         fields = [
             'id', 'status', 'plaintiff_name', 'address', 'case_type', 'description',
-            'date', 'time', 'notes', 'user', 'lawyer', 'office'
+            'date', 'time', 'notes_count', 'latest_note', 'user', 'lawyer', 'office'
         ]
         read_only_fields = ['id', 'office', 'user']
 
@@ -35,13 +67,26 @@ class LegalDocumentSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Document
         fields = ['id', 'filename', 'file', 'document_type', 'uploader', 'case', 'request', 'office', 'uploaded_at']
         read_only_fields = ['uploaded_at', 'id']
 
 
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'case', 'filename', 'document_type', 'size', 'received', 'chunks', 'document', 'created_at',
+                  'updated_at']
+        read_only_fields = ['id', 'case', 'received', 'chunks', 'document', 'created_at', 'updated_at']
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.UPLOAD_MAX_SIZE} bytes")
+        return value
+
+
 class CaseDateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Case
@@ -62,15 +107,20 @@ class CaseDateCreateSerializer(serializers.Serializer):
             raise serializers.ValidationError("Case not found or not authorized")
         return value
 
-class LawyerRequestSerializer(serializers.ModelSerializer):
-    user = UserSerializer()
-    documents = DocumentSerializer(many=True)
+class LawyerRequestSerializer(NoteSummarySerializer):
+    user = UserListSerializer()
+    documents = DocumentSerializer(many=True, source='documents_request')
+
+    @staticmethod
+    def setup_queryset(queryset):
+        # Load the nested user and documents up front instead of once per row
+        return with_note_summary(queryset.select_related('user').prefetch_related('documents_request'))
 
     class Meta:
         model = Request
         fields = [
             'id', 'status', 'request_type', 'description', 'user', 'created_at',
-            'case_type', 'location', 'notes', 'plaintiff_name', 'defendant_name', 'documents'
+            'case_type', 'location', 'notes_count', 'latest_note', 'plaintiff_name', 'defendant_name', 'documents'
         ]
 
 
@@ -83,13 +133,26 @@ class ClientSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email', 'phone', 'address', 'gender', 'cases']
 
     def get_cases(self, obj):
-        # Filter cases specific to the logged-in lawyer
-        lawyer_id = self.context['request'].user.id
-        cases = obj.cases.filter(lawyer_id=lawyer_id)
+        # Filter cases specific to the logged-in lawyer; views prefetch them into `lawyer_cases`
+        cases = getattr(obj, 'lawyer_cases', None)
+        if cases is None:
+            lawyer_id = self.context['request'].user.id
+            cases = obj.cases_user.filter(lawyer_id=lawyer_id)
         return CaseSerializer(cases, many=True).data
 
 
 
+class BulkApproveItemSerializer(serializers.Serializer):
+    request_id = serializers.IntegerField()
+    lawyer_id = serializers.IntegerField(required=False, allow_null=True)
+    date = serializers.DateField(required=False, allow_null=True)
+    time = serializers.TimeField(required=False, allow_null=True)
+
+
+class BulkApproveSerializer(serializers.Serializer):
+    items = BulkApproveItemSerializer(many=True, allow_empty=False, max_length=500)
+
+
 class CaseDateUpdateSerializer(serializers.ModelSerializer):
     date = serializers.DateField()
     time = serializers.TimeField()
@@ -112,10 +175,13 @@ class RequestDateUpdateSerializer(serializers.ModelSerializer):
 from rest_framework import serializers
 from .models import Request, Document
 
-class RequestSerializer(serializers.ModelSerializer):
+class RequestSerializer(NoteSummarySerializer):
+    # Appended to the request's notes log; earlier notes are never rewritten
+    note = serializers.CharField(write_only=True, required=False)
+
     class Meta:
         model = Request
-        fields = ['status', 'notes', 'judgment_document_path']  # Add other fields as needed
+        fields = ['status', 'note', 'notes_count', 'latest_note', 'judgment_document_path']  # Add other fields as needed
 
     def validate_status(self, value):
         valid_statuses = ["pending", "in progress", "done", "reject"]
@@ -131,3 +197,43 @@ class RequestSerializer(serializers.ModelSerializer):
             doc = handle_document_upload(document, 'request', self.context['request'].user.id, 'lawyer', self.instance.id)
             validated_data['document'] = doc
         return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        body = validated_data.pop('note', None)
+        instance = super().update(instance, validated_data)
+        if body:
+            request = self.context.get('request')
+            author = request.user if request and request.user.is_authenticated else None
+            Note.objects.create(request=instance, author=author, body=body)
+            # Any loaded summary is now stale; note_summary() reads it afresh
+            instance.__dict__.pop('notes_count', None)
+            instance.__dict__.pop('latest_note', None)
+        return instance
+
+
+# Field rules for bulk intake imports; rows are validated field by field, see Office/importers.py
+class RequestImportSerializer(RequestSerializer):
+    notes = serializers.ListField(child=serializers.CharField(), required=False)
+    user_id = serializers.IntegerField(required=False, allow_null=True)
+    lawyer_id = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta(RequestSerializer.Meta):
+        fields = [
+            'status', 'request_type', 'description', 'case_type', 'location', 'notes', 'plaintiff_name',
+            'defendant_name', 'national_address', 'document_type', 'judgment_document_path', 'user_id', 'lawyer_id',
+        ]
+
+
+class ConflictCheckSerializer(serializers.Serializer):
+    name = serializers.CharField(required=False, max_length=255)
+    request_id = serializers.IntegerField(required=False)
+    roles = serializers.ListField(
+        child=serializers.ChoiceField(choices=PartySource.RoleChoices.choices), required=False,
+    )
+    threshold = serializers.FloatField(required=False, min_value=0.1, max_value=1.0, default=DEFAULT_THRESHOLD)
+    limit = serializers.IntegerField(required=False, min_value=1, max_value=100, default=20)
+
+    def validate(self, attrs):
+        if not attrs.get('name') and not attrs.get('request_id'):
+            raise serializers.ValidationError("Provide a name or a request_id to check.")
+        return attrs
@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+
+from Invoice.models import Invoice
+from Notification.models import Notification
+from Office.models import Case, Request, Note, LegalDocument, Document
+from Office.parties import index_parties, unindex_parties
+from Office.rollups import record, instance_states, case_invoice_states, stored_states
+from User.models import User
+from project.cache import bump
+from project.images import schedule_variants
+from project.storage import blob_fields, release
+
+# Saves that touch none of these fields (e.g. last_login on sign-in) leave the party index alone
+PARTY_FIELDS = {
+    'case': {'plaintiff_name', 'defendant_name', 'office', 'office_id'},
+    'request': {'plaintiff_name', 'defendant_name', 'office', 'office_id'},
+    'user': {'username', 'email', 'user_type', 'office', 'office_id'},
+}
+
+
+def party_columns(sender):
+    return sorted(name for name in PARTY_FIELDS[sender._meta.model_name] if name != 'office')
+
+
+@receiver(pre_save, sender=Case)
+@receiver(pre_save, sender=Request)
+@receiver(pre_save, sender=User)
+def remember_party_fields(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not PARTY_FIELDS[sender._meta.model_name] & set(update_fields):
+        return
+    # The names before this save, so saves that change none of them skip the reindex
+    instance._party_fields = sender._default_manager.filter(pk=instance.pk).values(*party_columns(sender)).first()
+
+
+@receiver(post_save, sender=Case)
+@receiver(post_save, sender=Request)
+@receiver(post_save, sender=User)
+def reindex_parties(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    stored = instance.__dict__.pop('_party_fields', None)
+    if raw:
+        return
+    if update_fields is not None and not PARTY_FIELDS[sender._meta.model_name] & set(update_fields):
+        return
+    if created and sender is User and instance.user_type != 'user':
+        return
+    if stored is not None and all(stored[name] == getattr(instance, name) for name in stored):
+        return
+    index_parties([instance])
+
+
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Request)
+@receiver(post_delete, sender=User)
+def drop_parties(sender, instance, **kwargs):
+    unindex_parties([instance])
+
+
+@receiver(post_delete, sender=Case)
+@receiver(post_delete, sender=Request)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=Notification)
+def drop_from_rollups(sender, instance, **kwargs):
+    # Runs inside the delete's transaction, including cascades
+    record(instance.rollup_kind, before=instance_states(instance.rollup_kind, [instance]))
+
+
+@receiver(pre_delete, sender=Case)
+def remember_case_invoices(sender, instance, **kwargs):
+    # Deleting the case nulls Invoice.case with an UPDATE that sends no signals
+    instance._invoice_states = case_invoice_states([instance.pk])
+
+
+@receiver(post_delete, sender=Case)
+def move_case_invoices(sender, instance, **kwargs):
+    # Unpaid invoices now count towards their client's office, without a lawyer
+    before = instance.__dict__.pop('_invoice_states', {})
+    if before:
+        record('invoice', before.values(), stored_states('invoice', before).values())
+
+
+# Cached response topics (project/cache.py) each model feeds. Saves touching only these fields leave them alone.
+CACHE_TOPICS = {
+    Request: 'requests',
+    Note: 'requests',
+    User: 'users',
+    Invoice: 'invoices',
+    LegalDocument: 'legal_documents',
+}
+UNCACHED_FIELDS = {'last_login'}
+
+
+def cached_office_id(instance):
+    # Notes, invoices and legal documents belong to an office through their parent
+    if isinstance(instance, Note):
+        if instance.request_id is None:
+            return None
+        return Request.objects.filter(pk=instance.request_id).values_list('office_id', flat=True).first()
+    if isinstance(instance, Invoice):
+        return User.objects.filter(pk=instance.user_id).values_list('office_id', flat=True).first()
+    if isinstance(instance, LegalDocument):
+        return User.objects.filter(pk=instance.admin_id).values_list('office_id', flat=True).first()
+    return instance.office_id
+
+
+@receiver(post_save, sender=Request)
+@receiver(post_save, sender=Note)
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=LegalDocument)
+def expire_cached_responses(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or (update_fields is not None and set(update_fields) <= UNCACHED_FIELDS):
+        return
+    office_id = cached_office_id(instance)
+    if office_id is not None or sender is User:
+        bump(office_id, CACHE_TOPICS[sender])
+
+
+@receiver(post_delete, sender=Request)
+@receiver(post_delete, sender=Note)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=LegalDocument)
+def expire_cached_responses_on_delete(sender, instance, **kwargs):
+    expire_cached_responses(sender, instance)
+
+
+def stored_file_fields(sender, update_fields=None):
+    return [
+        field for model, field in blob_fields()
+        if model is sender and (update_fields is None or field.name in update_fields)
+    ]
+
+
+@receiver(pre_save, sender=Document)
+@receiver(pre_save, sender=LegalDocument)
+@receiver(pre_save, sender=User)
+def remember_stored_files(sender, instance, update_fields=None, raw=False, **kwargs):
+    fields = stored_file_fields(sender, update_fields)
+    if raw or instance._state.adding or not fields:
+        return
+    # The names before this save, to release those it replaces once saved
+    instance._stored_files = sender._default_manager.filter(pk=instance.pk).values(
+        *[field.attname for field in fields]
+    ).first() or {}
+
+
+@receiver(post_save, sender=Document)
+@receiver(post_save, sender=LegalDocument)
+@receiver(post_save, sender=User)
+def after_files_saved(sender, instance, created=False, raw=False, **kwargs):
+    stored = instance.__dict__.pop('_stored_files', {})
+    if raw:
+        return
+    for field in stored_file_fields(sender):
+        name, current = stored.get(field.attname), getattr(instance, field.attname).name
+        if name and name != current:
+            transaction.on_commit(lambda storage=field.storage, name=name: release(storage, name))
+        if current and (created or field.attname in stored) and name != current:
+            # A new file: resize it in the background when it is an image
+            transaction.on_commit(lambda storage=field.storage, name=current: schedule_variants(storage, name))
+
+
+@receiver(post_delete, sender=Document)
+@receiver(post_delete, sender=LegalDocument)
+@receiver(post_delete, sender=User)
+def release_deleted_files(sender, instance, **kwargs):
+    # Blobs are shared between rows; release() keeps those still referenced
+    for field in stored_file_fields(sender):
+        name = getattr(instance, field.attname).name
+        if name:
+            transaction.on_commit(lambda storage=field.storage, name=name: release(storage, name))
@@ -0,0 +1,148 @@
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from Office.models import Case, Document, UploadSession
+from project.storage import BLOB_DIR
+
+# Partial files live beside the blobs, so finalizing moves them instead of copying
+PARTIAL_DIR = 'partial'
+# Bytes read from the request per write; a chunk is never held in memory whole
+READ_SIZE = 64 * 1024
+
+
+class OffsetMismatch(ValueError):
+    """A chunk that does not start where the stored bytes end."""
+
+    def __init__(self, expected):
+        super().__init__(f"Chunk must start at offset {expected}")
+        self.expected = expected
+
+
+class PartialFile(File):
+    """The assembled bytes of an upload, which storage can move into place."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def partial_path(session):
+    return default_storage.path(f'{PARTIAL_DIR}/{session.id}')
+
+
+def append_chunk(session, number, offset, stream):
+    """
+    Write chunk `number`, read from `stream` a block at a time, at `offset`
+    and return the session as updated. A chunk sent again after its
+    response was lost is accepted without being written twice.
+    """
+    if session.document_id:
+        raise ValueError("Upload is already finalized")
+    if offset < session.received and number <= session.chunks:
+        return session
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+    if number != session.chunks + 1:
+        raise ValueError(f"Expected chunk {session.chunks + 1}")
+
+    limit = min(settings.UPLOAD_CHUNK_MAX_SIZE, session.size - offset)
+    path = partial_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    written = 0
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT, 0o600), 'r+b') as part:
+        part.seek(offset)
+        while block := stream.read(READ_SIZE):
+            written += len(block)
+            if written > limit:
+                raise ValueError(f"Chunk must not be larger than {limit} bytes")
+            part.write(block)
+        # Drop what an earlier, interrupted attempt left past this chunk
+        part.truncate(offset + written)
+    if not written:
+        raise ValueError("Chunk is empty")
+
+    # Only one of two concurrent copies of a chunk moves the offset
+    UploadSession.objects.filter(pk=session.pk, received=offset).update(
+        received=offset + written, chunks=number, updated_at=timezone.now(),
+    )
+    session.refresh_from_db()
+    return session
+
+
+def finalize(session):
+    """Create the session's Document from its assembled bytes, once; return it."""
+    if session.document_id:
+        return session.document
+    if session.received != session.size:
+        raise ValueError(f"Received {session.received} of {session.size} bytes")
+
+    path = partial_path(session)
+    try:
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().get(pk=session.pk)
+            if session.document_id:
+                return session.document
+            with open(path, 'rb') as part:
+                document = Document.objects.create(
+                    filename=session.filename,
+                    file=PartialFile(part, name=session.filename),
+                    document_type=session.document_type,
+                    uploader_id=session.uploader_id,
+                    case_id=session.case_id,
+                    office_id=Case.objects.filter(pk=session.case_id).values_list('office_id', flat=True).first(),
+                )
+            session.document = document
+            session.save(update_fields=['document', 'updated_at'])
+    except FileNotFoundError:
+        # Storage moves the partial file, and a finalize rolled back after that does not move it back
+        session.refresh_from_db()
+        if session.document_id:
+            return session.document
+        UploadSession.objects.filter(pk=session.pk, document__isnull=True).update(
+            received=0, chunks=0, updated_at=timezone.now(),
+        )
+        raise ValueError("The uploaded bytes were lost; upload the file again from offset 0")
+    # Still there when storage already held the same bytes
+    discard_partial(session)
+    return document
+
+
+def discard_partial(session):
+    try:
+        os.remove(partial_path(session))
+    except FileNotFoundError:
+        pass
+
+
+def collect_abandoned(now=None):
+    """
+    Delete sessions idle for longer than UPLOAD_SESSION_IDLE_SECONDS with
+    their partial files, and the temporary files no session or upload owns
+    any more. Return the number of sessions deleted.
+    """
+    cutoff = (now or timezone.now()) - timedelta(seconds=settings.UPLOAD_SESSION_IDLE_SECONDS)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in stale:
+        discard_partial(session)
+    UploadSession.objects.filter(pk__in=[session.pk for session in stale]).delete()
+
+    # Partial files of sessions that are gone, and blobs interrupted mid-write (project/storage.py)
+    live = {str(pk) for pk in UploadSession.objects.values_list('pk', flat=True)}
+    leftovers = [
+        (PARTIAL_DIR, lambda name: name not in live),
+        (BLOB_DIR, lambda name: name.startswith('.upload-')),
+    ]
+    for directory, orphaned in leftovers:
+        directory = default_storage.path(directory)
+        if not os.path.isdir(directory):
+            continue
+        for entry in os.scandir(directory):
+            # Old enough that no request can still be writing it
+            if entry.is_file() and orphaned(entry.name) and entry.stat().st_mtime < cutoff.timestamp():
+                os.remove(entry.path)
+    return len(stale)
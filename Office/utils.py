@@ -1,37 +1,239 @@
+from datetime import datetime, time
+
+from django.db import models, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
 from Notification.models import Notification
+from User.models import User
+from project.cache import bump
 
 
 class NotificationService:
     @staticmethod
     def create_notification(message, notification_type, sender_id, sender_type, recipient_id, recipient_type, related_object_type, related_object_id):
         # Assuming a Notification model exists with the specified fields
-        Notification.objects.create(
+        notification = Notification.objects.create(
             message=message,
             notification_type=notification_type,
             sender_id=sender_id,
             sender_type=sender_type,
-            recipient_id=recipient_id,
             recipient_type=recipient_type,
             related_object_type=related_object_type,
             related_object_id=related_object_id
         )
+        if recipient_id:
+            notification.recipient.add(recipient_id)
+        return notification
+
+    @staticmethod
+    def create_notifications(specs):
+        # Batch variant: `specs` are dicts of create_notification's arguments (plus an optional office_id)
+        specs = list(specs)
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                message=spec['message'],
+                notification_type=spec['notification_type'],
+                sender_id=spec['sender_id'],
+                sender_type=spec['sender_type'],
+                recipient_type=spec['recipient_type'],
+                office_id=spec.get('office_id'),
+                related_object_type=spec['related_object_type'],
+                related_object_id=spec['related_object_id'],
+            )
+            for spec in specs
+        ])
+        through = Notification.recipient.through
+        through.objects.bulk_create([
+            through(notification_id=notification.id, user_id=spec['recipient_id'])
+            for notification, spec in zip(notifications, specs)
+            if spec['recipient_id']
+        ])
+        record('notification', after=instance_states('notification', notifications))
+        return notifications
 
 
-from .models import Document
+from .models import Document, Hearing, Case, Request, Note
+from .parties import index_parties
+from .rollups import record, instance_states
 
 
 def handle_document_upload(file, document_type, uploader_id, uploader_type, associated_id):
     try:
+        # The document belongs to the case or request it was uploaded for, and to its office
+        parent = 'request' if document_type == 'request' else 'case'
+        model = Request if parent == 'request' else Case
+        office_id = model.objects.filter(pk=associated_id).values_list('office_id', flat=True).first()
+
         # Create Document record in DB with file upload
         document = Document.objects.create(
             filename=file.name,
-            file=file,  # Store the file using Django's FileField
+            file=file,  # Stored once per distinct content, see project/storage.py
             document_type=document_type,
             uploader_id=uploader_id,
-            uploader_type=uploader_type,
-            associated_id=associated_id
+            office_id=office_id,
+            **{f'{parent}_id': associated_id}
         )
 
         return document
     except Exception as e:
         return None
+
+
+def schedule_hearing(case, date, time_of_day):
+    # Add a hearing to the case from the date/time pair the clients send. Earlier hearings are kept, a case
+    # is heard in several sessions; setting the same date again does not add it twice.
+    starts_at = timezone.make_aware(datetime.combine(date, time_of_day or time.min))
+    hearing, _ = Hearing.objects.get_or_create(case=case, starts_at=starts_at)
+    return hearing
+
+
+def parse_schedule_window(query_params):
+    """
+    Read the optional `from`/`to` query parameters as an aware datetime range.
+
+    Both accept an ISO date or datetime; a bare `to` date includes that whole day.
+    """
+    window = []
+    for name in ('from', 'to'):
+        value = query_params.get(name)
+        if not value:
+            window.append(None)
+            continue
+        try:
+            # Dates first: parse_datetime reads a bare date as its midnight
+            moment = parse_date(value) or parse_datetime(value)
+        except ValueError:
+            moment = None
+        if moment is None:
+            raise ValidationError({name: "Enter a valid ISO date or datetime."})
+        if not isinstance(moment, datetime):
+            moment = datetime.combine(moment, time.max if name == 'to' else time.min)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        window.append(moment)
+    if window[0] and window[1] and window[0] > window[1]:
+        raise ValidationError({'to': "Must not be before `from`."})
+    return window
+
+
+def build_case_from_request(req, lawyer_id=None, date=None, time_of_day=None):
+    # Unsaved Case carrying over the intake details of an approved request
+    return Case(
+        status="Open",
+        date=str(date) if date else None,
+        time=str(time_of_day) if time_of_day else None,
+        lawyer_id=lawyer_id or req.lawyer_id,
+        plaintiff_name=req.plaintiff_name,
+        defendant_name=req.defendant_name,
+        address=req.national_address or req.location,
+        case_type=req.case_type,
+        description=req.description,
+        office_id=req.office_id,
+        user_id=req.user_id,
+    )
+
+
+def approve_requests(items, office_id, approver):
+    """
+    Approve many requests of one office in a single transaction.
+
+    `items` are dicts with `request_id` and optional `lawyer_id`, `date` and `time`.
+    Returns one result dict per item, in order, with either `case_id` or `errors`.
+    """
+    results = [{"request_id": item['request_id'], "success": False} for item in items]
+
+    with transaction.atomic():
+        request_ids = [item['request_id'] for item in items]
+        requests = Request.objects.select_for_update().filter(id__in=request_ids, office_id=office_id).in_bulk()
+        lawyer_ids = {item['lawyer_id'] for item in items if item.get('lawyer_id')}
+        office_lawyers = set(
+            User.objects.filter(id__in=lawyer_ids, office_id=office_id, user_type='lawyer').values_list('id', flat=True)
+        )
+
+        approved = []
+        seen = set()
+        for result, item in zip(results, items):
+            req = requests.get(item['request_id'])
+            if req is None:
+                result['errors'] = ["Request not found or not in your office."]
+            elif item['request_id'] in seen:
+                result['errors'] = ["Request appears more than once in this batch."]
+            elif req.status == "Approved" or req.case_id:
+                result['errors'] = ["Request is already approved."]
+            elif item.get('lawyer_id') and item['lawyer_id'] not in office_lawyers:
+                result['errors'] = ["Lawyer not found in your office."]
+            else:
+                approved.append((result, item, req))
+            seen.add(item['request_id'])
+
+        if not approved:
+            return results
+
+        cases = Case.objects.bulk_create([
+            build_case_from_request(req, item.get('lawyer_id'), item.get('date'), item.get('time'))
+            for _, item, req in approved
+        ])
+        # bulk_create and update() skip save(), so the party index and rollups are updated here
+        index_parties(cases)
+        record('case', after=instance_states('case', cases))
+        record(
+            'request',
+            before=instance_states('request', [req for _, _, req in approved]),
+            after=[
+                {'status': "Approved", 'office_id': req.office_id, 'lawyer_id': case.lawyer_id}
+                for (_, _, req), case in zip(approved, cases)
+            ],
+        )
+
+        bump(office_id, 'requests')
+
+        # One UPDATE links every request to its new case
+        case_ids = {req.id: case.id for (_, _, req), case in zip(approved, cases)}
+        Request.objects.filter(id__in=case_ids).update(
+            status="Approved",
+            # update() skips auto_now
+            updated_at=timezone.now(),
+            case_id=models.Case(
+                *[models.When(id=request_id, then=models.Value(case_id)) for request_id, case_id in case_ids.items()],
+                output_field=models.BigIntegerField(),
+            ),
+            lawyer_id=models.Case(
+                *[models.When(id=req.id, then=models.Value(case.lawyer_id)) for (_, _, req), case in zip(approved, cases)],
+                output_field=models.BigIntegerField(),
+            ),
+        )
+
+        # The new cases start with a copy of their requests' notes, oldest first
+        Note.objects.bulk_create([
+            Note(case_id=case_ids[note.request_id], author_id=note.author_id, body=note.body)
+            for note in Note.objects.filter(request_id__in=case_ids).order_by('id')
+        ])
+
+        Hearing.objects.bulk_create([
+            Hearing(case=case, starts_at=timezone.make_aware(datetime.combine(item['date'], item.get('time') or time.min)))
+            for (_, item, _), case in zip(approved, cases)
+            if item.get('date')
+        ])
+
+        notifications = []
+        for (result, item, req), case in zip(approved, cases):
+            result['success'] = True
+            result['case_id'] = case.id
+            for recipient_id, recipient_type in ((req.user_id, 'user'), (case.lawyer_id, 'lawyer')):
+                if recipient_id:
+                    notifications.append({
+                        "message": f"Request {req.id} approved as case {case.id}",
+                        "notification_type": 'system',
+                        "sender_id": approver.id,
+                        "sender_type": 'admin',
+                        "recipient_id": recipient_id,
+                        "recipient_type": recipient_type,
+                        "office_id": office_id,
+                        "related_object_type": 'case',
+                        "related_object_id": case.id,
+                    })
+        NotificationService.create_notifications(notifications)
+
+    return results
@@ -1,57 +1,121 @@
+import io
+import json
 import logging
-
-from django.http import Http404
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+from django.db.models import Q, Max, Count
+from django.http import Http404, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework.exceptions import NotFound
 from rest_framework.generics import ListCreateAPIView, RetrieveUpdateDestroyAPIView, UpdateAPIView, ListAPIView, \
     get_object_or_404
+from rest_framework.pagination import _positive_int
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from Office.models import Request, LegalDocument, Case, Document, Office
+from Office.models import Request, LegalDocument, Case, Document, Office, Hearing, OfficeRollup, Note, UploadSession
 from Office.serializers import RequestSerializer, LegalDocumentSerializer, DocumentSerializer, CaseDateCreateSerializer, \
-    LawyerRequestSerializer, CaseDateUpdateSerializer, RequestDateUpdateSerializer, CaseSerializer
+    LawyerRequestSerializer, CaseDateUpdateSerializer, RequestDateUpdateSerializer, CaseSerializer, \
+    BulkApproveItemSerializer, BulkApproveSerializer, ConflictCheckSerializer, NoteSerializer, UploadSessionSerializer
 from User.models import User
 
-from User.permission import AdminRequiredPermission, LawyerRequiredPermission, UserRequiredPermission
+from project.cache import cache_response, cache_stats
+from project.conditional import ConditionalGetMixin, conditional_get
+from project.downloads import file_response
+from project.images import ensure_variant, find_image
+from project.pagination import KeysetPagination
+from project.renderers import StreamingListMixin
+from project.serializers import CompiledListViewMixin, SparseFieldsViewMixin, compiled_data
+from User.permission import AdminRequiredPermission, LawyerRequiredPermission, UserRequiredPermission, \
+    StaffRequiredPermission
+from User.revocation import store as revocations
 from User.serializers import OfficeSerializer
-from .utils import handle_document_upload, NotificationService
-
-
-class RequestListView(ListAPIView):
+from .ics import calendar_stream
+from .importers import detect_format, iter_rows, import_requests
+from .notes import note_summary, with_note_summary
+from .parties import find_conflicts
+from .search import SEARCH_KINDS, search
+from .uploads import OffsetMismatch, append_chunk, discard_partial, finalize
+from .utils import handle_document_upload, NotificationService, schedule_hearing, parse_schedule_window, \
+    approve_requests
+
+# What request and case rows render from other tables, folded into their ETags
+REQUEST_NOTES = {'notes_at': Max('notes_request__created_at')}
+CASE_NOTES = {'notes_at': Max('notes_case__created_at')}
+REQUEST_DOCUMENTS = {
+    'documents_count': Count('documents_request', distinct=True),
+    'documents_at': Max('documents_request__updated_at'),
+}
+OFFICE_FIELDS = {'office_name': Max('office__office_name'), 'office_address': Max('office__address')}
+# Nested clients (UserListSerializer) change without touching the request row
+REQUEST_USERS = {'users_at': Max('user__updated_at')}
+
+
+class RequestListView(
+    ConditionalGetMixin, StreamingListMixin, CompiledListViewMixin, SparseFieldsViewMixin, ListAPIView,
+):
     permission_classes = [IsAuthenticated, AdminRequiredPermission]
     serializer_class = RequestSerializer
+    conditional_aggregates = REQUEST_NOTES
+
+    @cache_response('requests')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         # Filter requests by the current admin's office
-        return Request.objects.filter(office_id=self.request.user.office_id)
+        return with_note_summary(Request.objects.filter(office_id=self.request.user.office_id))
 
 
-class RequestCreateView(ListAPIView):
+class RequestCreateView(
+    ConditionalGetMixin, StreamingListMixin, CompiledListViewMixin, SparseFieldsViewMixin, ListAPIView,
+):
     permission_classes = [IsAuthenticated, AdminRequiredPermission]
     serializer_class = RequestSerializer
+    conditional_aggregates = REQUEST_NOTES
+
+    @cache_response('requests')
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
 
     def get_queryset(self):
         # Filter requests by the current admin's office
-        return Request.objects.filter(office_id=self.request.user.office_id)
+        return with_note_summary(Request.objects.filter(office_id=self.request.user.office_id))
 
 
-class RequestUserCreateView(ListAPIView):
+class RequestUserCreateView(
+    ConditionalGetMixin, StreamingListMixin, CompiledListViewMixin, SparseFieldsViewMixin, ListAPIView,
+):
     permission_classes = [IsAuthenticated, UserRequiredPermission]
     serializer_class = RequestSerializer
+    conditional_aggregates = REQUEST_NOTES
 
     def get_queryset(self):
         # Filter requests by the current admin's office
-        return Request.objects.filter(office_id=self.request.user.office_id)
+        return with_note_summary(Request.objects.filter(office_id=self.request.user.office_id))
 
-class RequestDetailView(RetrieveUpdateDestroyAPIView):
+class RequestDetailView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     queryset = Request.objects.all()
     serializer_class = RequestSerializer
     permission_classes = [IsAuthenticated, AdminRequiredPermission]  # Only authenticated admins can access
+    conditional_aggregates = REQUEST_NOTES
+    conditional_detail = True
+
+    def get_conditional_queryset(self):
+        return Request.objects.filter(id=self.kwargs.get("pk"), office_id=self.request.user.office_id)
 
     def get_object(self):
-        request_id = self.kwargs.get("request_id")
+        request_id = self.kwargs.get("pk")
         try:
-            req = Request.objects.get(id=request_id)
+            req = with_note_summary(Request.objects).get(id=request_id)
             if req.office_id != self.request.user.office_id:  # Check that office matches
                 raise NotFound("Request not found")
             return req
@@ -59,15 +123,20 @@ class RequestDetailView(RetrieveUpdateDestroyAPIView):
             raise NotFound("Request not found")
 
 
-class LawyerRequestDetailView(RetrieveUpdateDestroyAPIView):
+class LawyerRequestDetailView(ConditionalGetMixin, RetrieveUpdateDestroyAPIView):
     queryset = Request.objects.all()
     serializer_class = RequestSerializer
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]  # Only authenticated admins can access
+    conditional_aggregates = REQUEST_NOTES
+    conditional_detail = True
+
+    def get_conditional_queryset(self):
+        return Request.objects.filter(id=self.kwargs.get("pk"), office_id=self.request.user.office_id)
 
     def get_object(self):
-        request_id = self.kwargs.get("request_id")
+        request_id = self.kwargs.get("pk")
         try:
-            req = Request.objects.get(id=request_id)
+            req = with_note_summary(Request.objects).get(id=request_id)
             if req.office_id != self.request.user.office_id:  # Check that office matches
                 raise NotFound("Request not found")
             return req
@@ -78,6 +147,10 @@ class LegalDocumentListCreateView(ListCreateAPIView):
     permission_classes = [IsAuthenticated, AdminRequiredPermission]
     serializer_class = LegalDocumentSerializer
 
+    @cache_response('legal_documents', per_user=True)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
     def get_queryset(self):
         # Only retrieve documents belonging to the current admin user
         return LegalDocument.objects.filter(admin_id=self.request.user.id)
@@ -92,68 +165,35 @@ class ApproveRequestAPIView(UpdateAPIView):
     serializer_class = RequestSerializer
     permission_classes = [IsAuthenticated, AdminRequiredPermission]  # Requires both authentication and admin status
 
-    def get_queryset(self):
-        # Retrieve the Request object based on request_id and ensure the user is authorized for their office
-        request_id = self.kwargs['request_id']
-        req = Request.objects.filter(id=request_id, office_id=self.request.user.office_id).first()
-        if not req:
+    def update(self, request, *args, **kwargs):
+        # A single approval is a batch of one
+        data = request.data.copy()
+        data['request_id'] = self.kwargs['request_id']
+        item = BulkApproveItemSerializer(data=data)
+        item.is_valid(raise_exception=True)
+
+        result = approve_requests([item.validated_data], request.user.office_id, request.user)[0]
+        if result['success']:
+            return Response({"message": "Request approved and case created successfully"}, status=status.HTTP_200_OK)
+        if not Request.objects.filter(id=result['request_id'], office_id=request.user.office_id).exists():
             raise Http404("Request not found or not in your office.")
-        return req
-
-    def perform_update(self, serializer):
-        req = self.get_object()
-
-        # Get the data from the request
-        data = self.request.data
-        date = data.get("date")
-        time = data.get("time")
-        lawyer_id = data.get("lawyer_id")
-
-        # Create case data from the request instance
-        case_data = {
-            "status": "Open",
-            "date": date,
-            "time": time,
-            "lawyer_id": lawyer_id,
-        }
+        return Response({"errors": result['errors']}, status=status.HTTP_400_BAD_REQUEST)
 
-        request_attrs = [
-            "plaintiff_name",
-            "defendant_name",
-            "national_address",
-            "case_type",
-            "description",
-            "address",
-            "notes",
-            "document_type",
-            "office_id",
-            "user_id",
-        ]
-
-        for attr in request_attrs:
-            value = getattr(req, attr, None)
-            if value is not None:
-                case_data["defendant" if attr == "defendant_name" else attr] = value
-
-        judgment_document_paths = req.judgment_document_path
-        if judgment_document_paths:
-            case_data["judgment_document_path"] = judgment_document_paths
-
-        # Create the new case
-        new_case = Case.objects.create(**case_data)
-
-        # Update the request's status and associate it with the new case
-        req.status = "Approved"
-        req.case_id = new_case.id
-        req.save()
-
-        # Save the updated request object with new case association
-        serializer.save()
 
-    def update(self, request, *args, **kwargs):
-        # Call perform_update to process the case creation and request update
-        self.perform_update(self.get_serializer())
-        return Response({"message": "Request approved and case created successfully"}, status=status.HTTP_200_OK)
+class BulkApproveRequestsAPIView(APIView):
+    permission_classes = [IsAuthenticated, AdminRequiredPermission]
+
+    def post(self, request, *args, **kwargs):
+        serializer = BulkApproveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        # Lock, validate and approve every item together; each item reports its own outcome
+        results = approve_requests(serializer.validated_data['items'], request.user.office_id, request.user)
+        return Response({
+            "approved": sum(1 for result in results if result['success']),
+            "failed": sum(1 for result in results if not result['success']),
+            "results": results,
+        }, status=status.HTTP_200_OK)
 
 
 from rest_framework import status
@@ -227,19 +267,21 @@ class CreateUserDateView(APIView):
             case.date = date
             case.time = time
             case.save()
+            schedule_hearing(case, date, time)
 
             return Response({"message": "Date created successfully"}, status=status.HTTP_201_CREATED)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class LawyerRequestListView(ListAPIView):
+class LawyerRequestListView(ConditionalGetMixin, StreamingListMixin, SparseFieldsViewMixin, ListAPIView):
     serializer_class = LawyerRequestSerializer
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+    conditional_aggregates = {**REQUEST_NOTES, **REQUEST_DOCUMENTS, **REQUEST_USERS}
 
     def get_queryset(self):
         # Filter requests by the current lawyer's ID
-        return Request.objects.filter(lawyer_id=self.request.user.id)
+        return LawyerRequestSerializer.setup_queryset(Request.objects.filter(lawyer_id=self.request.user.id))
 
 
 
@@ -258,6 +300,8 @@ class CaseDateCreateView(CreateAPIView):
         serializer = self.get_serializer(case, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        if 'date' in serializer.validated_data:
+            schedule_hearing(case, serializer.validated_data['date'], serializer.validated_data.get('time'))
 
         # Create the notification
         NotificationService.create_notification(
@@ -337,17 +381,7 @@ class CaseDocumentUploadView(APIView):
                 logger.info(f"Document uploaded: {document.file.url}")  # Get the file URL
 
                 # Send notification to the user
-                notification_data = {
-                    "message": f"New document uploaded for case {case_id}",
-                    "sender_id": request.user.id,
-                    "sender_type": 'lawyer',
-                    "recipient_id": case.user_id,  # Notify the user associated with the case
-                    "recipient_type": 'user',
-                    "notification_type": 'new_case_document',
-                    "related_object_type": 'case',
-                    "related_object_id": case_id
-                }
-                NotificationService.create_notification(**notification_data)
+                notify_case_document(case, request.user.id)
 
                 return Response({"message": "File uploaded successfully", "document_id": document.id},
                                 status=status.HTTP_201_CREATED)
@@ -360,17 +394,177 @@ class CaseDocumentUploadView(APIView):
                             status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def notify_case_document(case, sender_id):
+    notification_data = {
+        "message": f"New document uploaded for case {case.id}",
+        "sender_id": sender_id,
+        "sender_type": 'lawyer',
+        "recipient_id": case.user_id,  # Notify the user associated with the case
+        "recipient_type": 'user',
+        "notification_type": 'new_case_document',
+        "related_object_type": 'case',
+        "related_object_id": case.id
+    }
+    NotificationService.create_notification(**notification_data)
+
+
+# Resumable uploads of large case documents (Office/uploads.py): create a session, PUT its
+# chunks in order with an Upload-Offset header, then finalize it into a Document
+class UploadSessionCreateView(APIView):
+    permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+
+    def post(self, request, case_id, *args, **kwargs):
+        case = Case.objects.filter(id=case_id, lawyer_id=request.user.id).first()
+        if case is None:
+            return Response({"error": "Case not found or not authorized"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = UploadSessionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        session = serializer.save(uploader=request.user, case=case)
+        return Response(UploadSessionSerializer(session).data, status=status.HTTP_201_CREATED)
+
+
+class UploadSessionView(APIView):
+    permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+
+    def get_session(self):
+        return get_object_or_404(UploadSession, pk=self.kwargs['upload_id'], uploader_id=self.request.user.id)
+
+    def get(self, request, *args, **kwargs):
+        # Where to resume from
+        return Response(UploadSessionSerializer(self.get_session()).data)
+
+    def delete(self, request, *args, **kwargs):
+        session = self.get_session()
+        discard_partial(session)
+        session.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class UploadChunkView(UploadSessionView):
+    http_method_names = ['put', 'options']
+
+    def put(self, request, upload_id, number, *args, **kwargs):
+        session = self.get_session()
+        try:
+            offset = int(request.headers.get('Upload-Offset', ''))
+        except ValueError:
+            return Response({"error": "Upload-Offset header must give the chunk's byte offset"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # The body is read straight from the connection, never parsed or buffered whole
+        try:
+            session = append_chunk(session, number, offset, request.stream or io.BytesIO())
+        except OffsetMismatch as e:
+            return Response({"error": str(e), "offset": e.expected}, status=status.HTTP_409_CONFLICT)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(UploadSessionSerializer(session).data)
+
+
+class UploadFinalizeView(UploadSessionView):
+    http_method_names = ['post', 'options']
+
+    def post(self, request, *args, **kwargs):
+        session = self.get_session()
+        finalized = session.document_id is not None
+        try:
+            document = finalize(session)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if finalized:
+            return Response({"message": "File uploaded successfully", "document_id": document.id})
+
+        notify_case_document(session.case, request.user.id)
+        return Response({"message": "File uploaded successfully", "document_id": document.id},
+                        status=status.HTTP_201_CREATED)
+
+
+class FileDownloadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # Viewers ask for the file's own type; errors still render as JSON
+        return super().perform_content_negotiation(request, force=True)
+
+    def get_queryset(self):
+        raise NotImplementedError
+
+    def get_filename(self, instance):
+        # Stored names are content hashes; offer the name the file was uploaded under
+        return instance.filename
+
+    def get(self, request, pk, *args, **kwargs):
+        # Files the user cannot read look the same as missing ones
+        instance = get_object_or_404(self.get_queryset(), pk=pk)
+        if not instance.file:
+            raise NotFound("This document has no file")
+        storage, name, filename = instance.file.storage, instance.file.name, self.get_filename(instance)
+
+        # ?variant=thumbnail etc. of image documents, see project/images.py
+        variant = request.query_params.get('variant')
+        if variant:
+            name = ensure_variant(storage, name, variant)
+            if name is None:
+                raise NotFound("This document has no such variant")
+            filename = os.path.splitext(filename)[0] + os.path.splitext(name)[1]
+        return file_response(request, storage, name, filename,
+                             as_attachment=request.query_params.get('download') in ('1', 'true'))
+
+
+class DocumentDownloadView(FileDownloadView):
+    def get_queryset(self):
+        user = self.request.user
+        # Uploaders, the parties of the case or request and, for admins, their office
+        access = Q(uploader_id=user.id)
+        if user.user_type == 'admin':
+            if user.office_id is not None:
+                access |= Q(office_id=user.office_id)
+        elif user.user_type in ('lawyer', 'user'):
+            access |= Q(**{f'case__{user.user_type}_id': user.id}) | Q(**{f'request__{user.user_type}_id': user.id})
+        return Document.objects.filter(access)
+
+
+class LegalDocumentDownloadView(FileDownloadView):
+    def get_queryset(self):
+        # The documents the legal document lists show this user
+        return LegalDocument.objects.filter(admin_id=self.request.user.id)
+
+    def get_filename(self, instance):
+        return instance.title + os.path.splitext(instance.file.name)[1]
+
+
+class ImageVariantView(APIView):
+    # Linked from <img> tags, which send no token, so only profile photos are served here; variants of
+    # documents go through the permission-checked DocumentDownloadView (?variant=)
+    authentication_classes = []
+    permission_classes = []
+
+    def perform_content_negotiation(self, request, force=False):
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, digest, variant, *args, **kwargs):
+        # Variants the workers have not cached yet are generated here, see project/images.py
+        name = None
+        if re.fullmatch(r'[0-9a-f]{64}', digest):
+            image = find_image(default_storage, digest)
+            if image is not None and User.objects.filter(photo=image).exists():
+                name = ensure_variant(default_storage, image, variant)
+        if name is None:
+            raise NotFound("Image not found")
+        return file_response(request, default_storage, name, os.path.basename(name))
+
+
 class UpdateRequestAPIView(APIView):
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]
 
     def patch(self, request, request_id, *args, **kwargs):
-        request_item = Request.objects.filter(id=request_id, lawyer_id=request.user.id).first()
+        request_item = with_note_summary(Request.objects.filter(id=request_id, lawyer_id=request.user.id)).first()
 
         if not request_item:
             return Response({"error": "Request not found or not authorized"}, status=status.HTTP_404_NOT_FOUND)
 
         # Deserialize the request data
-        serializer = RequestSerializer(request_item, data=request.data, partial=True)
+        serializer = RequestSerializer(request_item, data=request.data, partial=True, context={'request': request})
 
         if serializer.is_valid():
             # If there is any file to upload, handle it
@@ -398,12 +592,18 @@ class UpdateRequestAPIView(APIView):
             }, status=status.HTTP_200_OK)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-class RequestDetailsAPIView(APIView):
+class RequestDetailsAPIView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+    conditional_aggregates = {**REQUEST_NOTES, **OFFICE_FIELDS}
+    conditional_detail = True
 
+    def get_conditional_queryset(self):
+        return Request.objects.filter(id=self.kwargs['request_id'], lawyer_id=self.request.user.id)
+
+    @conditional_get
     def get(self, request, request_id, *args, **kwargs):
         # Fetch the request object by ID and check if the lawyer is the one associated with the request
-        request_obj = Request.objects.filter(id=request_id, lawyer_id=request.user.id).first()
+        request_obj = with_note_summary(Request.objects.filter(id=request_id, lawyer_id=request.user.id)).first()
 
         if not request_obj:
             return Response({"error": "Request not found or unauthorized"}, status=status.HTTP_404_NOT_FOUND)
@@ -419,61 +619,87 @@ class RequestDetailsAPIView(APIView):
         return Response(result, status=status.HTTP_200_OK)
 
 
-class UserDatesAPIView(APIView):
-    permission_classes = [IsAuthenticated, UserRequiredPermission]
+class HearingDatesMixin:
+    # Case column that ties a hearing to the requesting user
+    case_owner_field = None
 
     def get(self, request, *args, **kwargs):
-        user = request.user
-        cases = user.cases.all()  # Assuming `cases` is the related name for User's cases
-        cases_date = [
-            {
-                "id": case.id,
-                "lawyer": case.lawyer.id,  # Assuming `lawyer` is a ForeignKey
-                "case_type": case.case_type,
-                "date": case.date,
-                "time": case.time,
-            }
-            for case in cases
-        ]
-        return Response(cases_date)
-
-
-class LawyerDatesAPIView(APIView):
-    permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+        return Response(self.date_entries(self.hearing_rows(request)))
+
+    def hearing_rows(self, request):
+        start, end = parse_schedule_window(request.query_params)
+
+        # One range query over the (case, starts_at) index
+        hearings = Hearing.objects.filter(**{f'case__{self.case_owner_field}': request.user.id})
+        if start:
+            hearings = hearings.filter(starts_at__gte=start)
+        if end:
+            hearings = hearings.filter(starts_at__lte=end)
+        return hearings.order_by('starts_at', 'id').values(
+            'id', 'case_id', 'case__lawyer_id', 'case__case_type', 'starts_at'
+        )
 
-    def get(self, request, *args, **kwargs):
-        user = request.user
-        cases = user.cases.all()  # Assuming `cases` is the related name for User's cases
-        cases_date = [
-            {
-                "id": case.id,
-                "lawyer": case.lawyer.id,  # Assuming `lawyer` is a ForeignKey
-                "case_type": case.case_type,
-                "date": case.date,
-                "time": case.time,
-            }
-            for case in cases
-        ]
-        return Response(cases_date)
-
-
-class CaseDetailsView(APIView):
+    @staticmethod
+    def date_entries(rows):
+        cases_date = []
+        for row in rows:
+            starts_at = timezone.localtime(row['starts_at'])
+            cases_date.append({
+                "id": row['case_id'],
+                "hearing_id": row['id'],
+                "lawyer": row['case__lawyer_id'],
+                "case_type": row['case__case_type'],
+                "date": starts_at.date().isoformat(),
+                "time": starts_at.time().isoformat(),
+                "starts_at": starts_at.isoformat(),
+            })
+        return cases_date
+
+
+class UserDatesAPIView(HearingDatesMixin, APIView):
     permission_classes = [IsAuthenticated, UserRequiredPermission]
+    case_owner_field = 'user_id'
 
+
+class LawyerDatesAPIView(HearingDatesMixin, APIView):
+    permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+    case_owner_field = 'lawyer_id'
+
+
+class CaseDetailsView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated, UserRequiredPermission]
+    conditional_aggregates = {
+        **CASE_NOTES,
+        **OFFICE_FIELDS,
+        'hearings_count': Count('hearings', distinct=True),
+        'hearings_at': Max('hearings__updated_at'),
+        'lawyer_name': Max('lawyer__username'),
+        'lawyer_email': Max('lawyer__email'),
+    }
+    conditional_detail = True
+
+    def get_conditional_queryset(self):
+        return Case.objects.filter(id=self.kwargs['case_id'], user_id=self.request.user.id)
+
+    @conditional_get
     def get(self, request, case_id, *args, **kwargs):
         # Fetch the case and ensure it belongs to the logged-in user
-        case = get_object_or_404(Case, id=case_id, user_id=request.user.id)
+        case = get_object_or_404(
+            with_note_summary(Case.objects.select_related('lawyer', 'office').prefetch_related('hearings')),
+            id=case_id, user_id=request.user.id,
+        )
 
-        # Fetch related lawyer and office objects
-        lawyer = User.objects.filter(id=case.lawyer_id).first()
-        office = Office.objects.filter(id=case.office_id).first()
+        # Related lawyer and office objects come from the same query
+        lawyer = case.lawyer
+        office = case.office
+        notes_count, latest_note = note_summary(case)
 
         # Prepare the response data
         case_details = {
             "id": case.id,
             "status": case.status,
             "plaintiff_name": case.plaintiff_name,
-            "defendant_name": case.defendant,
+            "defendant_name": case.defendant_name,
             "case_type": case.case_type,
             "lawyer": {
                 "id": lawyer.id,
@@ -485,71 +711,292 @@ class CaseDetailsView(APIView):
                 "name": office.office_name,
                 "address": office.address,
             } if office else None,
-            "notes": case.notes,
-            "dates": [{
-                "date": case.date,
-                "time": case.time
-            }]
+            "notes_count": notes_count,
+            "latest_note": latest_note,
+            "dates": [
+                {
+                    "date": starts_at.date().isoformat(),
+                    "time": starts_at.time().isoformat(),
+                }
+                for starts_at in (timezone.localtime(hearing.starts_at) for hearing in case.hearings.all())
+            ]
         }
 
         return Response(case_details)
 
 
-class UserCasesView(ListAPIView):
+class UserCasesView(
+    ConditionalGetMixin, StreamingListMixin, CompiledListViewMixin, SparseFieldsViewMixin, ListAPIView,
+):
     serializer_class = CaseSerializer
     permission_classes = [IsAuthenticated, UserRequiredPermission]
+    cursor_ordering = ('-id',)
+    conditional_aggregates = CASE_NOTES
 
     def get_queryset(self):
         # Return cases associated with the authenticated user
-        return Case.objects.filter(user_id=self.request.user.id)
+        return with_note_summary(Case.objects.filter(user_id=self.request.user.id))
 
-class LawyerCasesView(ListAPIView):
+class LawyerCasesView(
+    ConditionalGetMixin, StreamingListMixin, CompiledListViewMixin, SparseFieldsViewMixin, ListAPIView,
+):
     serializer_class = CaseSerializer
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+    cursor_ordering = ('-id',)
+    conditional_aggregates = CASE_NOTES
 
     def get_queryset(self):
         # Return cases associated with the authenticated user
-        return Case.objects.filter(user_id=self.request.user.id)
+        return with_note_summary(Case.objects.filter(user_id=self.request.user.id))
 
 
-class UserDocumentsView(APIView):
+class UserDocumentsView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, UserRequiredPermission]
 
-    def get(self, request, *args, **kwargs):
+    def get_conditional_queryset(self):
         # Query for documents associated with the user's cases or requests
-        case_ids = Case.objects.filter(user_id=request.user.id).values_list('id', flat=True)
-        request_ids = Request.objects.filter(user_id=request.user.id).values_list('id', flat=True)
-        documents = Document.objects.filter(
+        case_ids = Case.objects.filter(user_id=self.request.user.id).values_list('id', flat=True)
+        request_ids = Request.objects.filter(user_id=self.request.user.id).values_list('id', flat=True)
+        return Document.objects.filter(
             Q(case_id__in=case_ids) | Q(request_id__in=request_ids)
         )
 
-        # Serialize the documents
-        serializer = DocumentSerializer(documents, many=True)
-        return Response(serializer.data)
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        documents = self.get_conditional_queryset()
+
+        # Render the documents straight from their columns
+        return Response(compiled_data(DocumentSerializer(), documents))
 
 
-class CaseDocumentsView(APIView):
+class CaseDocumentsView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, UserRequiredPermission]
 
+    def get_conditional_queryset(self):
+        return Document.objects.filter(case_id=self.kwargs['case_id'], case__user_id=self.request.user.id)
+
+    @conditional_get
     def get(self, request, case_id, *args, **kwargs):
         # Ensure the case exists and belongs to the authenticated user
         case = get_object_or_404(Case, id=case_id, user_id=request.user.id)
 
         # Retrieve documents associated with the case
-        case_documents = case.documents.all()
+        case_documents = case.documents_case.all()
 
-        # Serialize and return the documents
-        serializer = DocumentSerializer(case_documents, many=True)
-        return Response(serializer.data)
+        # Render and return the documents straight from their columns
+        return Response(compiled_data(DocumentSerializer(), case_documents))
 
 
-class LawyerRequestsView(APIView):
+class LawyerRequestsView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated, LawyerRequiredPermission]
+    conditional_aggregates = {**REQUEST_NOTES, **REQUEST_DOCUMENTS, **REQUEST_USERS}
+
+    def get_conditional_queryset(self):
+        return Request.objects.filter(lawyer_id=self.request.user.id)
 
+    @conditional_get
     def get(self, request, *args, **kwargs):
         # Filter requests assigned to the authenticated lawyer
-        lawyer_requests = Request.objects.filter(lawyer_id=request.user.id)
+        lawyer_requests = LawyerRequestSerializer.setup_queryset(Request.objects.filter(lawyer_id=request.user.id))
+        context = {'request': request}
+        lawyer_requests = LawyerRequestSerializer(context=context).sparse_queryset(
+            lawyer_requests, keep=[name.lstrip('-') for name in KeysetPagination.ordering],
+        )
+
+        # Serialize and return one page of the requests
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(lawyer_requests, request, view=self)
+        serializer = LawyerRequestSerializer(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+
+CALENDAR_FEED_SALT = 'Office.calendar-feed'
+
+
+class CalendarFeedLinkView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        # Calendar apps cannot send an Authorization header, so the feed URL carries a signed token
+        token = signing.dumps(
+            {'u': request.user.id, 't': request.user.user_type, 'i': int(time.time())}, salt=CALENDAR_FEED_SALT,
+        )
+        url = request.build_absolute_uri(reverse('api:calendar-feed', kwargs={'token': token}))
+        return Response({"url": url}, status=status.HTTP_200_OK)
+
+
+class CalendarFeedView(APIView):
+    authentication_classes = []
+    permission_classes = []
+
+    def get(self, request, token, *args, **kwargs):
+        try:
+            claims = signing.loads(token, salt=CALENDAR_FEED_SALT, max_age=settings.CALENDAR_FEED_MAX_AGE)
+        except signing.BadSignature:
+            raise NotFound("Calendar not found")
+        # As access tokens: not for deactivated users, nor once the role the link was made for has changed
+        if revocations.is_user_revoked(claims['u']) or revocations.are_claims_stale(claims['u'], claims.get('i')):
+            raise NotFound("Calendar not found")
+
+        owner_field = 'case__lawyer_id' if claims['t'] == 'lawyer' else 'case__user_id'
+        hearings = Hearing.objects.filter(**{owner_field: claims['u']})
+
+        # A single aggregate decides whether the client's copy is still current; events also render case fields
+        state = hearings.aggregate(latest=Max('updated_at'), case_latest=Max('case__updated_at'), count=Count('id'))
+        latest, case_latest = (state[key].timestamp() if state[key] else 0 for key in ('latest', 'case_latest'))
+        etag = f'"{claims["u"]}-{state["count"]}-{latest:.6f}-{case_latest:.6f}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
+        rows = hearings.order_by('starts_at', 'id').values(
+            'id', 'starts_at', 'updated_at', 'case_id', 'case__case_type', 'case__description',
+            'case__address', 'case__plaintiff_name', 'case__defendant_name',
+        ).iterator(chunk_size=500)
+        response = StreamingHttpResponse(
+            calendar_stream(rows, 'LawApp hearings', request.get_host()),
+            content_type='text/calendar; charset=utf-8',
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class RequestImportView(APIView):
+    permission_classes = [IsAuthenticated, AdminRequiredPermission]
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response({"error": "No file part"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fmt = detect_format(upload.name, request.data.get('format'))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Rows are parsed, validated and inserted while the report streams back
+        report = import_requests(iter_rows(upload.open('rb'), fmt), request.user.office_id, fmt=fmt)
+        return StreamingHttpResponse(
+            (json.dumps(entry) + '\n' for entry in report),
+            content_type='application/x-ndjson',
+        )
+
+
+class SearchView(APIView):
+    permission_classes = [IsAuthenticated, StaffRequiredPermission]
+
+    def get(self, request, *args, **kwargs):
+        kind = request.query_params.get('type') or None
+        if kind is not None and kind not in SEARCH_KINDS:
+            return Response({"error": f"type must be one of {', '.join(SEARCH_KINDS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        paginator = KeysetPagination()
+        limit = paginator.get_page_size(request)
+        try:
+            page = _positive_int(request.query_params.get('page', 1), strict=True)
+        except ValueError:
+            return Response({"error": "page must be a positive integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Lawyers only see matters assigned to them; admins see the whole office
+        lawyer_id = request.user.id if request.user.user_type == 'lawyer' else None
+        rows = search(request.query_params.get('q'), request.user.office_id, lawyer_id=lawyer_id, kind=kind,
+                      limit=limit + 1, offset=(page - 1) * limit)
+
+        url = request.build_absolute_uri()
+        return Response({
+            'next': replace_query_param(url, 'page', page + 1) if len(rows) > limit else None,
+            'previous': replace_query_param(url, 'page', page - 1) if page > 1 else None,
+            'results': rows[:limit],
+        })
+
+
+class ConflictCheckView(APIView):
+    permission_classes = [IsAuthenticated, StaffRequiredPermission]
+
+    def get(self, request, *args, **kwargs):
+        serializer = ConflictCheckSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+
+        name, exclude = params.get('name'), None
+        if params.get('request_id'):
+            # Check an incoming request's defendant against everyone else in the office
+            intake = get_object_or_404(
+                Request.objects.only('id', 'defendant_name'), pk=params['request_id'], office_id=request.user.office_id,
+            )
+            name, exclude = name or intake.defendant_name, ('request', intake.id)
+
+        normalized, matches = find_conflicts(
+            name, request.user.office_id, roles=params.get('roles') or ['client', 'plaintiff'],
+            threshold=params['threshold'], limit=params['limit'], exclude=exclude,
+        )
+        return Response({'name': name, 'normalized': normalized, 'conflicts': matches})
+
+
+class DashboardView(APIView):
+    permission_classes = [IsAuthenticated, StaffRequiredPermission]
+
+    def get(self, request, *args, **kwargs):
+        # Admins read the office-wide row, lawyers their own
+        lawyer_id = request.user.id if request.user.user_type == 'lawyer' else None
+        rollup = OfficeRollup.objects.filter(office_id=request.user.office_id, lawyer_id=lawyer_id) \
+            .values('counters', 'updated_at').first()
+        return Response({
+            'office_id': request.user.office_id,
+            'lawyer_id': lawyer_id,
+            'counters': rollup['counters'] if rollup else {},
+            'updated_at': rollup['updated_at'] if rollup else None,
+        })
+
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAuthenticated, AdminRequiredPermission]
+
+    def get(self, request, *args, **kwargs):
+        # Counts are kept per worker process
+        return Response(cache_stats())
+
+
+class NoteListView(ListCreateAPIView):
+    """
+    One case's or request's notes, newest first. Staff append notes with a
+    single INSERT; clients can read the notes on their own files.
+    """
+    serializer_class = NoteSerializer
+    permission_classes = [IsAuthenticated]
+    cursor_ordering = ('-id',)
+    parent_model = None
+    parent_field = None
+
+    def get_permissions(self):
+        if self.request.method == 'POST':
+            return [IsAuthenticated(), StaffRequiredPermission()]
+        return super().get_permissions()
+
+    def get_parent_id(self):
+        user = self.request.user
+        scope = {
+            'admin': {'office_id': user.office_id},
+            'lawyer': {'lawyer_id': user.id},
+            'user': {'user_id': user.id},
+        }.get(user.user_type)
+        parent_id = self.kwargs[self.parent_field]
+        if scope is None or not self.parent_model.objects.filter(pk=parent_id, **scope).exists():
+            raise NotFound(f'{self.parent_model._meta.verbose_name.capitalize()} not found or not authorized')
+        return parent_id
+
+    def get_queryset(self):
+        return Note.objects.filter(**{self.parent_field: self.get_parent_id()}).select_related('author')
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user, **{self.parent_field: self.get_parent_id()})
+
+
+class CaseNoteListView(NoteListView):
+    parent_model = Case
+    parent_field = 'case_id'
+
 
-        # Serialize and return the requests
-        serializer = LawyerRequestSerializer(lawyer_requests, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+class RequestNoteListView(NoteListView):
+    parent_model = Request
+    parent_field = 'request_id'
@@ -0,0 +1,11 @@
+from User.models import User
+from User.serializers import UserProfileSerializer
+from project.async_views import AsyncAPIView
+
+
+class AsyncProfileView(AsyncAPIView):
+    # AdminProfileView, LawyerProfileView and UserProfileView
+
+    async def get(self, request, *args, **kwargs):
+        user = await User.objects.aget(pk=request.user.id)
+        return UserProfileSerializer(user, context={'request': request}).data
@@ -0,0 +1,74 @@
+from asgiref.sync import sync_to_async
+from django.db import router
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from User.models import User
+from User.revocation import store
+from User.tokens import USER_TYPE_CLAIM, OFFICE_CLAIM
+
+
+def user_from_claims(user_id, user_type, office_id):
+    """
+    A User holding only the token's claims. Reading any other attribute
+    loads the rest of the row in one query, see User.refresh_from_db().
+    """
+    user = User.from_db(router.db_for_read(User), ['id', 'user_type', 'office_id'], [user_id, user_type, office_id])
+    user.from_token_claims = True
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT authentication that trusts the role and office claims signed into
+    the token, so permission checks and office scoping need no user query.
+    Tokens issued without those claims fall back to loading the user.
+    Revoked users and tokens, and tokens whose claims predate a change of
+    the user's role or office, are checked against the in-memory store.
+    """
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        self.check_token(validated_token)
+        return validated_token
+
+    async def aauthenticate(self, request):
+        """
+        authenticate() for async views: the claims path needs no query and
+        the revocation log is only read when a sync is due.
+        """
+        header = self.get_header(request)
+        raw_token = self.get_raw_token(header) if header is not None else None
+        if raw_token is None:
+            return None
+        await store.async_sync_if_due()
+        validated_token = super().get_validated_token(raw_token)
+        self.check_token(validated_token, sync=False)
+        user = self.user_from_token(validated_token, sync=False)
+        if user is None:
+            user = await sync_to_async(super().get_user)(validated_token)
+        return user, validated_token
+
+    def get_user(self, validated_token):
+        return self.user_from_token(validated_token) or super().get_user(validated_token)
+
+    @staticmethod
+    def check_token(validated_token, sync=True):
+        if store.is_token_revoked(validated_token.get(api_settings.JTI_CLAIM), sync=sync):
+            raise InvalidToken('Token has been revoked')
+
+    @staticmethod
+    def user_from_token(validated_token, sync=True):
+        # None when the token lacks the claims and the user has to be loaded
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return None
+        if store.is_user_revoked(user_id, sync=sync):
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        if USER_TYPE_CLAIM not in validated_token or OFFICE_CLAIM not in validated_token:
+            return None
+        if store.are_claims_stale(user_id, validated_token.get('iat'), sync=sync):
+            raise InvalidToken('Token claims are out of date')
+        return user_from_claims(user_id, validated_token[USER_TYPE_CLAIM], validated_token[OFFICE_CLAIM])
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:19
+
+import User.models
+import django.contrib.auth.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('Office', '0001_initial'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('password', models.CharField(max_length=128, verbose_name='password')),
+                ('last_login', models.DateTimeField(blank=True, null=True, verbose_name='last login')),
+                ('is_superuser', models.BooleanField(default=False, help_text='Designates that this user has all permissions without explicitly assigning them.', verbose_name='superuser status')),
+                ('username', models.CharField(error_messages={'unique': 'This username already exists.'}, help_text='Required. 50 characters or fewer. Letters, digits and @/./+/-/_ only.', max_length=50, unique=True, validators=[django.contrib.auth.validators.UnicodeUsernameValidator(), User.models.validate_username_user], verbose_name='username')),
+                ('user_type', models.CharField(choices=[('user', 'User'), ('admin', 'Admin'), ('lawyer', 'Lawyer')], max_length=100)),
+                ('id_document', models.CharField(blank=True, max_length=100, null=True)),
+                ('photo', models.ImageField(blank=True, null=True, upload_to='image')),
+                ('phone', models.CharField(blank=True, max_length=20, null=True)),
+                ('address', models.CharField(blank=True, max_length=200, null=True)),
+                ('country', models.CharField(blank=True, max_length=50, null=True)),
+                ('email', models.EmailField(max_length=254, unique=True, verbose_name='email address')),
+                ('is_email_verified', models.BooleanField(default=False)),
+                ('email_verification_code', models.CharField(blank=True, max_length=20, null=True)),
+                ('dob', models.DateField(null=True)),
+                ('gender', models.CharField(blank=True, choices=[('male', 'Male'), ('female', 'Female'), ('prefer_not_to_answer', 'Prefere not to answer')], max_length=25, null=True)),
+                ('is_staff', models.BooleanField(default=False, help_text='Designates whether the user can log into this admin site.', verbose_name='staff status')),
+                ('is_active', models.BooleanField(default=True, help_text='Designates whether this user should be treated as active. Unselect this instead of deleting accounts.', verbose_name='active')),
+                ('role', models.CharField(blank=True, max_length=50, null=True)),
+                ('is_deactivated', models.BooleanField(default=False)),
+                ('date_joined', models.DateTimeField(default=django.utils.timezone.now, verbose_name='date joined')),
+                ('is_set_password', models.BooleanField(default=True)),
+                ('lawfirm', models.CharField(blank=True, max_length=100, null=True)),
+                ('groups', models.ManyToManyField(blank=True, help_text='The groups this user belongs to. A user will get all permissions granted to each of their groups.', related_name='user_set', related_query_name='user', to='auth.group', verbose_name='groups')),
+                ('office', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='user', to='Office.office')),
+                ('user_permissions', models.ManyToManyField(blank=True, help_text='Specific permissions for this user.', related_name='user_set', related_query_name='user', to='auth.permission', verbose_name='user permissions')),
+            ],
+            options={
+                'verbose_name': 'user',
+                'verbose_name_plural': 'users',
+            },
+            managers=[
+                ('objects', User.models.UserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.2 on 2026-10-18 14:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('user', 'User'), ('token', 'Token')], max_length=10)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('jti', models.CharField(blank=True, max_length=255, null=True)),
+                ('revoked', models.BooleanField(default=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at'], name='revocation_created_idx'), models.Index(fields=['expires_at'], name='revocation_expires_idx')],
+            },
+        ),
+    ]
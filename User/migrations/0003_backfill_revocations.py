@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import Q
+
+
+def revoke_deactivated_users(apps, schema_editor):
+    User = apps.get_model('User', 'User')
+    Revocation = apps.get_model('User', 'Revocation')
+    Revocation.objects.bulk_create([
+        Revocation(kind='user', user_id=user_id)
+        for user_id in User.objects.filter(Q(is_deactivated=True) | Q(is_active=False)).values_list('id', flat=True)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0002_revocation'),
+    ]
+
+    operations = [
+        migrations.RunPython(revoke_deactivated_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Office', '0015_stored_file_indexes'),
+        ('User', '0003_backfill_revocations'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['photo'], name='user_photo_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('User', '0004_stored_file_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='revocation',
+            name='kind',
+            field=models.CharField(choices=[('user', 'User'), ('token', 'Token'), ('claims', 'Claims')], max_length=10),
+        ),
+    ]
@@ -10,7 +10,8 @@ from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.contrib.auth.models import PermissionsMixin, UserManager as DjangoUserManager
-from rest_framework_simplejwt.tokens import RefreshToken
+
+from User.tokens import OfficeRefreshToken
 
 
 
@@ -84,6 +85,8 @@ class User(AbstractBaseUser, PermissionsMixin):
     office = models.ForeignKey('Office.Office', on_delete=models.SET_NULL, null=True, related_name='user')
     is_set_password = models.BooleanField(default=True)
     lawfirm = models.CharField(max_length=100, blank=True, null=True)
+    # Bumped by every save but sign-ins (update_fields=['last_login']); ETags of views nesting users read it
+    updated_at = models.DateTimeField(auto_now=True)
     objects = UserManager()
     EMAIL_FIELD = 'email'
     USERNAME_FIELD = 'email'
@@ -92,6 +95,9 @@ class User(AbstractBaseUser, PermissionsMixin):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            models.Index(fields=['photo'], name='user_photo_idx'),
+        ]
 
     def clean(self):
         super().clean()
@@ -99,5 +105,42 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     @cached_property
     def token(self):
-        return RefreshToken.for_user(self)
+        return OfficeRefreshToken.for_user(self)
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        deferred = self.get_deferred_fields()
+        if getattr(self, 'from_token_claims', False) and fields and set(fields) <= deferred:
+            # Built from token claims: the first attribute read loads the rest of the row at once
+            fields = deferred
+        super().refresh_from_db(using, fields, from_queryset)
+
+
+class Revocation(models.Model):
+    """
+    Append-only log of revoked users and tokens. The id doubles as the change
+    sequence workers read to keep their in-memory copy current, see
+    User/revocation.py.
+    """
+    class KindChoices(models.TextChoices):
+        USER = 'user', "User"
+        TOKEN = 'token', "Token"
+        # The user's role or office changed: tokens issued before created_at carry stale claims
+        CLAIMS = 'claims', "Claims"
+
+    kind = models.CharField(max_length=10, choices=KindChoices.choices)
+    # Plain ids rather than a foreign key so deleting a user can be logged too
+    user_id = models.BigIntegerField(null=True, blank=True)
+    jti = models.CharField(max_length=255, null=True, blank=True)
+    # False reinstates a user revoked by an earlier entry
+    revoked = models.BooleanField(default=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], name='revocation_created_idx'),
+            models.Index(fields=['expires_at'], name='revocation_expires_idx'),
+        ]
 
+    def __str__(self):
+        return f"Revocation {self.id} - {self.kind}"
@@ -55,4 +55,12 @@ class IsSuperUser(IsAuthenticated):
     """
 
     def has_permission(self, request, view):
-        return request.user and request.user.is_superuser
\ No newline at end of file
+        return request.user and request.user.is_superuser
+
+class StaffRequiredPermission(IsAuthenticated):
+    """
+    Custom permission to allow only office staff (admins and lawyers).
+    """
+    def has_permission(self, request, view):
+        is_authenticated = super().has_permission(request, view)
+        return is_authenticated and request.user.user_type in ('admin', 'lawyer')
@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from User.models import Revocation
+
+# Entries written by transactions that commit out of id order are caught by re-reading this window
+SETTLE_WINDOW = timedelta(minutes=1)
+
+
+class RevocationStore:
+    """
+    Per-process copy of the Revocation log.
+
+    The first check loads the log; later checks read it again only once
+    every REVOCATION_SYNC_SECONDS, and then only the entries added since.
+    Every other check is a set lookup.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.users = set()
+        self.tokens = {}
+        # {user id: epoch second}; the user's tokens issued earlier carry stale claims
+        self.claims_issued_before = {}
+        # Id of the entry that last decided each user's or token's state
+        self.applied = {}
+        self.last_id = 0
+        self.synced_at = None
+
+    # sync=False skips reading the log: async callers sync through async_sync_if_due() first, as the
+    # ORM must not run on the event loop
+
+    def is_user_revoked(self, user_id, sync=True):
+        if sync:
+            self.sync_if_due()
+        return user_id in self.users
+
+    def is_token_revoked(self, jti, sync=True):
+        if sync:
+            self.sync_if_due()
+        return jti is not None and jti in self.tokens
+
+    def are_claims_stale(self, user_id, issued_at, sync=True):
+        """Whether a token of `user_id` issued at `issued_at` (its iat claim) predates a change of role or office."""
+        if sync:
+            self.sync_if_due()
+        cutoff = self.claims_issued_before.get(user_id)
+        return cutoff is not None and (issued_at is None or issued_at < cutoff)
+
+    def sync_due(self):
+        return self.synced_at is None or time.monotonic() - self.synced_at >= settings.REVOCATION_SYNC_SECONDS
+
+    def sync_if_due(self):
+        if self.sync_due():
+            self.sync()
+
+    async def async_sync_if_due(self):
+        if self.sync_due():
+            await sync_to_async(self.sync)()
+
+    def sync(self):
+        with self.lock:
+            entries = Revocation.objects.order_by('id')
+            if self.synced_at is not None:
+                entries = entries.filter(Q(id__gt=self.last_id) | Q(created_at__gte=timezone.now() - SETTLE_WINDOW))
+            for entry in entries.values('id', 'kind', 'user_id', 'jti', 'revoked', 'expires_at', 'created_at'):
+                self.apply(entry)
+            now = timezone.now()
+            for jti in [jti for jti, expires in self.tokens.items() if expires is not None and expires <= now]:
+                # The token is rejected as expired anyway
+                del self.tokens[jti]
+                self.applied.pop((Revocation.KindChoices.TOKEN, jti), None)
+            self.synced_at = time.monotonic()
+
+    def apply(self, entry):
+        key = (entry['kind'], entry['jti'] if entry['kind'] == Revocation.KindChoices.TOKEN else entry['user_id'])
+        if self.applied.get(key, 0) >= entry['id']:
+            return
+        self.applied[key] = entry['id']
+        self.last_id = max(self.last_id, entry['id'])
+        if entry['kind'] == Revocation.KindChoices.CLAIMS:
+            # iat is in whole seconds: tokens issued in the second of the change itself still pass
+            self.claims_issued_before[entry['user_id']] = int(entry['created_at'].timestamp())
+        elif entry['kind'] == Revocation.KindChoices.USER:
+            if entry['revoked']:
+                self.users.add(entry['user_id'])
+            else:
+                self.users.discard(entry['user_id'])
+        elif entry['revoked']:
+            self.tokens[entry['jti']] = entry['expires_at']
+
+
+store = RevocationStore()
+
+
+def set_user_revoked(user_id, revoked):
+    """Log a change of a user's revocation state unless the log already has it."""
+    store.sync()
+    if (user_id in store.users) != revoked:
+        Revocation.objects.create(kind=Revocation.KindChoices.USER, user_id=user_id, revoked=revoked)
+        # Picked up once committed, so a rolled back entry never reaches the store
+        transaction.on_commit(store.sync)
+
+
+def expire_claims(user_id):
+    """Log that the user's role or office changed, so their tokens issued until now stop working."""
+    # Entries older than the longest token lifetime protect nothing
+    lifetime = max(jwt_settings.ACCESS_TOKEN_LIFETIME, jwt_settings.REFRESH_TOKEN_LIFETIME)
+    Revocation.objects.filter(
+        kind=Revocation.KindChoices.CLAIMS, user_id=user_id, created_at__lt=timezone.now() - lifetime,
+    ).delete()
+    Revocation.objects.create(kind=Revocation.KindChoices.CLAIMS, user_id=user_id)
+    transaction.on_commit(store.sync)
+
+
+def revoke_token(token):
+    """Log a token (access or refresh) as revoked until it would have expired anyway."""
+    expires_at = datetime_from_epoch(token['exp']) if 'exp' in token else None
+    # Entries for tokens that have expired since protect nothing
+    Revocation.objects.filter(kind=Revocation.KindChoices.TOKEN, expires_at__lt=timezone.now()).delete()
+    Revocation.objects.create(kind=Revocation.KindChoices.TOKEN, jti=token.get('jti'), expires_at=expires_at)
+    transaction.on_commit(store.sync)
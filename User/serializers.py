@@ -4,13 +4,12 @@ from rest_framework import serializers
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from Office.models import Office
+from project.serializers import ImageVariantsMixin, SparseFieldsMixin
 
 from .models import  User
+from .tokens import OfficeRefreshToken
 # Serializer for Admin profile information
-class UserProfileSerializer(serializers.ModelSerializer):
-    refresh = serializers.CharField(read_only=True, source='token')
-    access = serializers.CharField(read_only=True, source='token.access_token')
-
+class UserProfileSerializer(SparseFieldsMixin, ImageVariantsMixin, serializers.ModelSerializer):
     def validate(self, attrs):
         # Extract usertype to check conditions
         usertype = attrs.get('usertype')
@@ -37,7 +36,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'username', 'email', 'address', 'phone', 'photo', 'lawfirm', 'office','role','user_type',
-                  'access','refresh','password','id_document','address','country','is_email_verified',
+                  'password','id_document','address','country','is_email_verified',
                   'email_verification_code','dob','gender','is_active','is_deactivated','date_joined',
                   ]
         extra_kwargs = {
@@ -52,8 +51,18 @@ class UserProfileSerializer(serializers.ModelSerializer):
 
         }
 
+
+# Profile creation also hands back a token pair for the new account
+class UserProfileTokenSerializer(UserProfileSerializer):
+    refresh = serializers.CharField(read_only=True, source='token')
+    access = serializers.CharField(read_only=True, source='token.access_token')
+
+    class Meta(UserProfileSerializer.Meta):
+        fields = UserProfileSerializer.Meta.fields + ['access', 'refresh']
+
 # login user
 class LoginSerializer(TokenObtainPairSerializer):
+    token_class = OfficeRefreshToken
 
     def validate(self, attrs):
         try:
@@ -69,7 +78,7 @@ class LoginSerializer(TokenObtainPairSerializer):
 
 
 # Serializer for User model
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     refresh = serializers.CharField(read_only=True, source='token')
     access = serializers.CharField(read_only=True, source='token.access_token')
 
@@ -100,7 +109,7 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
 # Serializer for Lawyer model
-class LawyerSerializer(serializers.ModelSerializer):
+class LawyerSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     refresh = serializers.CharField(read_only=True, source='token')
     access = serializers.CharField(read_only=True, source='token.access_token')
 
@@ -130,6 +139,20 @@ class LawyerSerializer(serializers.ModelSerializer):
 
         }
 
+# Read-only projection for rosters and nested users; never mints tokens
+class UserListSerializer(ImageVariantsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'email', 'phone', 'photo', 'lawfirm', 'office', 'role', 'user_type',
+                  'is_active', 'is_deactivated', 'date_joined']
+        read_only_fields = fields
+
+    @classmethod
+    def setup_queryset(cls, queryset):
+        # Only load the columns this serializer renders
+        return queryset.only(*cls.Meta.fields)
+
+
 class CombinedUserSerializer(serializers.Serializer):
     clients = UserSerializer(many=True)
     lawyers = LawyerSerializer(many=True)
@@ -139,7 +162,7 @@ class OfficeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Office
         fields = ['id', 'office_name', 'address']
-class UserDetailsSerializer(serializers.ModelSerializer):
+class UserDetailsSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     office = OfficeSerializer(read_only=True)
 
     class Meta:
@@ -150,7 +173,7 @@ class UserDetailsSerializer(serializers.ModelSerializer):
         ]
 
 
-class UserOfficeProfileSerializer(serializers.ModelSerializer):
+class UserOfficeProfileSerializer(ImageVariantsMixin, serializers.ModelSerializer):
     refresh = serializers.CharField(read_only=True, source='token')
     access = serializers.CharField(read_only=True, source='token.access_token')
     office_name = serializers.CharField(write_only=True, required=False)  # New field for office name
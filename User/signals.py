@@ -0,0 +1,45 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from User.models import User
+from User.revocation import expire_claims, set_user_revoked
+
+REVOCATION_FIELDS = {'is_active', 'is_deactivated'}
+# Signed into access tokens, see User/tokens.py
+CLAIM_FIELDS = ('user_type', 'office_id')
+
+
+@receiver(post_save, sender=User)
+def log_user_revocation(sender, instance, created=False, update_fields=None, **kwargs):
+    # Only (de)activations can change the log; every other save leaves it alone
+    if update_fields is not None and not REVOCATION_FIELDS & set(update_fields):
+        return
+    if REVOCATION_FIELDS & instance.get_deferred_fields():
+        return
+    revoked = instance.is_deactivated or not instance.is_active
+    if created and not revoked:
+        return
+    set_user_revoked(instance.pk, revoked)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user(sender, instance, **kwargs):
+    # Outstanding tokens of a deleted user must stop working too
+    set_user_revoked(instance.pk, True)
+
+
+@receiver(pre_save, sender=User)
+def remember_token_claims(sender, instance, update_fields=None, raw=False, **kwargs):
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    if update_fields is not None and not {name.removesuffix('_id') for name in update_fields} & {'user_type', 'office'}:
+        return
+    instance._token_claims = sender._default_manager.filter(pk=instance.pk).values(*CLAIM_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def expire_changed_claims(sender, instance, **kwargs):
+    # Tokens carry the role and office they were issued with; a change must not leave old scopes working
+    claims = instance.__dict__.pop('_token_claims', None)
+    if claims and any(claims[field] != getattr(instance, field) for field in CLAIM_FIELDS):
+        expire_claims(instance.pk)
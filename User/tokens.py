@@ -0,0 +1,16 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Claims ClaimsJWTAuthentication builds request.user from instead of loading the row
+USER_TYPE_CLAIM = 'user_type'
+OFFICE_CLAIM = 'office_id'
+
+
+class OfficeRefreshToken(RefreshToken):
+    """Refresh token whose access tokens also carry the user's role and office."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[USER_TYPE_CLAIM] = user.user_type
+        token[OFFICE_CLAIM] = user.office_id
+        return token
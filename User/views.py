@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from django.shortcuts import render
 from rest_framework import permissions, status, serializers
 from rest_framework.exceptions import NotFound, APIException
@@ -6,14 +7,19 @@ from rest_framework.generics import RetrieveUpdateDestroyAPIView, ListCreateAPIV
 from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 
 from Office.models import LegalDocument, Case
+from Office.notes import with_note_summary
 from Office.serializers import LegalDocumentSerializer, CaseDateSerializer, CaseSerializer, ClientSerializer
 from User.models import User
 from User.permission import AdminRequiredPermission, LawyerRequiredPermission, IsSuperUser, UserRequiredPermission
+from User.revocation import revoke_token
 from User.serializers import UserProfileSerializer, UserSerializer, LawyerSerializer, LoginSerializer, \
-    UserDetailsSerializer
+    UserDetailsSerializer, UserListSerializer, UserProfileTokenSerializer
+from project.cache import cache_response
 
 
 # Create your views here.
@@ -21,8 +27,23 @@ class LoginView(TokenObtainPairView):
     serializer_class = LoginSerializer
 
 
+class LogoutView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        # Revoke the access token in use and, when sent, the refresh token it came from
+        revoke_token(request.auth)
+        refresh = request.data.get('refresh')
+        if refresh:
+            try:
+                revoke_token(RefreshToken(refresh))
+            except TokenError:
+                raise serializers.ValidationError({'refresh': ['Token is invalid or expired']})
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class AdminProfileCreate(CreateAPIView):
-    serializer_class = UserProfileSerializer
+    serializer_class = UserProfileTokenSerializer
 
     def post(self, request, *args, **kwargs):
         email = request.data.get('email', '')
@@ -34,7 +55,7 @@ class AdminProfileCreate(CreateAPIView):
 
 class AdminUserProfileCreate(CreateAPIView):
     permission_classes = [permissions.IsAuthenticated, AdminRequiredPermission]
-    serializer_class = UserProfileSerializer
+    serializer_class = UserProfileTokenSerializer
 
     def post(self, request, *args, **kwargs):
         email = request.data.get('email', '')
@@ -46,7 +67,7 @@ class AdminUserProfileCreate(CreateAPIView):
 
 class UserProfileCreate(CreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
-    serializer_class = UserProfileSerializer
+    serializer_class = UserProfileTokenSerializer
 
     def post(self, request, *args, **kwargs):
         email = request.data.get('email', '')
@@ -69,10 +90,12 @@ class LawyerUserProfileView(RetrieveAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        request_id = self.kwargs.get("id")
+        request_id = self.kwargs.get("pk")
         # If the user is an admin, the object is the admin's profile (request.user)
-        user = User.objects.get(id=request_id)
-        return user
+        try:
+            return User.objects.get(id=request_id)
+        except User.DoesNotExist:
+            raise NotFound('User not found.')
 
 class UserProfileView(RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated, UserRequiredPermission]
@@ -120,7 +143,7 @@ class AdminUserUpdateProfileView(UpdateAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        user_id = self.kwargs['id']
+        user_id = self.kwargs['pk']
         try:
             return User.objects.get(id=user_id)
         except User.DoesNotExist:
@@ -132,7 +155,7 @@ class AdminUserGetProfileView(RetrieveAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        user_id = self.kwargs['id']
+        user_id = self.kwargs['pk']
         try:
             return User.objects.get(id=user_id)
         except User.DoesNotExist:
@@ -145,7 +168,7 @@ class AdminUserDeleteProfileView(DestroyAPIView):
     serializer_class = UserProfileSerializer
 
     def get_object(self):
-        user_id = self.kwargs['id']
+        user_id = self.kwargs['pk']
         try:
             return User.objects.get(id=user_id)
         except User.DoesNotExist:
@@ -155,21 +178,17 @@ class AdminUserDeleteProfileView(DestroyAPIView):
 class GetAllUsersView(APIView):
     permission_classes = [permissions.IsAuthenticated, AdminRequiredPermission]
 
+    @cache_response('users')
     def get(self, request, *args, **kwargs):
         # Assume the current user is an Admin with an associated office
         office_id = request.user.office_id
 
-        # Query both User and Lawyer models filtered by office
-        users = User.objects.filter(office_id=office_id)
-        clients = users.filter(user_type='user')
-        lawyers = users.filter(user_type='lawyer')
-
-        # Combine users and lawyers into one list and serialize
-        user_serializer = UserProfileSerializer(users, many=True)
-        lawyer_serializer = UserProfileSerializer(lawyers, many=True)
+        # Load the office roster once; lawyers are a subset of the same rows
+        users = UserListSerializer.setup_queryset(User.objects.filter(office_id=office_id))
+        users_data = UserListSerializer(users, many=True).data
         combined_data = {
-            "users": user_serializer.data,
-            "lawyers": lawyer_serializer.data
+            "users": users_data,
+            "lawyers": [user for user in users_data if user['user_type'] == 'lawyer']
         }
 
         return Response(combined_data, status=200)
@@ -210,6 +229,7 @@ class UserDocumentListView(ListAPIView):
 class LawyerDatesListView(ListAPIView):
     serializer_class = CaseDateSerializer
     permission_classes = [permissions.IsAuthenticated, LawyerRequiredPermission]
+    cursor_ordering = ('-id',)
 
     def get_queryset(self):
         # Filter cases by the current user's ID
@@ -217,12 +237,13 @@ class LawyerDatesListView(ListAPIView):
 
 
 class LawyerListView(ListAPIView):
-    serializer_class = UserProfileSerializer
+    serializer_class = UserListSerializer
     permission_classes = [permissions.IsAuthenticated, LawyerRequiredPermission]
+    cursor_ordering = ('-date_joined', '-id')
 
     def get_queryset(self):
         # Filter documents by the current user's ID
-        return User.objects.filter(user_type='lawyer')
+        return UserListSerializer.setup_queryset(User.objects.filter(user_type='lawyer'))
 
 
 class UserDetailsView(RetrieveAPIView):
@@ -247,9 +268,16 @@ class UserDetailsView(RetrieveAPIView):
 class LawyerClientsListView(ListAPIView):
     serializer_class = ClientSerializer
     permission_classes = [permissions.IsAuthenticated, LawyerRequiredPermission]
+    cursor_ordering = ('-date_joined', '-id')
     def get_queryset(self):
         # Filter clients with cases associated with the current lawyer
-        return User.objects.filter(cases__lawyer_id=self.request.user.id).distinct()
+        lawyer_id = self.request.user.id
+        return User.objects.filter(cases_user__lawyer_id=lawyer_id).distinct().prefetch_related(
+            Prefetch(
+                'cases_user', queryset=with_note_summary(Case.objects.filter(lawyer_id=lawyer_id)),
+                to_attr='lawyer_cases',
+            )
+        )
 
 
 class AdminProfileCreate(APIView):
@@ -0,0 +1,28 @@
+from django.urls import path
+
+from Notification.async_views import AsyncNotificationListView
+from Office.async_views import AsyncRequestListView, AsyncLawyerRequestListView, AsyncUserCasesView, \
+    AsyncHearingDatesView
+from User.async_views import AsyncProfileView
+
+app_name = 'async-api'
+
+# Async versions of the read-heavy routes in api/urls.py, at the same paths under /api/async/
+urlpatterns = [
+    path('requests/', AsyncRequestListView.as_view(user_types=('admin',)), name='request-list'),
+    path('admin/get_requests/', AsyncRequestListView.as_view(user_types=('admin',)), name='request-list-create'),
+    path('admin/create_request/', AsyncRequestListView.as_view(user_types=('admin',)), name='request-create-admin'),
+    path('requests/submit/', AsyncRequestListView.as_view(user_types=('user',)), name='request-create'),
+    path('lawyer_side/requests/', AsyncLawyerRequestListView.as_view(), name='lawyer_requests'),
+    path('lawyer-requests/', AsyncLawyerRequestListView.as_view(), name='lawyer-requests-list'),
+    path('users/cases/', AsyncUserCasesView.as_view(), name='user_cases'),
+    path('lawyer_side/cases/', AsyncUserCasesView.as_view(), name='lawyer_cases'),
+    path('users/dates', AsyncHearingDatesView.as_view(user_types=('user',), case_owner_field='user_id'),
+         name='user-date-get'),
+    path('lawyer_side/dates', AsyncHearingDatesView.as_view(user_types=('lawyer',), case_owner_field='lawyer_id'),
+         name='lawyer-date-get'),
+    path('notifications/', AsyncNotificationListView.as_view(), name='notification-list-create'),
+    path('admin/get_profile', AsyncProfileView.as_view(user_types=('admin',)), name='admin-profile-get'),
+    path('lawyer_side/get_profile', AsyncProfileView.as_view(user_types=('lawyer',)), name='lawyer-profile-get'),
+    path('users/get_profile', AsyncProfileView.as_view(user_types=('user',)), name='user-profile-get'),
+]
@@ -1,3 +1,2187 @@
-from django.test import TestCase
+import base64
+import hashlib
+import io
+import json
+import os
+import re
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from importlib import import_module
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.core import signing
+from django.core.management import call_command
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DatabaseError, connection
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers
+from rest_framework.request import Request as APIRequest
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.views import APIView
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from Invoice.models import Invoice
+from Notification.models import Notification
+from Office.models import Office, Case, Request, Document, LegalDocument, Hearing, PartyName, OfficeRollup, Note, \
+    UploadSession, PartyGram, PartySource
+from Office.notes import with_note_summary
+from Office.parties import normalize_name
+from Office.rollups import compute_office
+from Office.uploads import finalize
+from Office.serializers import CaseSerializer, DocumentSerializer, LawyerRequestSerializer, RequestSerializer
+from Office.utils import approve_requests
+from Office.views import CALENDAR_FEED_SALT
+from User.models import User, Revocation
+from User.revocation import store as revocations
+from User.serializers import UserProfileTokenSerializer
+from User.tokens import OfficeRefreshToken
+from User.views import LawyerListView
+from api import urls as api_urls
+from project.cache import LRUFileBasedCache, response_cache, stats as cache_stats_counter
+from project.images import blob_digest, image_variants, variant_format, variant_name, wait_for_variants
+from project.pagination import KeysetPagination
+from project.serializers import compile_representation
+from project.storage import LOCK_NAME, ContentAddressedStorage, collect_unreferenced
+
+# Queries allowed per GET, including the one that loads the authenticated user where a view needs it.
+DEFAULT_QUERY_BUDGET = 2
+QUERY_BUDGETS = {
+    'lawyer_side/requests/': 3,
+    'lawyer-requests/': 3,
+    'lawyer_side/lawyer_clients': 3,
+    'request_details/<int:request_id>/': 3,
+    'case/<int:case_id>/documents/': 3,
+    'notifications/': 3,
+    'notifications/<int:pk>/': 3,
+    'users/<int:user_id>/': 4,
+    'cases/<int:case_id>/': 3,
+    'calendar/<str:token>.ics': 2,
+    'conflicts/': 4,
+    'cases/<int:case_id>/notes/': 3,
+    'request/<int:request_id>/notes/': 3,
+}
+# Seconds allowed per GET on the large dataset.
+WALL_CLOCK_BUDGET = 1.0
+# Status of a GET of each route the role may read; every other route refuses the role (403) or GETs (405).
+EXPECTED_STATUS = {
+    'admin': {
+        'admin/get_invoices/': 200, 'admin/get_profile': 200, 'admin/get_users/': 200,
+        'admin/cache_stats/': 200, 'admin/create_request/': 200, 'admin/get_requests/': 200,
+        'admin/legal-documents/': 200, 'admin/request/<int:pk>/': 200, 'request/<int:pk>/': 200,
+        'lawyer_side/user/<int:pk>/': 200, 'users/detail': 200, 'users/get_profile': 200,
+        'calendar/<str:token>.ics': 200, 'calendar/feed/': 200, 'search/': 200, 'dashboard/': 200,
+        'conflicts/': 200, 'requests/': 200, 'cases/<int:case_id>/notes/': 200,
+        'request/<int:request_id>/': 200, 'request/<int:request_id>/notes/': 200,
+        'notifications/': 200, 'notifications/<int:pk>/': 200,
+        'documents/<int:pk>/download/': 200, 'legal-documents/<int:pk>/download/': 200,
+        'images/<str:digest>/<str:variant>/': 200,
+    },
+    'lawyer': {
+        'lawyer_side/get_profile': 200, 'lawyer_side/requests/': 200, 'lawyer-requests/': 200,
+        'lawyer_side/<int:pk>/': 200, 'lawyer_side/dates': 200, 'lawyer_side/lawyer_clients': 200,
+        'lawyer_side/legaldocuments/': 200, 'users/<int:user_id>/': 200, 'users/detail': 200,
+        'users/get_profile': 200, 'calendar/<str:token>.ics': 200, 'calendar/feed/': 200, 'search/': 200,
+        'dashboard/': 200, 'conflicts/': 200, 'cases/<int:case_id>/notes/': 200,
+        'request/<int:request_id>/notes/': 200, 'request_details/<int:request_id>/': 200,
+        'uploads/<uuid:upload_id>/': 200, 'documents/<int:pk>/download/': 200,
+        'images/<str:digest>/<str:variant>/': 200,
+        # Legal documents are only served to the admin who added them
+        'legal-documents/<int:pk>/download/': 404,
+    },
+    'user': {
+        'users/legaldocuments/': 200, 'users/get_profile': 200, 'users/detail': 200, 'users/cases/': 200,
+        'lawyer_side/cases/': 200, 'users/dates': 200, 'users/documents/': 200, 'users/<int:pk>': 200,
+        'lawyers/<int:pk>': 200, 'requests/submit/': 200, 'cases/<int:case_id>/': 200,
+        'cases/<int:case_id>/notes/': 200, 'case/<int:case_id>/documents/': 200,
+        'request/<int:request_id>/notes/': 200, 'calendar/<str:token>.ics': 200, 'calendar/feed/': 200,
+        'documents/<int:pk>/download/': 200, 'images/<str:digest>/<str:variant>/': 200,
+        'legal-documents/<int:pk>/download/': 404,
+    },
+}
+
+SMALL_ROWS = 3
+LARGE_ROWS = 30
+
+
+def seed_office(office, admin, lawyer, rows):
+    """Give the office `rows` clients, each with a case, request, document, invoice and notification."""
+    for _ in range(rows):
+        index = User.objects.count()
+        client = User.objects.create_user(
+            username=f'client{index}', email=f'client{index}@example.com', password='secret',
+            user_type='user', role='client', office=office,
+        )
+        case = Case.objects.create(
+            status='Open', plaintiff_name=client.username, defendant_name=f'Defendant {index}',
+            case_type='civil', description='Contract dispute', date='2024-10-01', time='10:00',
+            user=client, lawyer=lawyer, office=office,
+        )
+        req = Request.objects.create(
+            request_type='consultation', description='Contract dispute', case_type='civil',
+            plaintiff_name=client.username, defendant_name=f'Defendant {index}',
+            user=client, lawyer=lawyer, case=case, office=office,
+        )
+        Note.objects.create(case=case, author=lawyer, body='Initial review')
+        Note.objects.create(request=req, author=admin, body='Client called')
+        Hearing.objects.create(case=case, starts_at=datetime(2024, 10, 1, 10, tzinfo=dt_timezone.utc))
+        Document.objects.create(
+            filename='contract.pdf', document_type='case', uploader=lawyer, case=case, request=req, office=office,
+        )
+        Invoice.objects.create(user=client, case=case, amount=150.0, due_date='2024-11-01')
+        LegalDocument.objects.create(admin=admin, title='Template', description='Engagement letter')
+        notification = Notification.objects.create(
+            message='Hearing scheduled', notification_type='system', sender=admin, sender_type='admin',
+            recipient_type='user', office=office, related_object_type='case', related_object_id=case.id,
+        )
+        notification.recipient.add(client, lawyer)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REVOCATION_SYNC_SECONDS=3600,
+)
+class QueryBudgetTests(TestCase):
+    """
+    GETs every route in api/urls.py as each role and checks that the number
+    of queries stays within budget and does not grow with the row count.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # The downloads and the image variant are served from real files
+        media = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        cls.addClassCleanup(settings.disable)
+        super().setUpClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office', address='Riyadh')
+        photo = io.BytesIO()
+        Image.new('RGB', (120, 80), (200, 30, 30)).save(photo, format='PNG')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin',
+            lawfirm='Firm', office=cls.office, photo=SimpleUploadedFile('admin.png', photo.getvalue()),
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer',
+            lawfirm='Firm', office=cls.office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user',
+            role='client', office=cls.office,
+        )
+
+        # A second office keeps the scoping filters honest
+        other = Office.objects.create(office_name='Other office')
+        other_admin = User.objects.create_user(
+            username='otheradmin', email='otheradmin@example.com', password='secret', user_type='admin', office=other,
+        )
+        other_lawyer = User.objects.create_user(
+            username='otherlawyer', email='otherlawyer@example.com', password='secret', user_type='lawyer',
+            office=other,
+        )
+        seed_office(other, other_admin, other_lawyer, SMALL_ROWS)
+
+        cls.case = Case.objects.create(
+            status='Open', case_type='civil', user=cls.client_user, lawyer=cls.lawyer, office=cls.office,
+        )
+        cls.request_obj = Request.objects.create(
+            user=cls.client_user, lawyer=cls.lawyer, case=cls.case, office=cls.office,
+        )
+        cls.invoice = Invoice.objects.create(user=cls.client_user, case=cls.case, amount=10.0, due_date='2024-11-01')
+        cls.notification = Notification.objects.create(
+            message='Welcome', notification_type='system', sender=cls.admin, recipient_type='user', office=cls.office,
+        )
+        cls.notification.recipient.add(cls.client_user)
+        cls.document = Document.objects.create(
+            filename='contract.pdf', document_type='case', uploader=cls.lawyer, case=cls.case,
+            request=cls.request_obj, office=cls.office, file=SimpleUploadedFile('contract.pdf', b'%PDF-1.4'),
+        )
+        cls.legal_document = LegalDocument.objects.create(
+            admin=cls.admin, title='Template', file=SimpleUploadedFile('template.pdf', b'%PDF-1.4 template'),
+        )
+        cls.upload = UploadSession.objects.create(
+            uploader=cls.lawyer, case=cls.case, filename='brief.pdf', size=1024,
+        )
+
+    def object_pks(self):
+        # <int:pk> of the routes whose pk is not a user's
+        return {
+            'request/<int:pk>/': self.request_obj.id,
+            'admin/request/<int:pk>/': self.request_obj.id,
+            'lawyer_side/<int:pk>/': self.request_obj.id,
+            'notifications/<int:pk>/': self.notification.id,
+            'documents/<int:pk>/download/': self.document.id,
+            'legal-documents/<int:pk>/download/': self.legal_document.id,
+        }
+
+    def url_kwargs(self):
+        return {
+            'id': self.invoice.id,
+            'pk': self.client_user.id,
+            'user_id': self.client_user.id,
+            'case_id': self.case.id,
+            'request_id': self.request_obj.id,
+        }
+
+    def route_path(self, route):
+        path = '/api/' + route.replace('<int:pk>', str(self.object_pks().get(route, self.client_user.id)))
+        for name, value in self.url_kwargs().items():
+            path = path.replace(f'<int:{name}>', str(value))
+        if '<str:token>' in route:
+            path = path.replace('<str:token>', self.feed_token)
+        path = path.replace('<str:digest>', blob_digest(self.admin.photo.name)).replace('<str:variant>', 'thumbnail')
+        path = path.replace('<int:number>', '1').replace('<uuid:upload_id>', str(self.upload.id))
+        if route == 'search/':
+            path += '?q=contract'
+        if route == 'conflicts/':
+            path += '?name=client'
+        return path
+
+    def client_for(self, user):
+        self.feed_token = signing.dumps({'u': user.id, 't': user.user_type}, salt=CALENDAR_FEED_SALT)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def measure(self, user):
+        client = self.client_for(user)
+        results = {}
+        for pattern in api_urls.urlpatterns:
+            route = str(pattern.pattern)
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.get(self.route_path(route))
+                elapsed = time.perf_counter() - started
+            response.close()
+            results[route] = (response.status_code, [query['sql'] for query in queries.captured_queries], elapsed)
+        return results
+
+    def format_sql(self, label, statements):
+        lines = [f'{label}: {len(statements)} queries']
+        lines += [f'  {index}. {sql}' for index, sql in enumerate(statements, 1)]
+        return '\n'.join(lines)
+
+    def check_role(self, user):
+        # The revocation log is read once per REVOCATION_SYNC_SECONDS; keep that read out of the per-route counts
+        revocations.reset()
+        revocations.sync()
+        small = self.measure(user)
+        seed_office(self.office, self.admin, self.lawyer, LARGE_ROWS)
+        large = self.measure(user)
+
+        for route, (status_code, statements, elapsed) in large.items():
+            with self.subTest(role=user.user_type, route=route, status=status_code):
+                expected = EXPECTED_STATUS[user.user_type].get(route)
+                if expected is None:
+                    self.assertIn(status_code, (403, 405))
+                else:
+                    self.assertEqual(status_code, expected)
+                budget = QUERY_BUDGETS.get(route, DEFAULT_QUERY_BUDGET)
+                self.assertLessEqual(
+                    len(statements), budget,
+                    self.format_sql(f'{route} exceeded its budget of {budget}', statements),
+                )
+                small_statements = small[route][1]
+                self.assertEqual(
+                    len(statements), len(small_statements),
+                    self.format_sql(f'{route} with {SMALL_ROWS} rows', small_statements) + '\n'
+                    + self.format_sql(f'{route} with {SMALL_ROWS + LARGE_ROWS} rows', statements),
+                )
+                self.assertLess(elapsed, WALL_CLOCK_BUDGET, f'{route} took {elapsed:.3f}s')
+
+    def test_admin_routes(self):
+        self.check_role(self.admin)
+
+    def test_lawyer_routes(self):
+        self.check_role(self.lawyer)
+
+    def test_user_routes(self):
+        self.check_role(self.client_user)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class CalendarFeedTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        office = Office.objects.create(office_name='Main office')
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=office,
+        )
+        client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=office,
+        )
+        case = Case.objects.create(
+            case_type='civil', plaintiff_name='Sara, Nora', user=client_user, lawyer=cls.lawyer, office=office,
+        )
+        cls.hearing = Hearing.objects.create(case=case, starts_at=datetime(2024, 10, 1, 10, tzinfo=dt_timezone.utc))
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+
+    def feed_url(self):
+        client = APIClient()
+        client.force_authenticate(self.lawyer)
+        return client.get('/api/calendar/feed/').json()['data']['url']
+
+    def test_feed_streams_events_and_honours_etag(self):
+        url = self.feed_url()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertIn('DTSTART:20241001T100000Z', body)
+        self.assertIn('DESCRIPTION:Sara\\, Nora', body)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+        self.hearing.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+        # Events also show the case's details
+        self.hearing.case.address = 'Court 3'
+        self.hearing.case.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Court 3', b''.join(response.streaming_content).decode())
+
+    def test_tampered_token_is_rejected(self):
+        self.assertEqual(self.client.get(self.feed_url().replace('.ics', 'x.ics')).status_code, 404)
+
+    def test_links_stop_working_with_the_account(self):
+        url = self.feed_url()
+        with self.settings(CALENDAR_FEED_MAX_AGE=-1):
+            self.assertEqual(self.client.get(url).status_code, 404)
+
+        # Made before the lawyer became a client, whose scope differs
+        with mock.patch('time.time', return_value=time.time() - 60):
+            url = self.feed_url()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.user_type = 'user'
+            self.lawyer.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+        url = self.feed_url()
+        self.assertEqual(self.client.get(url).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.is_deactivated = True
+            self.lawyer.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class HearingScheduleTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        office = Office.objects.create(office_name='Main office')
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=office,
+        )
+        cls.case = Case.objects.create(case_type='civil', user=cls.client_user, lawyer=cls.lawyer, office=office)
+        cls.hearings = {
+            moment: Hearing.objects.create(case=cls.case, starts_at=moment)
+            for moment in (
+                datetime(2024, 10, 3, 9, tzinfo=dt_timezone.utc),
+                datetime(2024, 9, 30, 23, 59, tzinfo=dt_timezone.utc),
+                datetime(2024, 10, 3, 23, 30, tzinfo=dt_timezone.utc),
+                datetime(2024, 10, 1, 10, tzinfo=dt_timezone.utc),
+                datetime(2024, 10, 4, tzinfo=dt_timezone.utc),
+            )
+        }
+
+    def dates(self, user, route, params):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get(f'/api/{route}', params)
+
+    def test_window_includes_the_whole_last_day_in_order(self):
+        expected = [
+            self.hearings[datetime(2024, 10, 1, 10, tzinfo=dt_timezone.utc)].id,
+            self.hearings[datetime(2024, 10, 3, 9, tzinfo=dt_timezone.utc)].id,
+            self.hearings[datetime(2024, 10, 3, 23, 30, tzinfo=dt_timezone.utc)].id,
+        ]
+        for user, route in ((self.client_user, 'users/dates'), (self.lawyer, 'lawyer_side/dates')):
+            with self.subTest(route=route):
+                response = self.dates(user, route, {'from': '2024-10-01', 'to': '2024-10-03'})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([entry['hearing_id'] for entry in response.json()['data']], expected)
+
+                everything = self.dates(user, route, {}).json()['data']
+                self.assertEqual([entry['starts_at'] for entry in everything],
+                                 sorted(moment.isoformat() for moment in self.hearings))
+
+    def test_malformed_or_inverted_window_is_rejected(self):
+        for params in ({'from': 'yesterday'}, {'to': '2024-10-32'}, {'from': '2024-10-05', 'to': '2024-10-01'},
+                       {'from': '2024-10-01T12:00:00Z', 'to': '2024-10-01T11:00:00Z'}):
+            for user, route in ((self.client_user, 'users/dates'), (self.lawyer, 'lawyer_side/dates')):
+                with self.subTest(route=route, params=params):
+                    self.assertEqual(self.dates(user, route, params).status_code, 400)
+
+    def test_setting_a_date_adds_a_hearing_once(self):
+        client = APIClient()
+        client.force_authenticate(self.lawyer)
+        hearings = self.case.hearings.count()
+        for _ in range(2):
+            response = client.post(f'/api/case/date/{self.case.id}/', {'date': '2024-11-05', 'time': '09:30'})
+            self.assertEqual(response.status_code, 201)
+        response = client.post('/api/date/', {'case_id': self.case.id, 'date': '2024-11-05', 'time': '09:30'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.case.hearings.count(), hearings + 1)
+
+        # Adjourning to a later date keeps the earlier session on the schedule
+        client.post(f'/api/case/date/{self.case.id}/', {'date': '2024-12-01', 'time': '09:30'})
+        self.assertEqual(
+            list(self.case.hearings.filter(starts_at__gte=datetime(2024, 11, 1, tzinfo=dt_timezone.utc))
+                 .values_list('starts_at', flat=True)),
+            [datetime(2024, 11, 5, 9, 30, tzinfo=dt_timezone.utc), datetime(2024, 12, 1, 9, 30, tzinfo=dt_timezone.utc)],
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkApproveTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=cls.office,
+        )
+        other = Office.objects.create(office_name='Other office')
+        cls.foreign_request = Request.objects.create(office=other)
+        cls.pending = [
+            Request.objects.create(
+                office=cls.office, user=cls.client_user, plaintiff_name='Sara', defendant_name=f'Defendant {n}',
+                national_address='Riyadh',
+            )
+            for n in range(3)
+        ]
+        for request_obj in cls.pending:
+            Note.objects.create(request=request_obj, author=cls.admin, body='Called')
+
+    def test_bulk_approval_reports_each_item(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        first, second, third = self.pending
+        Request.objects.filter(id=third.id).update(status='Approved')
+        items = [
+            {'request_id': first.id, 'lawyer_id': self.lawyer.id, 'date': '2024-10-01', 'time': '10:00'},
+            {'request_id': second.id, 'lawyer_id': self.lawyer.id},
+            {'request_id': third.id},
+            {'request_id': self.foreign_request.id},
+            {'request_id': first.id},
+        ]
+
+        response = client.post('/api/admin/approve/bulk/', {'items': items}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual((data['approved'], data['failed']), (2, 3))
+        self.assertEqual([result['success'] for result in data['results']], [True, True, False, False, False])
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'Approved')
+        self.assertEqual(first.case_id, data['results'][0]['case_id'])
+        self.assertEqual(first.case.defendant_name, 'Defendant 0')
+        self.assertEqual(first.case.lawyer_id, self.lawyer.id)
+        self.assertEqual(first.case.hearings.count(), 1)
+        self.assertEqual(list(first.case.notes_case.values_list('body', flat=True)), ['Called'])
+        self.assertEqual(Notification.objects.filter(related_object_id=first.case_id).count(), 2)
+
+    def test_single_approval_uses_the_same_path(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        request_obj = self.pending[0]
+
+        response = client.put(f'/api/admin/approve/{request_obj.id}/', {'lawyer_id': self.lawyer.id}, format='json')
+        self.assertEqual(response.status_code, 200)
+        request_obj.refresh_from_db()
+        self.assertEqual(request_obj.case.user_id, self.client_user.id)
+
+        self.assertEqual(client.put(f'/api/admin/approve/{request_obj.id}/', {}, format='json').status_code, 400)
+        self.assertEqual(
+            client.put(f'/api/admin/approve/{self.foreign_request.id}/', {}, format='json').status_code, 404,
+        )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RequestImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=cls.office,
+        )
+
+    def upload(self, name, content):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/admin/requests/import/', {'file': SimpleUploadedFile(name, content)},
+                               format='multipart')
+        self.assertEqual(response.status_code, 200)
+        return [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+
+    def test_csv_rows_are_validated_and_reported_by_line(self):
+        content = (
+            'plaintiff_name,defendant_name,status,user_id,notes\n'
+            f'Sara,Omar,pending,{self.client_user.id},Called twice\n'
+            f'Nora,Ali,archived,{self.client_user.id},\n'
+            'Huda,Reem,,999,\n'
+        ).encode()
+
+        report = self.upload('intake.csv', content)
+
+        self.assertEqual(report[:-1], [
+            {'line': 3, 'errors': {'status': ['Invalid status']}},
+            {'line': 4, 'errors': {'user_id': ['No user with id 999 in this office.']}},
+        ])
+        self.assertEqual(report[-1], {'summary': {'imported': 1, 'failed': 2}})
+        imported = Request.objects.get(office=self.office)
+        self.assertEqual(
+            (imported.plaintiff_name, list(imported.notes_request.values_list('body', flat=True))),
+            ('Sara', ['Called twice']),
+        )
+
+    def test_ndjson_rows(self):
+        content = (
+            json.dumps({'plaintiff_name': 'Sara', 'notes': ['a']}) + '\n\n'
+            + 'not json\n'
+            + json.dumps({'plaintiff_name': 'x' * 101}) + '\n'
+        ).encode()
+
+        report = self.upload('intake.ndjson', content)
+
+        self.assertEqual([entry.get('line') for entry in report[:-1]], [3, 4])
+        self.assertIn('plaintiff_name', report[1]['errors'])
+        self.assertEqual(report[-1], {'summary': {'imported': 1, 'failed': 2}})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConflictCheckTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='mohammed_hassan', email='m.hassan@example.com', password='secret', user_type='user',
+            office=cls.office,
+        )
+        Case.objects.create(plaintiff_name='Sara Nasser', defendant_name='Gulf Trading', office=cls.office)
+        cls.intake = Request.objects.create(
+            plaintiff_name='Gulf Trading Co', defendant_name='Muhamad Hasan', office=cls.office,
+        )
+        other = Office.objects.create(office_name='Other office')
+        Case.objects.create(plaintiff_name='Mohamed Hassan', office=other)
+
+    def check(self, **params):
+        client = APIClient()
+        client.force_authenticate(self.lawyer)
+        response = client.get('/api/conflicts/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']['conflicts']
+
+    def test_incoming_defendant_matches_existing_client(self):
+        conflicts = self.check(request_id=self.intake.id)
+        self.assertEqual({(c['role'], c['source_type'], c['source_id']) for c in conflicts}, {
+            ('client', 'user', self.client_user.id),
+        })
+        self.assertGreater(conflicts[0]['similarity'], 0.5)
+
+        roles = {c['role'] for c in self.check(name='gulf trading', roles=['plaintiff', 'defendant'])}
+        self.assertEqual(roles, {'plaintiff', 'defendant'})
+
+    def test_index_follows_writes(self):
+        with self.assertNumQueries(1):
+            # Saves that do not touch a name leave the index alone
+            self.client_user.save(update_fields=['last_login'])
+        with CaptureQueriesContext(connection) as queries:
+            # Nor do full saves that change no name
+            self.client_user.phone = '0500000000'
+            self.client_user.save()
+        self.assertFalse([query['sql'] for query in queries.captured_queries if '"Office_party' in query['sql']])
+
+        self.client_user.username = 'khaled_othman'
+        self.client_user.email = 'k.othman@example.com'
+        self.client_user.save()
+        self.assertEqual(self.check(name='Muhamad Hasan'), [])
+        self.assertEqual(self.check(name='Khalid Uthman')[0]['source_id'], self.client_user.id)
+
+        self.client_user.delete()
+        self.assertEqual(self.check(name='Khaled Othman'), [])
+        self.assertFalse(PartyName.objects.filter(normalized__startswith='khalid').exists())
+
+    def test_names_inserted_concurrently_are_shared(self):
+        party = PartyName.objects.get(office=self.office, normalized=normalize_name('Sara Nasser'))
+        grams = PartyGram.objects.filter(party=party).count()
+        # Another save stored the name after this one looked for it
+        found = [{}, {(self.office.id, party.normalized): party.id}]
+        with mock.patch('Office.parties.stored_party_ids', side_effect=found):
+            Case.objects.create(plaintiff_name='Sara Nasser', office=self.office)
+        self.assertEqual(PartySource.objects.filter(party=party, source_type='case').count(), 2)
+        self.assertEqual(PartyGram.objects.filter(party=party).count(), grams)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+
+    def stored(self):
+        return dict(OfficeRollup.objects.filter(office=self.office).values_list('lawyer_id', 'counters'))
+
+    def assertInStep(self):
+        self.assertEqual(self.stored(), compute_office(self.office.id))
+
+    def test_counters_follow_writes(self):
+        counters = self.stored()[None]
+        self.assertEqual(counters['requests_by_status'], {'Pending': SMALL_ROWS})
+        self.assertEqual(counters['unpaid_invoices'], {'count': SMALL_ROWS, 'total': 150.0 * SMALL_ROWS})
+        self.assertEqual(counters['unread_notifications'], {'count': SMALL_ROWS})
+        self.assertEqual(self.stored()[self.lawyer.id]['cases_by_type'], {'civil': SMALL_ROWS})
+
+        case = Case.objects.first()
+        case.status = 'Closed'
+        case.save()
+        invoice = Invoice.objects.first()
+        invoice.status = 'Paid'
+        invoice.save(update_fields=['status'])
+        Notification.objects.first().delete()
+        Request.objects.first().delete()
+        self.assertInStep()
+
+        client_user = User.objects.filter(user_type='user').first()
+        client_user.delete()
+        self.assertInStep()
+
+    def test_invoices_follow_their_case(self):
+        other_lawyer = User.objects.create_user(
+            username='other', email='other@example.com', password='secret', user_type='lawyer', office=self.office,
+        )
+        case = Invoice.objects.filter(case__isnull=False).first().case
+        case.lawyer = other_lawyer
+        case.save()
+        self.assertInStep()
+        self.assertEqual(self.stored()[other_lawyer.id]['unpaid_invoices']['count'], case.invoices_case.count())
+
+        case.delete()
+        self.assertInStep()
+
+    def test_bulk_paths_and_rebuild(self):
+        pending = Request.objects.create(plaintiff_name='Nora', user=self.admin, office=self.office)
+        approve_requests([{'request_id': pending.id, 'lawyer_id': self.lawyer.id}], self.office.id, self.admin)
+        self.assertInStep()
+
+        OfficeRollup.objects.filter(office=self.office, lawyer=None).update(counters={})
+        out = io.StringIO()
+        call_command('rebuild_rollups', office=[self.office.id], workers=1, stdout=out)
+        self.assertIn('(1 drifted)', out.getvalue())
+        self.assertInStep()
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = client.get('/api/dashboard/')
+        self.assertEqual(response.json()['data']['counters']['requests_by_status']['Approved'], 1)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class GenerateDatasetTests(TestCase):
+    OPTIONS = {'offices': 2, 'lawyers_per_office': 1, 'clients_per_office': 2, 'requests_per_client': 1,
+               'notifications_per_client': 1, 'stdout': io.StringIO()}
+
+    def test_rerun_skips_offices_already_generated(self):
+        call_command('generate_dataset', **self.OPTIONS)
+        users = list(User.objects.order_by('username').values_list('username', 'phone'))
+        Office.objects.filter(office_name='s1 Office 1').delete()
+        User.objects.filter(username__startswith='s1_1_').delete()
+
+        call_command('generate_dataset', **self.OPTIONS)
+        self.assertEqual(Office.objects.filter(office_name__startswith='s1 Office').count(), 2)
+        # The office generated again is the one the first run made
+        self.assertEqual(list(User.objects.order_by('username').values_list('username', 'phone')), users)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class NotesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=cls.office,
+        )
+        cls.case = Case.objects.create(office=cls.office, lawyer=cls.lawyer, user=cls.client_user)
+        cls.request_obj = Request.objects.create(office=cls.office, lawyer=cls.lawyer, user=cls.client_user)
+        Note.objects.bulk_create([Note(case=cls.case, author=cls.lawyer, body=f'Note {n}') for n in range(5)])
+
+    def client_as(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def test_notes_are_paged_newest_first(self):
+        client = self.client_as(self.client_user)
+        first = client.get(f'/api/cases/{self.case.id}/notes/', {'page_size': 2}).json()['data']
+        self.assertEqual([note['body'] for note in first['results']], ['Note 4', 'Note 3'])
+        self.assertEqual(first['results'][0]['author_name'], 'lawyer')
+        second = client.get(first['next']).json()['data']
+        self.assertEqual([note['body'] for note in second['results']], ['Note 2', 'Note 1'])
+
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='secret', user_type='user', office=self.office,
+        )
+        self.assertEqual(self.client_as(other).get(f'/api/cases/{self.case.id}/notes/').status_code, 404)
+
+    def test_adding_a_note_is_a_single_insert(self):
+        client = self.client_as(self.lawyer)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.post(f'/api/request/{self.request_obj.id}/notes/', {'body': 'Called back'},
+                                   format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        writes = [query['sql'] for query in queries.captured_queries
+                  if not query['sql'].startswith(('SELECT', 'SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(writes), 1, writes)
+        self.assertTrue(writes[0].startswith('INSERT INTO "Office_note"'))
+        self.assertEqual(response.json()['data']['author'], self.lawyer.id)
+
+        response = self.client_as(self.client_user).post(
+            f'/api/request/{self.request_obj.id}/notes/', {'body': 'Hello'}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_lists_carry_a_count_and_the_latest_note(self):
+        response = self.client_as(self.lawyer).patch(
+            f'/api/lawyer_side/{self.request_obj.id}/', {'note': 'Documents received'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        summary = response.json()['data']
+        self.assertEqual(summary['notes_count'], 1)
+        self.assertEqual(summary['latest_note']['body'], 'Documents received')
+        self.assertEqual(summary['latest_note']['author'], 'lawyer')
+
+        cases = self.client_as(self.client_user).get('/api/users/cases/').json()['data']['results']
+        self.assertEqual((cases[0]['notes_count'], cases[0]['latest_note']['body']), (5, 'Note 4'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        requests = [Request.objects.create(office=cls.office, plaintiff_name=f'Sara {n}') for n in range(7)]
+        # Pairs and a triple created in the same instant
+        moments = [datetime(2024, 10, 1, hour, tzinfo=dt_timezone.utc) for hour in (9, 9, 10, 10, 10, 11, 12)]
+        for request_obj, moment in zip(requests, moments):
+            Request.objects.filter(id=request_obj.id).update(created_at=moment)
+        cls.newest_first = list(Request.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+
+    def page(self, url, params=None):
+        paginator = KeysetPagination()
+        rows = paginator.paginate_queryset(Request.objects.all(), APIRequest(RequestFactory().get(url, params)))
+        return [row.id for row in rows], paginator
+
+    def test_pages_walk_ties_by_id(self):
+        seen, url, params = [], '/api/requests/', {'page_size': 2}
+        while url:
+            ids, paginator = self.page(url, params)
+            self.assertLessEqual(len(ids), 2)
+            seen += ids
+            url, params = paginator.get_next_link(), None
+        self.assertEqual(seen, self.newest_first)
+        self.assertEqual(len(set(seen)), len(seen))
+
+    def test_previous_returns_the_page_next_came_from(self):
+        pages, url = [], '/api/requests/?page_size=3'
+        while url:
+            ids, paginator = self.page(url)
+            pages.append((ids, paginator))
+            url = paginator.get_next_link()
+        self.assertEqual([ids for ids, _ in pages], [self.newest_first[:3], self.newest_first[3:6], self.newest_first[6:]])
+
+        for (expected, _), (_, later) in zip(pages, pages[1:]):
+            ids, paginator = self.page(later.get_previous_link())
+            self.assertEqual(ids, expected)
+            # And forward again
+            self.assertEqual(self.page(paginator.get_next_link())[0], [row.id for row in later.page])
+        self.assertIsNone(pages[0][1].get_previous_link())
+        self.assertIsNone(pages[-1][1].get_next_link())
+
+    @override_settings(PAGINATION_MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        default = KeysetPagination.page_size
+        for page_size, expected in (('50', 4), ('2', 2), ('0', default), ('x', default)):
+            with self.subTest(page_size=page_size):
+                ids, _ = self.page('/api/requests/', {'page_size': page_size})
+                self.assertEqual(ids, self.newest_first[:expected])
+
+    def test_tampered_cursors_are_rejected(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+        # The async views only take tokens
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(self.admin).access_token}')
+        for cursor in ('not a cursor', token('[]'), token('{"p": ["2024-10-01T10:00:00+00:00"]}'),
+                       token('{"p": ["yesterday", 3]}'), token('{"p": ["2024-10-01T10:00:00+00:00", "x"]}'),
+                       token('{"p": [5, 3]}'), token('{"p": [null, 3]}'), token('{"p": "ab"}')):
+            for path in ('/api/requests/', '/api/async/requests/'):
+                with self.subTest(cursor=cursor, path=path):
+                    response = client.get(path, {'cursor': cursor})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn('cursor', response.json()['data'])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SparseFieldsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+
+    def get(self, user, path, params):
+        client = APIClient()
+        client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path, params)
+        # Leave out the conditional GET's validator aggregate, which covers the whole scope whatever the fields
+        return response, [query['sql'] for query in queries.captured_queries if 'conditional_count' not in query['sql']]
+
+    def test_fields_limit_keys_columns_and_relations(self):
+        for path in ('/api/lawyer_side/requests/', '/api/lawyer-requests/'):
+            with self.subTest(path=path):
+                response, statements = self.get(self.lawyer, path, {'fields': 'id,status'})
+                self.assertEqual(response.status_code, 200, response.content)
+                rows = response.json()['data']['results']
+                self.assertEqual(len(rows), SMALL_ROWS)
+                self.assertEqual({key for row in rows for key in row}, {'id', 'status'})
+                self.assertEqual(len(statements), 1, statements)
+                self.assertNotIn('plaintiff_name', statements[0])
+                self.assertNotIn('Office_note', statements[0])
+
+        response, statements = self.get(self.lawyer, '/api/lawyer_side/requests/', {'omit': 'documents,user'})
+        row = response.json()['data']['results'][0]
+        self.assertNotIn('documents', row)
+        self.assertIn('latest_note', row)
+        self.assertFalse([sql for sql in statements if 'Office_document' in sql or '"User_user"."email"' in sql])
+
+    def test_notifications_skip_unrequested_recipients(self):
+        response, statements = self.get(self.admin, '/api/notifications/', {'fields': 'id,message'})
+        self.assertEqual(response.json()['data']['results'][0], {
+            'id': Notification.objects.latest('id').id, 'message': 'Hearing scheduled',
+        })
+        self.assertFalse([sql for sql in statements if 'recipient' in sql])
+
+    def test_unknown_fields_are_rejected(self):
+        response, _ = self.get(self.lawyer, '/api/lawyer-requests/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class UserTokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+
+    def keys(self, data):
+        if isinstance(data, dict):
+            for key, value in data.items():
+                yield key
+                yield from self.keys(value)
+        elif isinstance(data, list):
+            for value in data:
+                yield from self.keys(value)
+
+    def test_rosters_carry_no_tokens(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        roster = client.get('/api/admin/get_users/').json()['data']
+        self.assertEqual(len(roster['users']), SMALL_ROWS + 2)
+
+        request = APIRequestFactory().get('/api/lawyers/')
+        force_authenticate(request, self.lawyer)
+        response = LawyerListView.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [self.lawyer.id])
+
+        for payload in (roster, response.data):
+            self.assertFalse({'access', 'refresh'} & set(self.keys(payload)))
+
+    def classes(self, kind, base):
+        # The classes each app's views or serializers module defines
+        for app in ('User', 'Office', 'Notification', 'Invoice'):
+            module = import_module(f'{app}.{kind}')
+            for value in vars(module).values():
+                if isinstance(value, type) and issubclass(value, base) and value.__module__ == module.__name__:
+                    yield value
+
+    def test_only_the_create_views_issue_tokens(self):
+        views = {
+            view.__name__ for view in self.classes('views', APIView)
+            if issubclass(getattr(view, 'serializer_class', None) or object, UserProfileTokenSerializer)
+        }
+        self.assertEqual(views, {'AdminUserProfileCreate', 'UserProfileCreate'})
+
+        # Nor is it nested in what other serializers render
+        for serializer in self.classes('serializers', serializers.BaseSerializer):
+            with self.subTest(serializer=serializer.__name__):
+                self.assertFalse(any(
+                    isinstance(getattr(field, 'child', field), UserProfileTokenSerializer)
+                    for field in serializer._declared_fields.values()
+                ))
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.post('/api/admin/create_user/', {
+            'username': 'newclient', 'email': 'newclient@example.com', 'password': 'Quiet-harbour-71',
+            'user_type': 'user', 'role': 'client',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual({'access', 'refresh'}, set(response.json()['data']))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REVOCATION_SYNC_SECONDS=3600)
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.request_obj = Request.objects.create(office=cls.office, lawyer=cls.lawyer)
+
+    def setUp(self):
+        revocations.reset()
+
+    def client_with(self, token):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.access_token}')
+        return client
+
+    def test_role_and_office_come_from_the_token(self):
+        client = self.client_with(OfficeRefreshToken.for_user(self.lawyer))
+        revocations.sync()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['office_id'], self.office.id)
+        self.assertFalse([query['sql'] for query in queries.captured_queries if 'FROM "User_user"' in query['sql']])
+
+        # Anything beyond the claims loads the row once
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/lawyer_side/get_profile')
+        self.assertEqual(response.json()['data']['username'], 'lawyer')
+        self.assertEqual(len([query for query in queries.captured_queries
+                              if query['sql'].startswith('SELECT') and 'FROM "User_user"' in query['sql']]), 1)
+
+        response = client.post(f'/api/request/{self.request_obj.id}/notes/', {'body': 'Seen'}, format='json')
+        self.assertEqual(response.json()['data']['author'], self.lawyer.id)
+
+    def test_tokens_without_claims_still_work(self):
+        response = self.client_with(RefreshToken.for_user(self.lawyer)).get('/api/dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_deactivated_users_are_rejected(self):
+        client = self.client_with(OfficeRefreshToken.for_user(self.lawyer))
+        self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.is_deactivated = True
+            self.lawyer.save(update_fields=['is_deactivated'])
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(client.get('/api/dashboard/').status_code, 401)
+        self.assertEqual(len(queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.is_deactivated = False
+            self.lawyer.save()
+        self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+
+    def test_changing_role_or_office_expires_issued_tokens(self):
+        client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='secret', user_type='user', office=self.office,
+        )
+        other_office = Office.objects.create(office_name='Other office')
+        for user, field, value in ((self.lawyer, 'user_type', 'user'), (client_user, 'office', other_office)):
+            with self.subTest(field=field):
+                access = OfficeRefreshToken.for_user(user).access_token
+                # Issued well before the change, not within the same second
+                access.set_iat(at_time=access.current_time - timedelta(minutes=1))
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+                self.assertEqual(client.get('/api/users/detail').status_code, 200)
+
+                with self.captureOnCommitCallbacks(execute=True):
+                    setattr(user, field, value)
+                    user.save()
+                self.assertEqual(client.get('/api/users/detail').status_code, 401)
+                fresh = self.client_with(OfficeRefreshToken.for_user(user)).get('/api/users/detail')
+                self.assertEqual(fresh.status_code, 200)
+
+        # Saves that change neither leave tokens alone
+        with self.captureOnCommitCallbacks(execute=True):
+            client_user.address = 'New street'
+            client_user.save()
+        self.assertEqual(Revocation.objects.filter(kind='claims').count(), 2)
+
+    def test_other_workers_catch_up_from_the_log(self):
+        client = self.client_with(OfficeRefreshToken.for_user(self.lawyer))
+        self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+        # Written by another process: this one only sees it at its next sync
+        Revocation.objects.create(kind='user', user_id=self.lawyer.id)
+        self.assertEqual(client.get('/api/dashboard/').status_code, 200)
+        with override_settings(REVOCATION_SYNC_SECONDS=0):
+            self.assertEqual(client.get('/api/dashboard/').status_code, 401)
+
+    def test_logout_revokes_the_tokens(self):
+        refresh = OfficeRefreshToken.for_user(self.lawyer)
+        client = self.client_with(refresh)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/auth/logout/', {'refresh': str(refresh)}, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(client.get('/api/dashboard/').status_code, 401)
+        self.assertEqual(Revocation.objects.filter(kind='token').count(), 2)
+        # Other tokens of the same user keep working
+        other_session = self.client_with(OfficeRefreshToken.for_user(self.lawyer))
+        self.assertEqual(other_session.get('/api/dashboard/').status_code, 200)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REVOCATION_SYNC_SECONDS=3600,
+)
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+        cls.client_user = User.objects.filter(user_type='user').first()
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+
+    async def get(self, user, path, data=None):
+        headers = {'Authorization': f'Bearer {OfficeRefreshToken.for_user(user).access_token}'} if user else None
+        return await AsyncClient().get(path, data, headers=headers)
+
+    async def test_async_routes_answer_like_the_sync_ones(self):
+        routes = [
+            (self.admin, 'requests/'),
+            (self.admin, 'notifications/'),
+            (self.admin, 'admin/get_profile'),
+            (self.lawyer, 'lawyer_side/requests/'),
+            (self.lawyer, 'lawyer_side/dates'),
+            (self.lawyer, 'lawyer_side/get_profile'),
+            (self.client_user, 'users/cases/'),
+            (self.client_user, 'users/dates'),
+            (self.client_user, 'users/get_profile'),
+        ]
+        for user, path in routes:
+            with self.subTest(path=path):
+                expected = await self.get(user, f'/api/{path}')
+                self.assertEqual(expected.status_code, 200)
+                response = await self.get(user, f'/api/async/{path}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_pages_and_sparse_fields(self):
+        response = await self.get(self.admin, '/api/async/requests/', {'page_size': 2, 'fields': 'status,notes_count'})
+        first = response.json()['data']
+        self.assertEqual(len(first['results']), 2)
+        self.assertEqual(set(first['results'][0]), {'status', 'notes_count'})
+        rest = (await self.get(self.admin, first['next'])).json()['data']
+        self.assertEqual(len(rest['results']), SMALL_ROWS - 2)
+        self.assertIsNone(rest['next'])
+
+        response = await self.get(self.admin, '/api/async/requests/', {'fields': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_authentication_and_roles(self):
+        response = await self.get(None, '/api/async/requests/')
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(response.json()['success'])
+
+        self.assertEqual((await self.get(self.lawyer, '/api/async/requests/')).status_code, 403)
+        self.assertEqual((await AsyncClient().post('/api/async/lawyer_side/requests/')).status_code, 405)
+
+        await Revocation.objects.acreate(kind='user', user_id=self.lawyer.id)
+        with override_settings(REVOCATION_SYNC_SECONDS=0):
+            self.assertEqual((await self.get(self.lawyer, '/api/async/lawyer_side/requests/')).status_code, 401)
+
+    async def test_revoked_tokens_and_stale_claims_are_rejected_like_the_sync_ones(self):
+        revoked = OfficeRefreshToken.for_user(self.admin).access_token
+        await Revocation.objects.acreate(kind='token', jti=revoked['jti'])
+        # Issued before the client's role or office changed
+        stale = OfficeRefreshToken.for_user(self.client_user).access_token
+        stale.set_iat(at_time=stale.current_time - timedelta(minutes=1))
+        await Revocation.objects.acreate(kind='claims', user_id=self.client_user.id)
+
+        with override_settings(REVOCATION_SYNC_SECONDS=0):
+            for token, path in ((revoked, 'requests/'), (stale, 'users/cases/')):
+                for prefix in ('/api/', '/api/async/'):
+                    with self.subTest(path=prefix + path):
+                        response = await AsyncClient().get(prefix + path, headers={'Authorization': f'Bearer {token}'})
+                        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REVOCATION_SYNC_SECONDS=3600,
+)
+class ResponseCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        response_cache().clear()
+        cache_stats_counter.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_hits_skip_the_queries(self):
+        client = self.client_for(self.admin)
+        for path in ('/api/requests/', '/api/admin/get_users/', '/api/admin/get_invoices/',
+                     '/api/admin/legal-documents/'):
+            with self.subTest(path=path):
+                first = client.get(path)
+                self.assertEqual(first['X-Cache'], 'MISS')
+                with CaptureQueriesContext(connection) as queries:
+                    second = client.get(path)
+                self.assertEqual(second['X-Cache'], 'HIT')
+                self.assertEqual(second.json(), first.json())
+                # At most the conditional GET's validator aggregate
+                self.assertLessEqual(len(queries), 1)
+
+        # Query strings are part of the key
+        self.assertEqual(client.get('/api/requests/', {'fields': 'status'})['X-Cache'], 'MISS')
+        stats = client.get('/api/admin/cache_stats/').json()['data']
+        self.assertEqual(stats['RequestListView'], {'hits': 1, 'misses': 2, 'hit_rate': 0.333})
+
+    def test_writes_expire_their_office_only(self):
+        client = self.client_for(self.admin)
+        client.get('/api/requests/')
+        client.get('/api/admin/get_users/')
+
+        other = Office.objects.create(office_name='Other office')
+        Request.objects.create(office=other)
+        self.assertEqual(client.get('/api/requests/')['X-Cache'], 'HIT')
+
+        req = Request.objects.filter(office=self.office).first()
+        Note.objects.create(request=req, author=self.admin, body='Called back')
+        response = client.get('/api/requests/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            max(row['notes_count'] for row in response.json()['data']['results']), 2,
+        )
+        # Other topics keep their entries; a sign-in does not touch the roster
+        self.assertEqual(client.get('/api/admin/get_users/')['X-Cache'], 'HIT')
+        self.lawyer.last_login = timezone.now()
+        self.lawyer.save(update_fields=['last_login'])
+        self.assertEqual(client.get('/api/admin/get_users/')['X-Cache'], 'HIT')
+        self.lawyer.phone = '0500000000'
+        self.lawyer.save()
+        self.assertEqual(client.get('/api/admin/get_users/')['X-Cache'], 'MISS')
+
+    def test_bulk_writes_expire_requests(self):
+        client = self.client_for(self.admin)
+        client.get('/api/requests/')
+        req = Request.objects.filter(office=self.office, case__isnull=True).first() or \
+            Request.objects.create(office=self.office)
+        approve_requests([{'request_id': req.id}], self.office.id, self.admin)
+        self.assertEqual(client.get('/api/requests/')['X-Cache'], 'MISS')
+
+    def test_per_user_entries(self):
+        other_admin = User.objects.create_user(
+            username='admin2', email='admin2@example.com', password='secret', user_type='admin', office=self.office,
+        )
+        own = self.client_for(self.admin).get('/api/admin/legal-documents/').json()['data']
+        response = self.client_for(other_admin).get('/api/admin/legal-documents/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertNotEqual(response.json()['data'], own)
+
+    def test_file_backend_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LRUFileBasedCache(directory, {'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+            for index, key in enumerate(('a', 'b', 'c')):
+                cache.set(key, key)
+                os.utime(cache._key_to_file(key), (index, index))
+            self.assertEqual(cache.get('a'), 'a')
+            cache.set('d', 'd')
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual([cache.get(key) for key in ('a', 'c', 'd')], ['a', 'c', 'd'])
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], REVOCATION_SYNC_SECONDS=3600,
+)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+        cls.client_user = User.objects.filter(user_type='user').first()
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        response_cache().clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def assertNotModified(self, client, path, **headers):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(path, **headers)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries), 1)
+        return response
+
+    def test_unchanged_lists_answer_304(self):
+        routes = [
+            (self.admin, '/api/requests/'),
+            (self.admin, '/api/admin/get_invoices/'),
+            (self.admin, '/api/notifications/'),
+            (self.lawyer, '/api/lawyer_side/requests/'),
+            (self.lawyer, '/api/lawyer-requests/'),
+            (self.client_user, '/api/users/cases/'),
+            (self.client_user, '/api/users/documents/'),
+        ]
+        for user, path in routes:
+            with self.subTest(path=path):
+                client = self.client_for(user)
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Last-Modified'])
+                self.assertNotModified(client, path, HTTP_IF_NONE_MATCH=response['ETag'])
+                # Another page or field set is another representation
+                self.assertEqual(client.get(path, {'page_size': 1}, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                                 200)
+
+    def test_writes_change_the_etag(self):
+        client = self.client_for(self.admin)
+        req = Request.objects.create(office=self.office, user=self.client_user)
+        writes = [
+            lambda: Note.objects.create(request=req, author=self.admin, body='Called back'),
+            lambda: Request.objects.filter(pk=req.pk).first().save(),
+            lambda: approve_requests([{'request_id': req.id}], self.office.id, self.admin),
+            lambda: Request.objects.filter(office=self.office).last().delete(),
+        ]
+        etag = client.get('/api/requests/')['ETag']
+        for index, write in enumerate(writes):
+            write()
+            response = client.get('/api/requests/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200, f'write {index}')
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_profile_edits_change_the_etag_of_lists_nesting_users(self):
+        routes = [
+            (self.lawyer, '/api/lawyer_side/requests/', self.client_user),
+            (self.lawyer, '/api/lawyer-requests/', self.client_user),
+            (self.admin, '/api/notifications/', self.client_user),
+            (self.admin, '/api/notifications/', self.admin),
+        ]
+        for user, path, edited in routes:
+            with self.subTest(path=path, edited=edited.username):
+                client = self.client_for(user)
+                etag = client.get(path)['ETag']
+                edited.email = f'renamed.{edited.email}'
+                edited.save()
+                response = client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(edited.email, json.dumps(response.json()))
+
+    def test_details_answer_if_modified_since(self):
+        case = Case.objects.filter(user=self.client_user).first()
+        client = self.client_for(self.client_user)
+        response = client.get(f'/api/cases/{case.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotModified(client, f'/api/cases/{case.id}/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertNotModified(client, f'/api/cases/{case.id}/', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        Hearing.objects.filter(case=case).delete()
+        self.assertEqual(client.get(f'/api/cases/{case.id}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+        # Lists ignore If-Modified-Since: a deletion leaves their newest timestamp as it was
+        response = client.get('/api/users/cases/', HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_cache_hits_still_validate(self):
+        client = self.client_for(self.admin)
+        etag = client.get('/api/requests/')['ETag']
+        response = client.get('/api/requests/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response['ETag'], etag)
+        self.assertNotModified(client, '/api/requests/', HTTP_IF_NONE_MATCH=etag)
+
+
+class StreamingListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+        cls.client_user = User.objects.filter(user_type='user').first()
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        response_cache().clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def test_stream_matches_a_single_page(self):
+        routes = [
+            (self.admin, '/api/requests/'),
+            (self.admin, '/api/notifications/'),
+            (self.client_user, '/api/users/cases/'),
+            (self.client_user, '/api/requests/submit/'),
+            (self.lawyer, '/api/lawyer-requests/'),
+        ]
+        for user, path in routes:
+            with self.subTest(path=path):
+                client = self.client_for(user)
+                page = client.get(path, {'page_size': 500})
+                streamed = client.get(path, {'stream': '1'})
+                self.assertEqual(streamed.status_code, 200)
+                self.assertTrue(streamed.streaming)
+                self.assertEqual(streamed['Content-Type'], 'application/json')
+                self.assertEqual(b''.join(streamed.streaming_content), page.content)
+                self.assertTrue(streamed.has_header('ETag'))
+
+    def test_stream_reads_rows_in_chunks(self):
+        client = self.client_for(self.admin)
+        expected = client.get('/api/requests/', {'page_size': 500}).content
+        total = len(json.loads(expected)['data']['results'])
+        with mock.patch('Office.views.RequestListView.stream_chunk_size', 2):
+            response = client.get('/api/requests/', {'stream': '1', 'fields': 'status'})
+            parts = list(response.streaming_content)
+        # The envelope's head and tail around one part per chunk
+        self.assertEqual(len(parts), 2 + -(-total // 2))
+        results = json.loads(b''.join(parts))['data']['results']
+        self.assertEqual(len(results), total)
+        self.assertEqual({tuple(row) for row in results}, {('status',)})
+
+    def test_stream_of_no_rows(self):
+        office = Office.objects.create(office_name='Empty office')
+        admin = User.objects.create_user(
+            username='empty', email='empty@example.com', password='secret', user_type='admin', office=office,
+        )
+        response = self.client_for(admin).get('/api/requests/', {'stream': '1'})
+        self.assertEqual(
+            json.loads(b''.join(response.streaming_content)),
+            {'success': True, 'data': {'next': None, 'previous': None, 'results': []}},
+        )
+
+    def test_without_stream_lists_are_paged(self):
+        response = self.client_for(self.admin).get('/api/requests/', {'stream': '0', 'page_size': 1})
+        self.assertFalse(response.streaming)
+        self.assertEqual(len(response.json()['data']['results']), 1)
+        self.assertIsNotNone(response.json()['data']['next'])
+
+
+class CompiledRepresentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, SMALL_ROWS)
+        cls.client_user = User.objects.filter(user_type='user').first()
+        # Rows with the values a plain page leaves out: no notes, a stored file, unset keys
+        Request.objects.create(status='done', judgment_document_path='judgments/1.pdf', office=cls.office)
+        Case.objects.create(status='Open', user=cls.client_user, office=cls.office)
+        Document.objects.create(
+            filename='scan.pdf', file='case/Document/scan.pdf', document_type='case', uploader=cls.lawyer,
+            case=Case.objects.filter(user=cls.client_user).first(), office=cls.office,
+        )
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        response_cache().clear()
+
+    def api_request(self, params=None):
+        return APIRequest(RequestFactory().get('/', params or {}))
+
+    def assertParity(self, serializer_class, queryset, params=None):
+        context = {'request': self.api_request(params)}
+        compiled = compile_representation(serializer_class(context=context), queryset)
+        self.assertIsNotNone(compiled)
+        expected = serializer_class(queryset, many=True, context=context).data
+        self.assertEqual(compiled.data(queryset), json.loads(json.dumps(expected)))
+        return compiled
+
+    def test_compiled_rows_match_the_serializer(self):
+        self.assertParity(RequestSerializer, with_note_summary(Request.objects.order_by('id')))
+        self.assertParity(CaseSerializer, with_note_summary(Case.objects.order_by('id')))
+        compiled = self.assertParity(DocumentSerializer, Document.objects.order_by('id'))
+        self.assertIn('http://testserver/', str([row['file'] for row in compiled.data(Document.objects.all())]))
+
+    def test_sparse_fields_compile_to_fewer_columns(self):
+        compiled = self.assertParity(
+            RequestSerializer, with_note_summary(Request.objects.order_by('id')), {'fields': 'status,notes_count'},
+        )
+        self.assertEqual([column for _, column, _ in compiled.table], ['status', 'notes_count'])
+
+    def test_fields_needing_instances_do_not_compile(self):
+        queryset = LawyerRequestSerializer.setup_queryset(Request.objects.all())
+        self.assertIsNone(compile_representation(LawyerRequestSerializer(), queryset))
+        # The note summary is only read from its annotations
+        self.assertIsNone(compile_representation(RequestSerializer(), Request.objects.all()))
+
+    def test_lists_render_as_before(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(self.client_user).access_token}')
+        documents = Document.objects.filter(case__user=self.client_user)
+        response = client.get(f'/api/case/{documents[0].case_id}/documents/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data'], json.loads(json.dumps(DocumentSerializer(documents, many=True).data)))
+        # Fields that do not compile fall back to the serializer
+        with mock.patch('project.serializers.compile_representation', return_value=None):
+            fallback = client.get(f'/api/case/{documents[0].case_id}/documents/')
+        self.assertEqual(fallback.json()['data'], response.json()['data'])
+
+        response = client.get('/api/users/cases/', {'page_size': 1})
+        page = response.json()['data']
+        self.assertEqual(page['results'], json.loads(json.dumps(CaseSerializer(
+            with_note_summary(Case.objects.filter(user=self.client_user).order_by('-id')[:1]), many=True,
+        ).data)))
+        following = client.get(page['next']).json()['data']
+        self.assertNotEqual(following['results'], page['results'])
+
+
+# Blobs are released as soon as nothing references them, unless a test sets a grace period
+@override_settings(BLOB_RELEASE_GRACE_SECONDS=0)
+class StoredFileTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, 2)
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def stored_files(self):
+        return sorted(
+            os.path.relpath(os.path.join(directory, name), self.media_root)
+            for directory, _, names in os.walk(self.media_root) for name in names
+            if name != os.path.basename(LOCK_NAME)
+        )
+
+    def document(self, content, name='evidence.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Document.objects.create(
+                filename=name, file=SimpleUploadedFile(name, content), document_type='case', uploader=self.lawyer,
+            )
+
+    def test_same_upload_to_several_cases_is_stored_once(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(self.lawyer).access_token}')
+        cases = list(Case.objects.filter(lawyer=self.lawyer))
+        for case in cases:
+            response = client.post(
+                f'/api/case/upload/{case.id}/', {'file': SimpleUploadedFile('Evidence.PDF', b'%PDF-1.4 evidence')},
+                format='multipart',
+            )
+            self.assertEqual(response.status_code, 201)
+
+        documents = Document.objects.filter(case__in=cases).exclude(file='')
+        self.assertEqual(sorted(document.case_id for document in documents), sorted(case.id for case in cases))
+        digest = hashlib.sha256(b'%PDF-1.4 evidence').hexdigest()
+        name = f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf'
+        self.assertEqual({document.file.name for document in documents}, {name})
+        self.assertEqual({document.office_id for document in documents}, {self.office.id})
+        self.assertEqual(self.stored_files(), [name])
+
+    def test_large_uploads_are_written_only_when_new(self):
+        write_temporary = mock.patch.object(
+            ContentAddressedStorage, 'write_temporary', autospec=True, side_effect=ContentAddressedStorage.write_temporary,
+        )
+        with override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=4), write_temporary as written:
+            first = self.document(b'scanned page' * 1000)
+            second = self.document(b'scanned page' * 1000, name='copy.pdf')
+            other = self.document(b'another page' * 1000)
+        self.assertEqual(first.file.name, second.file.name)
+        self.assertNotEqual(first.file.name, other.file.name)
+        # Hashed before writing: the repeated upload is not written out at all
+        self.assertEqual(written.call_count, 2)
+        # No temporary file is left behind
+        self.assertEqual(self.stored_files(), sorted([first.file.name, other.file.name]))
+        with first.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'scanned page' * 1000)
+
+    def test_streams_read_once_are_hashed_while_written(self):
+        class Stream(io.BytesIO):
+            def seekable(self):
+                return False
+
+            def seek(self, *args):
+                raise io.UnsupportedOperation('seek')
+
+        first = default_storage.save('page.pdf', File(Stream(b'scanned page' * 1000)))
+        second = default_storage.save('copy.pdf', File(Stream(b'scanned page' * 1000)))
+        self.assertEqual(first, second)
+        self.assertEqual(self.stored_files(), [first])
+        with default_storage.open(first) as stored:
+            self.assertEqual(stored.read(), b'scanned page' * 1000)
+
+    def test_blobs_are_deleted_with_their_last_reference(self):
+        first, second = self.document(b'evidence'), self.document(b'evidence')
+        name = first.file.name
+        with self.captureOnCommitCallbacks(execute=True):
+            first.delete()
+        self.assertEqual(self.stored_files(), [name])
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertEqual(self.stored_files(), [])
+
+    def test_blobs_stored_again_outlive_a_concurrent_release(self):
+        document = self.document(b'evidence')
+        name = document.file.name
+        path = os.path.join(self.media_root, name)
+        os.utime(path, (time.time() - 7200, time.time() - 7200))
+
+        with self.settings(BLOB_RELEASE_GRACE_SECONDS=3600):
+            # Another upload of the same bytes finds the blob; its row is not committed yet
+            self.assertEqual(default_storage.save('copy.pdf', ContentFile(b'evidence')), name)
+            with self.captureOnCommitCallbacks(execute=True):
+                document.delete()
+            self.assertEqual(self.stored_files(), [name])
+
+            call_command('clear_unreferenced_blobs', stdout=io.StringIO())
+            self.assertEqual(self.stored_files(), [name])
+            self.assertEqual(collect_unreferenced(default_storage, now=timezone.now() + timedelta(hours=2)), 1)
+            self.assertEqual(self.stored_files(), [])
+
+    def test_replaced_photos_are_released(self):
+        document = self.document(b'portrait', name='portrait.png')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.photo = SimpleUploadedFile('portrait.png', b'portrait')
+            self.lawyer.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lawyer.photo = SimpleUploadedFile('portrait.png', b'new portrait')
+            self.lawyer.save()
+        # The old photo is still the document's file
+        self.assertEqual(self.stored_files(), sorted([document.file.name, self.lawyer.photo.name]))
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertEqual(self.stored_files(), [self.lawyer.photo.name])
+
+    def test_earlier_uploads_move_into_blobs(self):
+        for name in ('image/shot.png', 'image/shot_ZgOFkII.png', 'case/Document/other.png'):
+            os.makedirs(os.path.join(self.media_root, os.path.dirname(name)), exist_ok=True)
+            with open(os.path.join(self.media_root, name), 'wb') as file:
+                file.write(b'other' if 'other' in name else b'screenshot')
+        User.objects.filter(pk=self.admin.pk).update(photo='image/shot.png')
+        User.objects.filter(pk=self.lawyer.pk).update(photo='image/shot_ZgOFkII.png')
+        Document.objects.filter(pk=Document.objects.first().pk).update(file='image/shot.png')
+        Document.objects.filter(pk=Document.objects.last().pk).update(file='case/Document/other.png')
+
+        call_command('store_files_by_content', stdout=io.StringIO())
+
+        photos = set(User.objects.filter(pk__in=[self.admin.pk, self.lawyer.pk]).values_list('photo', flat=True))
+        files = set(Document.objects.exclude(file='').values_list('file', flat=True))
+        self.assertEqual(len(photos), 1)
+        self.assertEqual(len(files), 2)
+        self.assertTrue(photos < files)
+        self.assertEqual(self.stored_files(), sorted(files))
+
+
+@override_settings(UPLOAD_CHUNK_MAX_SIZE=8)
+class ResumableUploadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.other_lawyer = User.objects.create_user(
+            username='other', email='other@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, 1)
+        cls.case = Case.objects.get(lawyer=cls.lawyer)
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media_root = media.name
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def start(self, client, size):
+        response = client.post(f'/api/case/{self.case.id}/uploads/', {'filename': 'Ruling.pdf', 'size': size})
+        self.assertEqual(response.status_code, 201)
+        return response.json()['data']
+
+    def put_chunk(self, client, session, number, offset, body):
+        return client.put(
+            f"/api/uploads/{session['id']}/chunks/{number}/", body,
+            content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunks_are_assembled_into_a_document(self):
+        client = self.client_for(self.lawyer)
+        content = b'court ruling page 1 of 3'
+        session = self.start(client, len(content))
+        for number, offset in enumerate(range(0, len(content), 8), 1):
+            response = self.put_chunk(client, session, number, offset, content[offset:offset + 8])
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['received'], len(content))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(pk=response.json()['data']['document_id'])
+        self.assertEqual((document.case_id, document.office_id, document.uploader_id, document.filename),
+                         (self.case.id, self.office.id, self.lawyer.id, 'Ruling.pdf'))
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        self.assertTrue(document.file.name.startswith('blobs/'))
+        self.assertFalse(os.listdir(os.path.join(self.media_root, 'partial')))
+        self.assertTrue(Notification.objects.filter(related_object_id=self.case.id,
+                                                    notification_type='new_case_document').exists())
+
+        # A finalize repeated after a lost response returns the same document
+        response = client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['document_id'], document.id)
+
+    def test_uploads_resume_from_the_stored_offset(self):
+        client = self.client_for(self.lawyer)
+        session = self.start(client, 12)
+        self.assertEqual(self.put_chunk(client, session, 1, 0, b'abcdefgh').status_code, 200)
+
+        # Resent after a lost response: accepted, not written twice
+        response = self.put_chunk(client, session, 1, 0, b'abcdefgh')
+        self.assertEqual((response.status_code, response.json()['data']['received']), (200, 8))
+        response = self.put_chunk(client, session, 3, 10, b'kl')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['data']['offset'], 8)
+        response = client.get(f"/api/uploads/{session['id']}/")
+        self.assertEqual((response.json()['data']['received'], response.json()['data']['chunks']), (8, 1))
+
+        self.assertEqual(self.put_chunk(client, session, 2, 8, b'ijklmnop').status_code, 400)
+        self.assertEqual(client.post(f"/api/uploads/{session['id']}/finalize/").status_code, 400)
+        self.assertEqual(self.put_chunk(client, session, 2, 8, b'ijkl').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f"/api/uploads/{session['id']}/finalize/")
+        document = Document.objects.get(pk=response.json()['data']['document_id'])
+        with document.file.open('rb') as stored:
+            self.assertEqual(stored.read(), b'abcdefghijkl')
+
+    def test_uploads_lost_to_a_rolled_back_finalize_start_over(self):
+        client = self.client_for(self.lawyer)
+        session = self.start(client, 4)
+        self.assertEqual(self.put_chunk(client, session, 1, 0, b'abcd').status_code, 200)
+        with mock.patch.object(UploadSession, 'save', side_effect=DatabaseError), self.assertRaises(DatabaseError):
+            finalize(UploadSession.objects.get(pk=session['id']))
+
+        response = client.post(f"/api/uploads/{session['id']}/finalize/")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(client.get(f"/api/uploads/{session['id']}/").json()['data']['received'], 0)
+        self.assertEqual(self.put_chunk(client, session, 1, 0, b'abcd').status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(client.post(f"/api/uploads/{session['id']}/finalize/").status_code, 201)
+
+    def test_sessions_belong_to_their_uploader(self):
+        client = self.client_for(self.lawyer)
+        session = self.start(client, 4)
+        other = self.client_for(self.other_lawyer)
+        self.assertEqual(other.get(f"/api/uploads/{session['id']}/").status_code, 404)
+        self.assertEqual(self.put_chunk(other, session, 1, 0, b'abcd').status_code, 404)
+        self.assertEqual(
+            other.post(f'/api/case/{self.case.id}/uploads/', {'filename': 'a.pdf', 'size': 4}).status_code, 404,
+        )
+        response = client.post(f'/api/case/{self.case.id}/uploads/', {'filename': 'a.pdf', 'size': 0})
+        self.assertEqual(response.status_code, 400)
+
+    def test_abandoned_sessions_are_collected(self):
+        client = self.client_for(self.lawyer)
+        stale, fresh = self.start(client, 12), self.start(client, 12)
+        for session in (stale, fresh):
+            self.put_chunk(client, session, 1, 0, b'abcdefgh')
+        long_ago = timezone.now() - timedelta(days=2)
+        UploadSession.objects.filter(pk=stale['id']).update(updated_at=long_ago)
+        orphan = os.path.join(self.media_root, 'partial', str(uuid.uuid4()))
+        open(orphan, 'wb').close()
+        os.utime(orphan, (long_ago.timestamp(), long_ago.timestamp()))
+
+        out = io.StringIO()
+        call_command('clear_upload_sessions', stdout=out)
+        self.assertIn('Deleted 1 ', out.getvalue())
+        self.assertEqual(list(UploadSession.objects.values_list('pk', flat=True)), [uuid.UUID(fresh['id'])])
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'partial')), [fresh['id']])
+
+        self.assertEqual(client.delete(f"/api/uploads/{fresh['id']}/").status_code, 204)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, 'partial')), [])
+
+
+class DownloadTests(TestCase):
+    CONTENT = b'%PDF-1.4 ' + bytes(range(256)) * 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.other_lawyer = User.objects.create_user(
+            username='other', email='other@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, 1)
+        cls.client_user = User.objects.get(user_type='user')
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.document = Document.objects.get(case__user=self.client_user)
+        self.document.file = SimpleUploadedFile('ruling.pdf', self.CONTENT)
+        self.document.save()
+        self.path = f'/api/documents/{self.document.id}/download/'
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(user).access_token}')
+        return client
+
+    def download(self, user, path=None, **headers):
+        response = self.client_for(user).get(path or self.path, HTTP_ACCEPT='application/pdf', **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_parties_of_the_case_download_the_file(self):
+        etag = f'"{hashlib.sha256(self.CONTENT).hexdigest()}"'
+        for user in (self.client_user, self.lawyer, self.admin):
+            with self.subTest(user=user.username):
+                response = self.download(user)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.body(response), self.CONTENT)
+                self.assertEqual(response['Content-Type'], 'application/pdf')
+                self.assertEqual(response['Content-Length'], str(len(self.CONTENT)))
+                self.assertEqual(response['Content-Disposition'], 'inline; filename="contract.pdf"')
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(self.download(self.other_lawyer).status_code, 404)
+        response = self.client_for(self.client_user).get(self.path, {'download': '1'})
+        self.addCleanup(response.close)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment;'))
+
+    def test_repeat_downloads_are_not_modified(self):
+        etag = self.download(self.lawyer)['ETag']
+        response = self.download(self.lawyer, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.download(self.lawyer, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_ranges(self):
+        size = len(self.CONTENT)
+        for header, start, end in (('bytes=2-9', 2, 9), ('bytes=1000-', 1000, size - 1),
+                                   ('bytes=-16', size - 16, size - 1), ('bytes=10-99999', 10, size - 1)):
+            with self.subTest(range=header):
+                response = self.download(self.lawyer, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, 206)
+                self.assertEqual(response['Content-Range'], f'bytes {start}-{end}/{size}')
+                self.assertEqual(response['Content-Length'], str(end - start + 1))
+                self.assertEqual(self.body(response), self.CONTENT[start:end + 1])
+
+        response = self.download(self.lawyer, HTTP_RANGE=f'bytes={size}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{size}')
+        # Several ranges are answered with the whole file
+        self.assertEqual(self.download(self.lawyer, HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_if_range(self):
+        response = self.download(self.lawyer)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(self.download(self.lawyer, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(
+            self.download(self.lawyer, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE=last_modified).status_code, 206,
+        )
+        response = self.download(self.lawyer, HTTP_RANGE='bytes=0-3', HTTP_IF_RANGE='"changed"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.body(response), self.CONTENT)
+
+    def test_sendfile_handoff(self):
+        with override_settings(DOWNLOAD_SENDFILE='x-accel-redirect', DOWNLOAD_ACCEL_PREFIX='/protected/'):
+            response = self.download(self.lawyer, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/{self.document.file.name}')
+        self.assertEqual(response.content, b'')
+        self.assertIn('ETag', response)
+
+        with override_settings(DOWNLOAD_SENDFILE='x-sendfile'):
+            response = self.download(self.lawyer)
+        self.assertEqual(response['X-Sendfile'], self.document.file.path)
+
+    def test_legal_documents(self):
+        legal = LegalDocument.objects.get(admin=self.admin)
+        legal.file = SimpleUploadedFile('letter.pdf', b'engagement letter')
+        legal.save()
+        path = f'/api/legal-documents/{legal.id}/download/'
+        response = self.download(self.admin, path)
+        self.assertEqual(self.body(response), b'engagement letter')
+        self.assertEqual(response['Content-Disposition'], 'inline; filename="Template.pdf"')
+        self.assertEqual(self.download(self.lawyer, path).status_code, 404)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'full-text search uses SQLite FTS5')
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ImageVariantTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        seed_office(cls.office, cls.admin, cls.lawyer, 1)
+        cls.client_user = User.objects.get(user_type='user')
+
+    def setUp(self):
+        revocations.reset()
+        revocations.sync()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # Workers must be done with the temporary media root before it goes
+        self.addCleanup(wait_for_variants)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {OfficeRefreshToken.for_user(self.client_user).access_token}',
+        )
+
+    def png(self, size=(1200, 800)):
+        buffer = io.BytesIO()
+        Image.new('RGBA', size, (200, 30, 30, 255)).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def set_photo(self, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client_user.photo = SimpleUploadedFile('me.png', content)
+            self.client_user.save()
+        wait_for_variants()
+        return blob_digest(self.client_user.photo.name)
+
+    def test_uploaded_photo_is_resized_in_the_background(self):
+        digest = self.set_photo(self.png())
+        for variant, bounds in image_variants().items():
+            with self.subTest(variant=variant):
+                name = variant_name(digest, variant)
+                self.assertTrue(default_storage.exists(name))
+                with default_storage.open(name) as file, Image.open(file) as image:
+                    self.assertEqual(image.format, variant_format().upper())
+                    self.assertEqual(image.width, bounds[0])
+                    self.assertLessEqual(image.height, bounds[1])
+
+        data = self.client.get('/api/users/detail').json()['data']
+        self.assertTrue(data['photo_thumbnail'].endswith('/' + variant_name(digest, 'thumbnail')))
+        self.assertTrue(data['photo_medium'].endswith('/' + variant_name(digest, 'medium')))
+
+    @override_settings(BLOB_RELEASE_GRACE_SECONDS=0)
+    def test_variants_are_deleted_with_their_image(self):
+        digest = self.set_photo(self.png())
+        names = [variant_name(digest, variant) for variant in image_variants()]
+        self.assertTrue(all(default_storage.exists(name) for name in names))
+        self.set_photo(self.png(size=(300, 300)))
+        self.assertFalse(any(default_storage.exists(name) for name in names))
+
+    def test_missing_variants_are_generated_on_first_request(self):
+        with mock.patch('Office.signals.schedule_variants'):
+            digest = self.set_photo(self.png())
+        name = variant_name(digest, 'thumbnail')
+        self.assertFalse(default_storage.exists(name))
+
+        url = self.client.get('/api/users/detail').json()['data']['photo_thumbnail']
+        self.assertTrue(url.endswith(f'/api/images/{digest}/thumbnail/'))
+        response = APIClient().get(url, HTTP_ACCEPT='image/*')
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(default_storage.exists(name))
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (96, 64))
+
+    def test_unknown_images_and_variants_are_not_found(self):
+        digest = self.set_photo(self.png())
+        for path in (f'/api/images/{"0" * 64}/thumbnail/', f'/api/images/{digest}/huge/',
+                     '/api/images/../thumbnail/'):
+            with self.subTest(path=path):
+                self.assertEqual(APIClient().get(path).status_code, 404)
+
+    def test_documents_download_as_variants(self):
+        document = Document.objects.get(case__user=self.client_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.file = SimpleUploadedFile('scan.png', self.png())
+            document.save()
+        wait_for_variants()
+
+        response = self.client.get(f'/api/documents/{document.id}/download/', {'variant': 'medium'})
+        self.addCleanup(response.close)
+        self.assertEqual(response.status_code, 200)
+        extension = os.path.splitext(variant_name(blob_digest(document.file.name), 'medium'))[1]
+        self.assertEqual(response['Content-Disposition'], f'inline; filename="contract{extension}"')
+        with Image.open(io.BytesIO(b''.join(response.streaming_content))) as image:
+            self.assertEqual(image.size, (480, 320))
+
+        # The public endpoint serves profile photos only
+        digest = blob_digest(document.file.name)
+        self.assertEqual(APIClient().get(f'/api/images/{digest}/medium/').status_code, 404)
+
+        # Files that are not images have no variants
+        document.file = SimpleUploadedFile('ruling.pdf', b'%PDF-1.4')
+        document.save()
+        response = self.client.get(f'/api/documents/{document.id}/download/', {'variant': 'medium'})
+        self.assertEqual(response.status_code, 404)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.office = Office.objects.create(office_name='Main office')
+        cls.admin = User.objects.create_user(
+            username='admin', email='admin@example.com', password='secret', user_type='admin', office=cls.office,
+        )
+        cls.lawyer = User.objects.create_user(
+            username='lawyer', email='lawyer@example.com', password='secret', user_type='lawyer', office=cls.office,
+        )
+        cls.named = Case.objects.create(
+            plaintiff_name='Mahmoud Haddad', defendant_name='Gulf Trading', case_type='commercial',
+            description='Unpaid supply invoices', office=cls.office,
+        )
+        Note.objects.create(case=cls.named, body='Haddad prefers mornings')
+        cls.mentioned = Request.objects.create(
+            plaintiff_name='Sara Nasser', description='Witness statement mentions Haddad',
+            lawyer=cls.lawyer, office=cls.office,
+        )
+        Note.objects.create(request=cls.mentioned, body='urgent')
+        other = Office.objects.create(office_name='Other office')
+        Case.objects.create(plaintiff_name='Haddad', office=other)
+
+    def search(self, user, query):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/search/', {'q': query, 'page_size': 1})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['data']
+
+    def test_results_are_ranked_scoped_and_paged(self):
+        first = self.search(self.admin, 'hadd')
+        self.assertEqual([(r['type'], r['id']) for r in first['results']], [('case', self.named.id)])
+        self.assertIn('[Hadd', first['results'][0]['snippet'])
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        second = client.get(first['next']).json()['data']
+        self.assertEqual([(r['type'], r['id']) for r in second['results']], [('request', self.mentioned.id)])
+        self.assertIsNone(second['next'])
+
+        self.assertEqual([r['id'] for r in self.search(self.lawyer, 'haddad')['results']], [self.mentioned.id])
+        self.assertEqual(self.search(self.admin, 'mornings')['results'][0]['id'], self.named.id)
+
+    def test_index_follows_writes(self):
+        self.named.plaintiff_name = 'Khaled Othman'
+        self.named.save()
+        self.named.notes_case.all().delete()
+        self.assertEqual(self.search(self.admin, 'othman')['results'][0]['id'], self.named.id)
+        self.assertEqual([r['type'] for r in self.search(self.admin, 'haddad')['results']], ['request'])
+
+        self.mentioned.delete()
+        self.assertEqual(self.search(self.admin, 'witness')['results'], [])
+
+    def test_operators_in_the_query_are_treated_as_text(self):
+        self.assertEqual(self.search(self.admin, 'office:o1 OR "NEAR(')['results'], [])
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        self.assertEqual(client.get('/api/search/', {'q': '  '}).status_code, 400)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Plans are checked against SQLite EXPLAIN QUERY PLAN output')
+class IndexUsageTests(TestCase):
+    """
+    Runs EXPLAIN QUERY PLAN for the hot access paths and fails when one of
+    them falls back to a full table scan (or, for paginated single-table
+    lists, to sorting the scope instead of reading it in index order).
+    """
+    FULL_SCAN = re.compile(r'\bSCAN (?!CONSTANT ROW)(\S+)')
+
+    def hot_queries(self):
+        page = ('-created_at', '-id')
+        window = (datetime(2024, 1, 1, tzinfo=dt_timezone.utc), datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+        return [
+            ('requests by office', Request.objects.filter(office_id=1).order_by(*page)[:101], True),
+            ('requests by office and status',
+             Request.objects.filter(office_id=1, status='Pending').order_by(*page)[:101], True),
+            ('requests by lawyer', Request.objects.filter(lawyer_id=1).order_by(*page)[:101], True),
+            ('requests by user', Request.objects.filter(user_id=1).order_by(*page)[:101], True),
+            ('cases by user', Case.objects.filter(user_id=1).order_by('-id')[:101], True),
+            ('cases by lawyer', Case.objects.filter(lawyer_id=1).order_by('-id')[:101], True),
+            ('cases by office and status', Case.objects.filter(office_id=1, status='Open'), False),
+            ('cases shared by lawyer and client', Case.objects.filter(lawyer_id=1, user_id=2), False),
+            ('hearings for a client in a window',
+             Hearing.objects.filter(case__user_id=1, starts_at__range=window), False),
+            ('hearings for a lawyer in a window',
+             Hearing.objects.filter(case__lawyer_id=1, starts_at__range=window), False),
+            ('invoices by office', Invoice.objects.filter(user__office_id=1).order_by(*page)[:101], False),
+            ('unpaid invoices by office',
+             Invoice.objects.filter(user__office_id=1, status='Unpaid').order_by('due_date'), False),
+            ('notifications by office', Notification.objects.filter(office_id=1).order_by(*page)[:101], True),
+            ('unread notifications by office', Notification.objects.filter(office_id=1, is_read=False), False),
+            ('legal documents by admin', LegalDocument.objects.filter(admin_id=1).order_by(*page)[:101], True),
+            ('users by office', User.objects.filter(office_id=1), False),
+            ('notes of a case', Note.objects.filter(case_id=1).order_by('-id')[:101], True),
+            ('notes of a request', Note.objects.filter(request_id=1).order_by('-id')[:101], True),
+        ]
+
+    def test_hot_queries_use_indexes(self):
+        for label, queryset, index_ordered in self.hot_queries():
+            with self.subTest(query=label):
+                plan = queryset.explain()
+                message = f'{label}:\n{queryset.query}\n{plan}'
+                self.assertIsNone(self.FULL_SCAN.search(plan), message)
+                if index_ordered:
+                    self.assertNotIn('USE TEMP B-TREE', plan, message)
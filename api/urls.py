@@ -6,8 +6,12 @@ from Office.views import RequestDetailView, ApproveRequestAPIView, DocumentCreat
     CreateUserDateView, LawyerRequestListView, CaseDateCreateView, RequestDateCreateView, LegalDocumentListCreateView, \
     CaseDocumentUploadView, UpdateRequestAPIView, RequestDetailsAPIView, RequestCreateView, RequestListView, \
     UserDatesAPIView, CaseDetailsView, UserCasesView, RequestUserCreateView, UserDocumentsView, CaseDocumentsView, \
-    LawyerDatesAPIView, LawyerRequestsView, LawyerRequestDetailView
-from User.views import AdminProfileView, LoginView, GetAllUsersView, UserProfileView, \
+    LawyerDatesAPIView, LawyerRequestsView, LawyerRequestDetailView, CalendarFeedLinkView, CalendarFeedView, \
+    BulkApproveRequestsAPIView, RequestImportView, SearchView, \
+    ConflictCheckView, DashboardView, CaseNoteListView, RequestNoteListView, \
+    CacheStatsView, UploadSessionCreateView, UploadSessionView, UploadChunkView, UploadFinalizeView, \
+    DocumentDownloadView, LegalDocumentDownloadView, ImageVariantView
+from User.views import AdminProfileView, LoginView, LogoutView, GetAllUsersView, UserProfileView, \
     LawyerDocumentListView, UserDetailsView, LawyerClientsListView, AdminUpdateProfileView, AdminUserUpdateProfileView, \
     AdminUserDeleteProfileView, AdminUserProfileCreate, AdminUserGetProfileView, UserDocumentListView, \
     UserUpdateProfileView, UserProfileCreate, LawyerProfileView, LawyerUpdateProfileView, LawyerUserProfileView
@@ -36,6 +40,12 @@ urlpatterns = [
     path('lawyer_side/cases/', UserCasesView.as_view(), name='lawyer_cases'),
     path('users/dates', UserDatesAPIView.as_view(), name='user-date-get'),
     path('lawyer_side/dates', LawyerDatesAPIView.as_view(), name='user-date-get'),
+    path('calendar/feed/', CalendarFeedLinkView.as_view(), name='calendar-feed-link'),
+    path('calendar/<str:token>.ics', CalendarFeedView.as_view(), name='calendar-feed'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('dashboard/', DashboardView.as_view(), name='dashboard'),
+    path('admin/cache_stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('conflicts/', ConflictCheckView.as_view(), name='conflict-check'),
     path('requests/', RequestListView.as_view(), name='request-list'),
     path('lawyer_side/requests/', LawyerRequestsView.as_view(), name='lawyer_requests'),
     path('request/<int:pk>/', RequestDetailView.as_view(), name='request-detail'),
@@ -49,9 +59,11 @@ urlpatterns = [
     ########################
     path('auth/signup/', UserProfileCreate.as_view(), name='user-create'),
     path('auth/login/', LoginView.as_view(), name='login'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
     ##########
 
     path('cases/<int:case_id>/', CaseDetailsView.as_view(), name='get_case_details'),
+    path('cases/<int:case_id>/notes/', CaseNoteListView.as_view(), name='case-notes'),
     ##############
     path('lawyers/<int:pk>', AdminUserGetProfileView.as_view(), name='admin-profile-get'),
     path('users/<int:pk>', AdminUserGetProfileView.as_view(), name='admin-profile-get'),
@@ -61,8 +73,10 @@ urlpatterns = [
 
     path('admin/get_requests/', RequestListView.as_view(), name='request-list-create'),
     path('admin/create_request/', RequestCreateView.as_view(), name='request-create-admin'),
+    path('admin/requests/import/', RequestImportView.as_view(), name='request-import'),
     path('admin/request/<int:pk>/', RequestDetailView.as_view(), name='request-detail-admin'),
     path("admin/approve/<int:request_id>/", ApproveRequestAPIView.as_view(), name="approve_request"),
+    path("admin/approve/bulk/", BulkApproveRequestsAPIView.as_view(), name="bulk_approve_requests"),
     path('office/upload/', DocumentCreateAPIView.as_view(), name='upload_office_document'),
     path('date/', CreateUserDateView.as_view(), name='create-user-date'),
     path('lawyer-requests/', LawyerRequestListView.as_view(), name='lawyer-requests-list'),
@@ -70,7 +84,15 @@ urlpatterns = [
     path('request/date/<int:request_id>/', RequestDateCreateView.as_view(), name='request-date-create'),
     path('admin/legal-documents/', LegalDocumentListCreateView.as_view(), name='legal-doc-list-create'),
     path('case/upload/<int:case_id>/', CaseDocumentUploadView.as_view(), name='case-document-upload'),
+    path('case/<int:case_id>/uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('uploads/<uuid:upload_id>/', UploadSessionView.as_view(), name='upload-session'),
+    path('uploads/<uuid:upload_id>/chunks/<int:number>/', UploadChunkView.as_view(), name='upload-chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', UploadFinalizeView.as_view(), name='upload-finalize'),
+    path('documents/<int:pk>/download/', DocumentDownloadView.as_view(), name='document-download'),
+    path('legal-documents/<int:pk>/download/', LegalDocumentDownloadView.as_view(), name='legal-document-download'),
+    path('images/<str:digest>/<str:variant>/', ImageVariantView.as_view(), name='image-variant'),
     path('request/<int:request_id>/', UpdateRequestAPIView.as_view(), name='update-request'),
+    path('request/<int:request_id>/notes/', RequestNoteListView.as_view(), name='request-notes'),
     path('request_details/<int:request_id>/', RequestDetailsAPIView.as_view(), name='request-details'),
     path('notifications/', CreateListNotificationView.as_view(), name='notification-list-create'),
     path('notifications/<int:pk>/', NotificationDetailView.as_view(), name='notification_detail'),
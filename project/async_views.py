@@ -0,0 +1,87 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions, status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from project.pagination import KeysetPagination
+from project.serializers import SparseFieldsMixin
+
+
+class AsyncAPIView(View):
+    """
+    Async counterpart of APIView for read-only endpoints served under ASGI.
+
+    DRF views are sync only, so an ASGI server hands each of their requests
+    to the thread-sensitive sync adapter. These views authenticate from the
+    token claims, check the role and query through the async ORM without
+    leaving the event loop, and answer with the same {success, data}
+    envelope as project.renderers.CustomJSONRenderer.
+    """
+    http_method_names = ['get', 'head']
+    # Roles allowed to call the view; None lets in any authenticated user
+    user_types = None
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request)
+        headers = {}
+        try:
+            if request.method.lower() not in self.http_method_names:
+                raise exceptions.MethodNotAllowed(request.method)
+            await self.authenticate(request)
+            data = await self.get(request, *args, **kwargs)
+            status_code = status.HTTP_200_OK
+        except Http404:
+            data, status_code = {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND
+        except exceptions.APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            status_code = exc.status_code
+            if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+                status_code = status.HTTP_401_UNAUTHORIZED
+                headers['WWW-Authenticate'] = 'Bearer realm="api"'
+
+        body = JSONRenderer().render({'success': 200 <= status_code < 300, 'data': data})
+        return HttpResponse(body, status=status_code, content_type='application/json', headers=headers)
+
+    async def authenticate(self, request):
+        for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+            authenticator = authentication_class()
+            if hasattr(authenticator, 'aauthenticate'):
+                result = await authenticator.aauthenticate(request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+            if result is not None:
+                request.user, request.auth = result
+                break
+        else:
+            raise exceptions.NotAuthenticated()
+
+        if self.user_types is not None and request.user.user_type not in self.user_types:
+            raise exceptions.PermissionDenied()
+
+    async def get(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+
+class AsyncListView(AsyncAPIView):
+    """Keyset-paginated list; subclasses provide get_queryset() and serializer_class."""
+    serializer_class = None
+    cursor_ordering = KeysetPagination.ordering
+
+    def get_queryset(self, request):
+        raise NotImplementedError
+
+    async def get(self, request, *args, **kwargs):
+        context = {'request': request, 'view': self}
+        queryset = self.get_queryset(request)
+        serializer = self.serializer_class(context=context)
+        if isinstance(serializer, SparseFieldsMixin):
+            queryset = serializer.sparse_queryset(queryset, keep=[name.lstrip('-') for name in self.cursor_ordering])
+
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(queryset, request, view=self)
+        # Rows come with their relations prefetched and summaries annotated, so serializing needs no queries
+        data = self.serializer_class(page, many=True, context=context).data
+        return paginator.get_paginated_response(data).data
@@ -0,0 +1,126 @@
+import functools
+import hashlib
+import os
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+CACHE_HEADER = 'X-Cache'
+
+# {(view name, 'hits' | 'misses'): count} for this process
+stats = Counter()
+
+
+def response_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'responses')]
+
+
+def version_key(office_id, topic):
+    return f'version:{office_id or 0}:{topic}'
+
+
+def office_versions(office_id, topics):
+    """Return the current version of each topic for one office, starting those not yet seen."""
+    cache = response_cache()
+    keys = [version_key(office_id, topic) for topic in topics]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, uuid.uuid4().hex, timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(office_id, *topics):
+    """
+    Give the office's topics new versions, so every cached response built
+    from them stops matching. Versions are random rather than counted: one
+    that gets evicted restarts at a value no old entry was stored under.
+    """
+    def write():
+        response_cache().set_many({version_key(office_id, topic): uuid.uuid4().hex for topic in topics}, timeout=None)
+
+    write()
+    # Again once committed, in case a reader cached the old rows under the new version meanwhile
+    transaction.on_commit(write)
+
+
+def cache_response(*topics, per_user=False):
+    """
+    Cache the 200 responses of a DRF GET handler per office, role, URL and
+    version of each topic it reads; `per_user` adds the user to the key for
+    handlers that filter on it. Runs after authentication and permissions.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            user = request.user
+            name = type(view).__name__
+            versions = ':'.join(office_versions(user.office_id, topics))
+            url = hashlib.sha1(request.build_absolute_uri().encode()).hexdigest()
+            key = f'response:{user.office_id or 0}:{user.user_type}:{user.id if per_user else "*"}:{versions}:{url}'
+
+            cache = response_cache()
+            data = cache.get(key)
+            if data is not None:
+                stats[name, 'hits'] += 1
+                return Response(data, headers={CACHE_HEADER: 'HIT'})
+
+            stats[name, 'misses'] += 1
+            response = handler(view, request, *args, **kwargs)
+            # Streamed responses have no data to keep
+            if isinstance(response, Response) and response.status_code == status.HTTP_200_OK:
+                cache.set(key, response.data)
+            response[CACHE_HEADER] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+def cache_stats():
+    """Hit and miss counts of this process, per view."""
+    views = {}
+    for (name, outcome), count in stats.items():
+        views.setdefault(name, {'hits': 0, 'misses': 0})[outcome] = count
+    for counts in views.values():
+        counts['hit_rate'] = round(counts['hits'] / (counts['hits'] + counts['misses']), 3)
+    return views
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache that evicts the least recently read entries when full,
+    instead of random ones. Lets several workers on one host share entries.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, default, version)
+        if value is not default:
+            try:
+                os.utime(self._key_to_file(key, version))
+            except OSError:
+                pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_used(fname):
+            try:
+                return os.path.getmtime(fname)
+            except OSError:
+                return 0
+
+        for fname in sorted(filelist, key=last_used)[:num_entries // self._cull_frequency]:
+            self._delete(fname)
@@ -0,0 +1,71 @@
+import functools
+import hashlib
+from datetime import datetime
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def conditional_get(handler):
+    """
+    Give a GET handler's 200 responses ETag and Last-Modified validators and
+    answer 304 Not Modified, before the handler runs, when the client's copy
+    is current. The validators come from one aggregate over the view's
+    get_conditional_queryset(); see ConditionalGetMixin.
+    """
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        etag, last_modified = view.get_validators(request)
+        # A deletion leaves the newest timestamp of a list unchanged, so only details trust If-Modified-Since
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified if view.conditional_detail else None,
+        )
+        if response is None:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class ConditionalGetMixin:
+    """
+    View mixin for conditional GETs of the rows in get_conditional_queryset(),
+    which defaults to get_queryset(). The ETag covers the row count, their
+    newest `updated_at`, `conditional_aggregates` over what the rows render
+    from other tables, and the URL, so it changes with any of them.
+    """
+    last_modified_field = 'updated_at'
+    # name -> aggregate, e.g. {'notes_at': Max('notes_request__created_at')}
+    conditional_aggregates = {}
+    # Single-object views also answer If-Modified-Since
+    conditional_detail = False
+
+    @conditional_get
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_conditional_queryset(self):
+        return self.get_queryset()
+
+    def get_validators(self, request):
+        """Return (ETag, Last-Modified timestamp or None) from one aggregate query."""
+        # Joins for the extra aggregates repeat rows, so rows are counted distinct
+        state = self.get_conditional_queryset().order_by().aggregate(
+            conditional_count=Count('pk', distinct=True),
+            conditional_latest=Max(self.last_modified_field),
+            **self.conditional_aggregates,
+        )
+        fingerprint = '|'.join(
+            [str(request.user.id), request.get_full_path(), request.accepted_renderer.format]
+            + [f'{name}={state[name]}' for name in sorted(state)]
+        )
+        etag = quote_etag(hashlib.sha1(fingerprint.encode()).hexdigest())
+        times = [value for value in state.values() if isinstance(value, datetime)]
+        # HTTP dates have whole seconds
+        return etag, int(max(times).timestamp()) if times else None
@@ -0,0 +1,143 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+
+from project.storage import BLOB_DIR
+
+# One range only; other forms (several ranges, other units) get the whole file, as RFC 9110 allows
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class FileRange:
+    """
+    `length` bytes of an open file from `start`, read like a whole file.
+    Leaves the descriptor at `start`, so a WSGI server's file_wrapper can
+    sendfile() Content-Length bytes from there without copying them
+    through Python.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def file_etag(name, stat):
+    """A strong ETag: the content hash of a blob, otherwise the file's size and modification time."""
+    if name.startswith(f'{BLOB_DIR}/'):
+        return quote_etag(os.path.splitext(os.path.basename(name))[0])
+    return quote_etag(f'{stat.st_size:x}-{stat.st_mtime_ns:x}')
+
+
+def if_range_matches(value, etag, last_modified):
+    # Only a strong match allows a partial response
+    if value.startswith('"'):
+        return value == etag
+    return parse_http_date_safe(value) == last_modified
+
+
+def requested_range(request, size, etag, last_modified):
+    """Return (start, length) of the byte range to send, or None for the whole file."""
+    header = request.META.get('HTTP_RANGE', '').strip()
+    if not header or request.method not in ('GET', 'HEAD'):
+        return None
+    if_range = request.META.get('HTTP_IF_RANGE', '').strip()
+    if if_range and not if_range_matches(if_range, etag, last_modified):
+        return None
+    match = RANGE_RE.match(header)
+    if match is None or not any(match.groups()):
+        return None
+
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: the last N bytes
+        length = min(int(last), size)
+        if not length:
+            raise RangeNotSatisfiable
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable
+    return start, end - start + 1
+
+
+def file_response(request, storage, name, filename, as_attachment=False):
+    """
+    Serve the stored file `name` under `filename`, after the caller has
+    checked the user may read it. Answers conditional requests from its
+    ETag and Last-Modified and single byte ranges (honouring If-Range).
+    With DOWNLOAD_SENDFILE set the web server sends the bytes, otherwise
+    Django streams them.
+    """
+    path = storage.path(name)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise Http404("File not found")
+    etag, last_modified = file_etag(name, stat), int(stat.st_mtime)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response['ETag'] = etag
+        return response
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    try:
+        byte_range = requested_range(request, stat.st_size, etag, last_modified)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{stat.st_size}'
+        return response
+
+    handoff = getattr(settings, 'DOWNLOAD_SENDFILE', None)
+    if handoff:
+        # The web server reads the file and answers the Range itself
+        response = HttpResponse(content_type=content_type)
+        if handoff == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/') + '/' + quote(name)
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    else:
+        start, length = byte_range or (0, stat.st_size)
+        response = FileResponse(
+            FileRange(open(path, 'rb'), start, length), content_type=content_type, as_attachment=as_attachment,
+            filename=filename,
+        )
+        response['Content-Length'] = length
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{start + length - 1}/{stat.st_size}'
+
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True)
+    return response
@@ -0,0 +1,163 @@
+import logging
+import mimetypes
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from project.storage import BLOB_DIR, VARIANT_DIR
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+# Futures of the variants still being generated
+pending = set()
+
+
+def image_variants():
+    """{variant: (max width, max height)} from settings.IMAGE_VARIANTS."""
+    return getattr(settings, 'IMAGE_VARIANTS', {'thumbnail': (96, 96), 'medium': (480, 480)})
+
+
+def variant_format():
+    requested = getattr(settings, 'IMAGE_VARIANT_FORMAT', 'webp').lower()
+    return 'webp' if requested == 'webp' and features.check('webp') else 'jpeg'
+
+
+def blob_digest(name):
+    """The content hash in a blob's name (project/storage.py), or None for other names."""
+    if not name or not name.startswith(f'{BLOB_DIR}/'):
+        return None
+    return os.path.splitext(os.path.basename(name))[0]
+
+
+def is_image(name):
+    return (mimetypes.guess_type(name)[0] or '').startswith('image/')
+
+
+def variant_name(digest, variant):
+    """Where a variant of the image with content hash `digest` is cached; it names size and format."""
+    width, height = image_variants()[variant]
+    extension = 'jpg' if variant_format() == 'jpeg' else 'webp'
+    return f'{VARIANT_DIR}/{digest[:2]}/{digest[2:4]}/{digest}-{width}x{height}.{extension}'
+
+
+def find_image(storage, digest):
+    """The stored name of the image blob with content hash `digest`, or None."""
+    directory = f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}'
+    try:
+        _, names = storage.listdir(directory)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        if os.path.splitext(name)[0] == digest and is_image(name):
+            return f'{directory}/{name}'
+    return None
+
+
+def generate_variants(storage, name, only=None):
+    """
+    Write the variants of the stored image `name` not cached yet, or just
+    `only`; return {variant: name} of those now cached. Raises Pillow's
+    errors for files it cannot read.
+    """
+    digest = blob_digest(name)
+    sizes = {variant: size for variant, size in image_variants().items() if only in (None, variant)}
+    names = {variant: variant_name(digest, variant) for variant in sizes}
+    missing = [variant for variant in sizes if not storage.exists(names[variant])]
+    if missing:
+        with storage.open(name, 'rb') as file, Image.open(file) as image:
+            # JPEGs decode at a fraction of full size when that is all the largest variant needs
+            image.draft('RGB', max((sizes[variant] for variant in missing), key=lambda size: size[0] * size[1]))
+            image = ImageOps.exif_transpose(image)
+            for variant in missing:
+                derived = image.copy()
+                derived.thumbnail(sizes[variant], Image.Resampling.LANCZOS)
+                write_variant(storage, names[variant], derived)
+    return names
+
+
+def write_variant(storage, name, image):
+    fmt = variant_format()
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha: flatten onto white
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image.convert('RGBA'), mask=image.convert('RGBA'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Written beside its final name and renamed, so readers never see half an image
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), prefix='.variant-', delete=False) as temporary:
+        try:
+            image.save(temporary, format=fmt, quality=getattr(settings, 'IMAGE_VARIANT_QUALITY', 80))
+        except Exception:
+            os.remove(temporary.name)
+            raise
+    os.replace(temporary.name, path)
+
+
+def executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_VARIANT_WORKERS', 2), thread_name_prefix='image-variants',
+            )
+        return _executor
+
+
+def schedule_variants(storage, name):
+    """Generate the variants of an uploaded image in the worker pool; return the Future, or None."""
+    if blob_digest(name) is None or not is_image(name):
+        return None
+    future = executor().submit(generate_variants, storage, name)
+    pending.add(future)
+    future.add_done_callback(report_failure)
+    return future
+
+
+def report_failure(future):
+    pending.discard(future)
+    error = future.exception()
+    if error is not None:
+        # Requests for the variant regenerate it, or answer 404 for an unreadable image
+        logger.info("Image variants not generated: %s", error)
+
+
+def wait_for_variants():
+    wait(list(pending))
+
+
+def ensure_variant(storage, name, variant):
+    """The stored name of `variant` of the image `name`, generated now if missing; None when there is none."""
+    if variant not in image_variants() or blob_digest(name) is None or not is_image(name):
+        return None
+    try:
+        return generate_variants(storage, name, only=variant)[variant]
+    except (UnidentifiedImageError, OSError) as e:
+        logger.info("Image variant %s of %s not generated: %s", variant, name, e)
+        return None
+
+
+def variant_url(storage, name, variant, request=None):
+    """
+    URL of a variant of the stored image `name`: the cached file when it
+    exists, otherwise the endpoint that generates it on first request.
+    """
+    digest = blob_digest(name)
+    if digest is None or not is_image(name):
+        return None
+    cached = variant_name(digest, variant)
+    if storage.exists(cached):
+        url = storage.url(cached)
+    else:
+        url = reverse('api:image-variant', kwargs={'digest': digest, 'variant': variant})
+    return request.build_absolute_uri(url) if request is not None else url
@@ -0,0 +1,168 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on (created_at, id), newest first.
+
+    Each page is fetched with a `WHERE (created_at, id) < (cursor)` style
+    filter instead of an OFFSET, so deep pages cost the same as the first one.
+    Views whose model has no `created_at` column can set `cursor_ordering`
+    to another tuple of descending fields ending with a unique one.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    @property
+    def max_page_size(self):
+        return getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 500)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.finish_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        # Same page as paginate_queryset(), fetched through the async ORM
+        return self.finish_page([row async for row in self.page_queryset(queryset, request, view)])
+
+    def page_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.cursor_fields = [name.lstrip('-') for name in getattr(view, 'cursor_ordering', self.ordering)]
+        self.limit = self.get_page_size(request)
+
+        self.cursor = self.decode_cursor(request)
+        self.reverse = bool(self.cursor and self.cursor.get('r'))
+
+        order = self.cursor_fields if self.reverse else ['-' + name for name in self.cursor_fields]
+        queryset = queryset.order_by(*order)
+        if self.cursor:
+            queryset = queryset.filter(self._seek_filter(queryset.model, self.cursor['p'], self.reverse))
+
+        # Fetch one extra row to know whether there is another page.
+        return queryset[:self.limit + 1]
+
+    def finish_page(self, rows):
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        if self.reverse:
+            self.has_next = self.cursor is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def encode_cursor(self, row, reverse):
+        # Rows are model instances, or dicts from a values() projection
+        position = [
+            self._position_value(row[name] if isinstance(row, dict) else getattr(row, name))
+            for name in self.cursor_fields
+        ]
+        payload = json.dumps({'p': position, 'r': 1 if reverse else 0}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode('ascii')).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if len(cursor['p']) != len(self.cursor_fields):
+                raise ValueError
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise ValidationError({self.cursor_query_param: self.invalid_cursor_message})
+        return cursor
+
+    def _seek_filter(self, model, position, reverse):
+        values = [self._parse_position(model, name, value) for name, value in zip(self.cursor_fields, position)]
+        lookup = 'gt' if reverse else 'lt'
+
+        # (a, b) < (x, y)  ==  a < x OR (a = x AND b < y)
+        condition = Q()
+        for index, name in enumerate(self.cursor_fields):
+            branch = Q(**{f'{name}__{lookup}': values[index]})
+            for prior in range(index):
+                branch &= Q(**{self.cursor_fields[prior]: values[prior]})
+            condition |= branch
+        return condition
+
+    @staticmethod
+    def _position_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+    @classmethod
+    def _parse_position(cls, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        # Values a client edited into the cursor would otherwise fail in the query
+        try:
+            value = field.to_python(value)
+        except (DjangoValidationError, TypeError, ValueError):
+            value = None
+        if value is None:
+            raise ValidationError({cls.cursor_query_param: cls.invalid_cursor_message})
+        return value
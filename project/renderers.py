@@ -1,5 +1,10 @@
+from itertools import islice
+
+from django.http import StreamingHttpResponse
 from rest_framework.renderers import JSONRenderer
 
+STREAM_PARAM = 'stream'
+
 
 class CustomJSONRenderer(JSONRenderer):
     def render(self, data, accepted_media_type=None, renderer_context=None):
@@ -14,3 +19,46 @@ class CustomJSONRenderer(JSONRenderer):
         }
         return super().render(result, accepted_media_type, renderer_context)
 
+    def render_page_stream(self, chunks):
+        """
+        Yield, chunk by chunk, the bytes render() gives a successful single
+        page holding every row of `chunks` (lists of serialized rows).
+        """
+        # The envelope around an empty page, so it can never drift from render()
+        empty = super().render({'success': True, 'data': {'next': None, 'previous': None, 'results': []}})
+        head, tail = empty.rsplit(b'[]', 1)
+        yield head + b'['
+        separator = b''
+        for chunk in chunks:
+            if chunk:
+                # A rendered list without its brackets is its items joined by commas
+                yield separator + super().render(chunk)[1:-1]
+                separator = b','
+        yield b']' + tail
+
+
+class StreamingListMixin:
+    """
+    List view mixin for `?stream=1`: every row of the filtered queryset in
+    one response, read `stream_chunk_size` rows at a time and written out
+    as each chunk is serialized, so memory stays flat however many rows
+    there are. The body is the one a single page holding them all would
+    have; cursors and page_size do not apply.
+    """
+    stream_chunk_size = 500
+
+    def list(self, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if request.query_params.get(STREAM_PARAM) not in ('1', 'true') or not isinstance(renderer, CustomJSONRenderer):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        ordering = getattr(self, 'cursor_ordering', None) or self.pagination_class.ordering
+        rows = queryset.order_by(*ordering).iterator(chunk_size=self.stream_chunk_size)
+        return StreamingHttpResponse(
+            renderer.render_page_stream(self.serialized_chunks(rows)), content_type=renderer.media_type,
+        )
+
+    def serialized_chunks(self, rows):
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield self.get_serializer(chunk, many=True).data
@@ -0,0 +1,307 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import models
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from project.images import image_variants, variant_url
+from project.pagination import KeysetPagination
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def split_param(value):
+    return [name for name in (part.strip() for part in (value or '').split(',')) if name]
+
+
+def related_paths(tree, prefix=''):
+    # Query.select_related keeps lookups as a nested dict: {'user': {'office': {}}}
+    for name, children in tree.items():
+        yield prefix + name
+        yield from related_paths(children, f'{prefix}{name}__')
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin for `?fields=a,b` and `?omit=c` on GET requests.
+
+    Only the top-level serializer of a response is pruned; a nested
+    serializer is either rendered whole or, when not requested, not at all.
+    `sparse_sources` names the model attributes a computed field reads, for
+    fields whose source does not say (SerializerMethodField and the like).
+    """
+    sparse_sources = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.requested_fields(fields)
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
+
+    def is_sparse_root(self):
+        root = self.root
+        if isinstance(root, serializers.ListSerializer):
+            root = root.child
+        return root is self
+
+    def requested_fields(self, fields):
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD') or not self.is_sparse_root():
+            return None
+        only, omit = split_param(request.query_params.get(FIELDS_PARAM)), \
+            split_param(request.query_params.get(OMIT_PARAM))
+        if not only and not omit:
+            return None
+        unknown = [name for name in only + omit if name not in fields]
+        if unknown:
+            raise ValidationError({FIELDS_PARAM: [f"Unknown field: {name}." for name in unknown]})
+        return set(only or fields) - set(omit)
+
+    def sparse_queryset(self, queryset, keep=()):
+        """
+        Narrow `queryset` to what the rendered fields read: only() their
+        columns, drop select_related()/prefetch_related() lookups no
+        rendered field follows and stop selecting unused annotations. `keep` adds fields the caller itself reads,
+        such as the pagination keys.
+        """
+        request = self.context.get('request')
+        if request is None or not (request.query_params.get(FIELDS_PARAM) or request.query_params.get(OMIT_PARAM)):
+            return queryset
+
+        roots = set(keep)
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in self.sparse_sources:
+                roots.update(self.sparse_sources[name])
+            elif field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+                # No way to tell which columns it reads
+                return queryset
+            else:
+                roots.add(field.source.split('.')[0])
+
+        model = queryset.model
+        columns = [model._meta.pk.name]
+        for root in roots:
+            try:
+                model_field = model._meta.get_field(root)
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                columns.append(root)
+
+        select_related = queryset.query.select_related
+        if select_related is True:
+            # select_related() with no arguments follows every foreign key
+            return queryset
+        prefetches = queryset._prefetch_related_lookups
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if isinstance(select_related, dict):
+            queryset = queryset.select_related(*[
+                path for path in related_paths(select_related) if path.split('__')[0] in roots
+            ])
+        queryset = queryset.prefetch_related(*[
+            lookup for lookup in prefetches
+            if (lookup.prefetch_through if isinstance(lookup, Prefetch) else lookup).split('__')[0] in roots
+        ])
+        queryset = queryset.only(*columns)
+        # Annotations nothing renders are left out of the SELECT (aggregates stay, they shape the grouping)
+        annotations = queryset.query.annotations
+        queryset.query.set_annotation_mask([
+            name for name, expression in annotations.items()
+            if name in roots or name in self.fields or expression.contains_aggregate
+        ])
+        return queryset
+
+
+class SparseFieldsViewMixin:
+    """
+    Generic view mixin that narrows the list queryset to the fields the
+    serializer will render, so `?fields=` also saves columns and joins.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer = self.get_serializer()
+        if not isinstance(serializer, SparseFieldsMixin):
+            return queryset
+        keep = [name.lstrip('-') for name in getattr(self, 'cursor_ordering', KeysetPagination.ordering)]
+        return serializer.sparse_queryset(queryset, keep=keep)
+
+
+class ImageVariantField(serializers.Field):
+    """URL of one variant of an image field (project/images.py), or None for files that are not stored images."""
+
+    def __init__(self, variant, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.variant = variant
+
+    def to_representation(self, value):
+        # A FieldFile, or the stored name when rendered from values()
+        name = getattr(value, 'name', value)
+        if not name:
+            return None
+        return variant_url(getattr(value, 'storage', default_storage), name, self.variant, self.context.get('request'))
+
+
+class ImageVariantsMixin:
+    """
+    Serializer mixin adding `<field>_<variant>` URLs for each image field in
+    `image_variant_fields` and each variant in settings.IMAGE_VARIANTS. Sits
+    after SparseFieldsMixin, so `?fields=` can ask for them.
+    """
+    image_variant_fields = ('photo',)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for source in self.image_variant_fields:
+            if source in fields:
+                for variant in image_variants():
+                    fields[f'{source}_{variant}'] = ImageVariantField(variant, source=source)
+        return fields
+
+
+# Serializer fields whose to_representation() returns values of these model fields unchanged
+PASSTHROUGH_FIELDS = {
+    serializers.CharField: (models.CharField, models.TextField),
+    serializers.IntegerField: (models.IntegerField,),
+    serializers.BooleanField: (models.BooleanField,),
+}
+
+
+class CompiledRepresentation:
+    """
+    A serializer's read-only output compiled to a values() projection and a
+    table of (output name, column, converter); see compile_representation().
+    Rows come out as the dicts the serializer would give, without building
+    model instances or walking DRF fields for each one.
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def project(self, queryset, keep=()):
+        """values() of `queryset` with the compiled columns plus `keep`, e.g. the pagination keys."""
+        columns = dict.fromkeys([column for _, column, _ in self.table] + list(keep))
+        # Prefetches have nothing to attach to on dicts, and no compiled field follows one
+        return queryset.prefetch_related(None).values(*columns)
+
+    def represent(self, rows):
+        table = self.table
+        data = []
+        for row in rows:
+            item = {}
+            for name, column, convert in table:
+                value = row[column]
+                # As Serializer.to_representation(), None is rendered without its field
+                item[name] = value if value is None or convert is None else convert(value)
+            data.append(item)
+        return data
+
+    def data(self, queryset):
+        return self.represent(self.project(queryset))
+
+
+def file_representation(field, model_field):
+    """Converter from a file column's stored name to what `field` (a DRF FileField) renders."""
+    storage = model_field.storage
+    use_url = getattr(field, 'use_url', api_settings.UPLOADED_FILES_USE_URL)
+    request = field.context.get('request')
+
+    def convert(name):
+        if not name:
+            return None
+        if not use_url:
+            return name
+        url = storage.url(name)
+        return request.build_absolute_uri(url) if request is not None else url
+    return convert
+
+
+def compile_field(field, model, annotations):
+    """Return (column, converter or None) reading `field` from values(), or None when it cannot."""
+    if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)) or len(field.source_attrs) != 1:
+        return None
+    column = field.source
+    if column in annotations:
+        return column, field.to_representation
+    try:
+        model_field = model._meta.get_field(column)
+    except FieldDoesNotExist:
+        # A property or method
+        return None
+    if not model_field.concrete or model_field.many_to_many:
+        return None
+
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        # values() gives the id the field would read off its PKOnlyObject
+        return (model_field.attname, None) if field.pk_field is None else None
+    if isinstance(field, serializers.RelatedField):
+        return None
+    if isinstance(field, serializers.FileField):
+        return column, file_representation(field, model_field)
+    if isinstance(field, serializers.ReadOnlyField) or \
+            isinstance(model_field, PASSTHROUGH_FIELDS.get(type(field), ())):
+        return column, None
+    return column, field.to_representation
+
+
+def compile_representation(serializer, queryset):
+    """
+    Compile what `serializer` renders for rows of `queryset` into a
+    CompiledRepresentation, or return None when one of its fields needs
+    the model instance: nested serializers, method fields, dotted sources
+    and the like. Serializers can map such fields to an annotation in
+    `values_sources`: {name: (column, converter or None)}.
+    """
+    values_sources = getattr(serializer, 'values_sources', {})
+    annotations = queryset.query.annotation_select
+    table = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in values_sources:
+            column, convert = values_sources[name]
+            if column not in annotations:
+                return None
+            table.append((name, column, convert))
+            continue
+        compiled = compile_field(field, queryset.model, annotations)
+        if compiled is None:
+            return None
+        table.append((name, *compiled))
+    return CompiledRepresentation(table)
+
+
+def compiled_data(serializer, queryset):
+    """What the unbound `serializer` renders for every row of `queryset`, compiled when its fields allow."""
+    compiled = compile_representation(serializer, queryset)
+    if compiled is None:
+        return type(serializer)(queryset, many=True, context=serializer.context).data
+    return compiled.data(queryset)
+
+
+class CompiledListViewMixin:
+    """
+    List view mixin that renders pages through compile_representation(),
+    falling back to the serializer when its fields do not compile. Sits
+    after StreamingListMixin and before SparseFieldsViewMixin.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        compiled = compile_representation(self.get_serializer(), queryset)
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+
+        keep = [name.lstrip('-') for name in getattr(self, 'cursor_ordering', KeysetPagination.ordering)]
+        page = self.paginate_queryset(compiled.project(queryset, keep))
+        if page is None:
+            return Response(compiled.represent(compiled.project(queryset)))
+        return self.get_paginated_response(compiled.represent(page))
@@ -141,6 +141,13 @@ SIMPLE_JWT = {
     'AUTH_HEADER_TYPES': ('Bearer',),
 }
 
+# How often each worker reads new entries of the revocation log (User/revocation.py);
+# the worker that writes an entry sees it at once
+REVOCATION_SYNC_SECONDS = 5
+
+# How long a calendar feed link works before the user has to fetch a new one
+CALENDAR_FEED_MAX_AGE = 365 * 24 * 60 * 60
+
 
 REST_FRAMEWORK = {
     # Use Django's standard `django.contrib.auth` permissions,
@@ -152,15 +159,35 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [],
      'DEFAULT_AUTHENTICATION_CLASSES': (
-         'rest_framework_simplejwt.authentication.JWTAuthentication',
+         'User.authentication.ClaimsJWTAuthentication',
      ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
 
     # # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'project.pagination.KeysetPagination',
     'PAGE_SIZE': 100
 }
 
+# Upper bound for the `page_size` query parameter of the keyset paginator
+PAGINATION_MAX_PAGE_SIZE = 500
+
+# Cached admin list responses (project/cache.py), evicted least recently used first once
+# MAX_ENTRIES is reached. Local memory is per worker process; with several workers use
+# 'project.cache.LRUFileBasedCache' and a directory LOCATION so they share entries and versions.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'responses',
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000, 'CULL_FREQUENCY': 10},
+    },
+}
+RESPONSE_CACHE_ALIAS = 'responses'
+
 
 
 # Define the directory where Django will collect all static files for production
@@ -174,5 +201,36 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Resumable uploads (Office/uploads.py): the largest document and chunk accepted, and how long a
+# session may sit idle before clear_upload_sessions deletes it with its partial file
+UPLOAD_MAX_SIZE = 1024 * 1024 * 1024
+UPLOAD_CHUNK_MAX_SIZE = 16 * 1024 * 1024
+UPLOAD_SESSION_IDLE_SECONDS = 24 * 60 * 60
+
+# How the download endpoints (project/downloads.py) hand files to the web server: None streams them
+# from Django; 'x-accel-redirect' (nginx, with an internal location at DOWNLOAD_ACCEL_PREFIX aliasing
+# MEDIA_ROOT) or 'x-sendfile' (Apache mod_xsendfile, lighttpd) let the server send them
+DOWNLOAD_SENDFILE = None
+DOWNLOAD_ACCEL_PREFIX = '/protected/'
+
+# Resized copies of uploaded images (project/images.py): {variant: (max width, max height)}. They are
+# generated by IMAGE_VARIANT_WORKERS threads after upload, or on first request when missing
+IMAGE_VARIANTS = {
+    'thumbnail': (96, 96),
+    'medium': (480, 480),
+}
+IMAGE_VARIANT_FORMAT = 'webp'  # JPEG where Pillow lacks WebP support
+IMAGE_VARIANT_QUALITY = 80
+IMAGE_VARIANT_WORKERS = 2
+
+# Uploads are stored once per distinct content, see project/storage.py
+STORAGES = {
+    'default': {'BACKEND': 'project.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+# Blobs stored or found again this recently are not deleted on release, as the row of a concurrent
+# upload of the same bytes may not be committed yet; clear_unreferenced_blobs collects them later
+BLOB_RELEASE_GRACE_SECONDS = 60 * 60
+
 
 CORS_ORIGIN_ALLOW_ALL = True
\ No newline at end of file
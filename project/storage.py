@@ -0,0 +1,182 @@
+import contextlib
+import functools
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files import locks
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.db import models
+from django.utils import timezone
+
+BLOB_DIR = 'blobs'
+LOCK_NAME = f'{BLOB_DIR}/.lock'
+# Resized copies of image blobs, named after the blob's hash; see project/images.py
+VARIANT_DIR = 'variants'
+# Longer extensions are cut so blob names fit the default FileField max_length of 100
+MAX_EXTENSION = 10
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    File storage that keeps each distinct content once, under the SHA-256 of
+    its bytes: blobs/ab/cd/abcd….ext. Saving bytes already stored returns
+    the existing name without writing anything. Rows share blobs, so a blob
+    is only deleted once no row references it; see release().
+    """
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Serialize saves finding a blob stored with release() deleting it, across processes."""
+        path = self.path(LOCK_NAME)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as file:
+            locks.lock(file, locks.LOCK_EX)
+            try:
+                yield
+            finally:
+                locks.unlock(file)
+
+    def claim(self, name):
+        """Whether the blob `name` is stored. Refreshes its mtime, so release() leaves it to the new row."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def blob_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()[:MAX_EXTENSION]
+        return f'{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def get_available_name(self, name, max_length=None):
+        # The name is replaced by the content hash in _save()
+        return name
+
+    def _save(self, name, content):
+        if hasattr(content, 'temporary_file_path') or content.seekable():
+            # Can be read twice: hash it first and write only content not stored yet (chunks() rewinds it)
+            digest = hashlib.sha256()
+            for chunk in content.chunks():
+                digest.update(chunk)
+            name = self.blob_name(digest.hexdigest(), name)
+            with self.lock():
+                if not self.claim(name):
+                    if hasattr(content, 'temporary_file_path'):
+                        self.move_into(content.temporary_file_path(), name)
+                    else:
+                        self.move_into(self.write_temporary(content)[1], name)
+            return name
+
+        # Stream that can only be read once: hash it while writing it out
+        digest, path = self.write_temporary(content)
+        name = self.blob_name(digest, name)
+        with self.lock():
+            if self.claim(name):
+                os.remove(path)
+            else:
+                self.move_into(path, name)
+        return name
+
+    def write_temporary(self, content):
+        """Write `content` to a temporary file beside the blobs; return (its SHA-256, the file's path)."""
+        directory = self.path(BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(dir=directory, prefix='.upload-', delete=False) as temporary:
+            for chunk in content.chunks():
+                digest.update(chunk)
+                temporary.write(chunk)
+        return digest.hexdigest(), temporary.name
+
+    def move_into(self, path, name):
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            file_move_safe(path, full_path)
+        except FileExistsError:
+            # Stored meanwhile by a concurrent upload of the same bytes
+            os.remove(path)
+            return
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+
+
+@functools.cache
+def blob_fields():
+    """(model, field) of every file field stored in a ContentAddressedStorage."""
+    return [
+        (model, field)
+        for model in apps.get_models()
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def references(name):
+    """Number of rows whose file fields point at the blob `name`."""
+    return sum(model._default_manager.filter(**{field.name: name}).count() for model, field in blob_fields())
+
+
+def recently_stored(storage, name, now=None):
+    # Saved or found by a save within the grace period: its row may not be committed yet
+    try:
+        mtime = os.stat(storage.path(name)).st_mtime
+    except FileNotFoundError:
+        return False
+    return mtime > (now or timezone.now()).timestamp() - settings.BLOB_RELEASE_GRACE_SECONDS
+
+
+def release(storage, name, now=None):
+    """
+    Delete the file `name` once no row references it any more. Blobs stored
+    within BLOB_RELEASE_GRACE_SECONDS are left for collect_unreferenced(),
+    as a concurrent upload of the same bytes may not have committed its row.
+    Return whether the file was deleted.
+    """
+    if not name:
+        return False
+    with storage.lock():
+        if references(name) or recently_stored(storage, name, now):
+            return False
+        storage.delete(name)
+        discard_variants(storage, name)
+    return True
+
+
+def discard_variants(storage, name):
+    """Delete the cached variants of the blob `name`, whatever sizes and formats they were made in."""
+    if not name.startswith(f'{BLOB_DIR}/'):
+        return
+    digest = os.path.splitext(os.path.basename(name))[0]
+    directory = f'{VARIANT_DIR}/{digest[:2]}/{digest[2:4]}'
+    try:
+        _, filenames = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in filenames:
+        if filename.startswith(f'{digest}-'):
+            storage.delete(f'{directory}/{filename}')
+
+
+def collect_unreferenced(storage, now=None):
+    """Delete the blobs no row references that are past their grace period; return how many."""
+    referenced = set()
+    for model, field in blob_fields():
+        referenced.update(
+            model._default_manager.filter(**{f'{field.name}__startswith': f'{BLOB_DIR}/'})
+            .values_list(field.name, flat=True).distinct()
+        )
+    deleted = 0
+    for directory, _, filenames in os.walk(storage.path(BLOB_DIR)):
+        for filename in filenames:
+            # The lock and interrupted writes (see Office/uploads.py)
+            if filename.startswith('.'):
+                continue
+            name = os.path.relpath(os.path.join(directory, filename), storage.location).replace(os.sep, '/')
+            if name not in referenced:
+                deleted += release(storage, name, now)
+    return deleted
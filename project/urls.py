@@ -36,6 +36,7 @@ schema_view = get_schema_view(
 )
 urlpatterns = [
     path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+    path('api/async/', include('api.async_urls', namespace='async-api')),
     path('api/', include('api.urls',namespace='api')),
     path('admin/', admin.site.urls),
 ]